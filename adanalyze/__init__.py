@@ -0,0 +1 @@
+"""TikTok Ads export analysis, usable without the Streamlit interface."""
@@ -0,0 +1,5 @@
+import sys
+
+from adanalyze.cli import main
+
+sys.exit(main())
@@ -0,0 +1,149 @@
+"""Plotly figures for the analysis results with bounded payload size.
+
+Time series with more than CHART_MAX_POINTS points are resampled to daily,
+weekly or monthly totals and drawn with WebGL once they are dense. Ad-level
+charts show the CHART_TOP_ADS ads with the highest cost and fold the rest
+into a single "Other" entry, so the figure size does not grow with the
+number of rows or ads in the export.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from adanalyze.engine import ACCOUNT_COLUMN, SUM_COLUMNS, ad_labels
+
+CHART_MAX_POINTS = int(os.environ.get('ADANALYZE_CHART_MAX_POINTS', 1000))
+CHART_TOP_ADS = int(os.environ.get('ADANALYZE_CHART_TOP_ADS', 25))
+# Series longer than this are drawn with Scattergl and without markers
+WEBGL_MIN_POINTS = int(os.environ.get('ADANALYZE_WEBGL_MIN_POINTS', 300))
+
+# Resampling steps tried in order until the series fits, with their label keys
+RESAMPLE_FREQUENCIES = [('D', 'daily'), ('W', 'weekly'), ('M', 'monthly')]
+
+
+def downsample_time_series(time_data, max_points=CHART_MAX_POINTS):
+    """Sum time_data into the finest period that yields at most ``max_points`` rows.
+
+    Returns the (possibly resampled) frame and the label key of the period
+    used, or None when the data already fits.
+    """
+    if len(time_data) <= max_points:
+        return time_data, None
+    dates = time_data['Date Created']
+    values = time_data.drop(columns='Date Created')
+    for freq, label in RESAMPLE_FREQUENCIES:
+        resampled = values.groupby(dates.dt.to_period(freq).dt.start_time.rename('Date Created')).sum()
+        if len(resampled) <= max_points:
+            break
+    return resampled.reset_index(), label
+
+
+def top_ads(ad_summary, top_n=CHART_TOP_ADS, other_label='Other', rank_by='Cost'):
+    """The ``top_n`` ads by ``rank_by`` plus one ``other_label`` row for the rest.
+
+    Additive columns of the "Other" row are summed and averaged columns are
+    the mean over the folded ads, ignoring infinite per-ad values.
+    """
+    if len(ad_summary) <= top_n:
+        return ad_summary
+    ranked = ad_summary.sort_values(rank_by, ascending=False, kind='stable')
+    head, rest = ranked.iloc[:top_n], ranked.iloc[top_n:]
+    numeric = rest.drop(columns=[col for col in ('Ad name', ACCOUNT_COLUMN) if col in rest.columns])
+    numeric = numeric.replace([np.inf, -np.inf], np.nan)
+    other = {col: numeric[col].sum() if col in SUM_COLUMNS else numeric[col].mean() for col in numeric.columns}
+    other['Ad name'] = other_label
+    return pd.concat([head, pd.DataFrame([other])], ignore_index=True).round(2)
+
+
+def time_series_figure(t, time_data, max_points=CHART_MAX_POINTS):
+    data, period = downsample_time_series(time_data, max_points)
+    dense = len(data) > WEBGL_MIN_POINTS
+    scatter = go.Scattergl if dense else go.Scatter
+    mode = 'lines' if dense else 'lines+markers'
+    xaxis_title = t["chart_labels"]["date"]
+    if period is not None:
+        xaxis_title = f"{xaxis_title} ({t['chart_labels'][period]})"
+    fig = go.Figure()
+    fig.add_trace(scatter(x=data['Date Created'], y=data['Impressions'], name=t["chart_labels"]["impressions"], mode=mode))
+    fig.add_trace(scatter(x=data['Date Created'], y=data['Clicks (destination)'], name=t["chart_labels"]["clicks"], mode=mode, yaxis='y2'))
+    fig.update_layout(
+        title=t["chart_titles"]["impressions_clicks"],
+        xaxis_title=xaxis_title,
+        yaxis_title=t["chart_labels"]["impressions"],
+        yaxis2=dict(title=t["chart_labels"]["clicks"], overlaying='y', side='right'),
+        height=400
+    )
+    return fig
+
+
+def performance_figure(t, ads):
+    names = ad_labels(ads)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=names, y=ads['CTR (destination)'], name=t["chart_labels"]["ctr"]))
+    fig.add_trace(go.Bar(x=names, y=ads['Conversion rate (CVR)'], name=t["chart_labels"]["conversion_rate"]))
+    if '6-second view rate' in ads.columns:
+        fig.add_trace(go.Bar(x=names, y=ads['6-second view rate'], name=t["chart_labels"]["6s_view_rate"]))
+    if 'Landing page view rate (website)' in ads.columns:
+        fig.add_trace(go.Bar(x=names, y=ads['Landing page view rate (website)'], name=t["chart_labels"]["landing_page_view_rate"]))
+    fig.update_layout(
+        title=t["chart_titles"]["performance_metrics"],
+        xaxis_title=t["chart_labels"]["ad_name"],
+        yaxis_title=t["chart_labels"]["percentage"],
+        barmode='group',
+        height=400
+    )
+    return fig
+
+
+def cost_figure(t, ads):
+    fig = px.pie(ads[['Cost']].assign(**{'Ad name': ad_labels(ads)}), values='Cost', names='Ad name', title=t["chart_titles"]["cost_distribution"])
+    fig.update_layout(height=400)
+    return fig
+
+
+def video_figure(t, ads):
+    names = ad_labels(ads)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=names, y=ads['Video views'], name=t["chart_labels"]["video_views"]))
+    fig.add_trace(go.Bar(x=names, y=ads['6-second video views'], name=t["chart_labels"]["6s_video_views"]))
+    fig.update_layout(
+        title=t["chart_titles"]["video_engagement"],
+        xaxis_title=t["chart_labels"]["ad_name"],
+        yaxis_title=t["chart_labels"]["count"],
+        barmode='group',
+        height=400
+    )
+    return fig
+
+
+def account_figure(t, account_summary):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=account_summary[ACCOUNT_COLUMN], y=account_summary['Cost'], name=t["chart_labels"]["cost"]))
+    fig.add_trace(go.Scatter(x=account_summary[ACCOUNT_COLUMN], y=account_summary['CTR (destination)'], name=t["chart_labels"]["ctr"], mode='markers', yaxis='y2'))
+    fig.update_layout(
+        title=t["chart_titles"]["account_performance"],
+        xaxis_title=t["chart_labels"]["account"],
+        yaxis_title=t["chart_labels"]["cost"],
+        yaxis2=dict(title=t["chart_labels"]["ctr"], overlaying='y', side='right'),
+        height=400
+    )
+    return fig
+
+
+def build_figures(t, ad_summary, time_data, account_summary=None, top_n=CHART_TOP_ADS, max_points=CHART_MAX_POINTS):
+    """All charts of the Visual Insights section, in display order."""
+    figures = []
+    if account_summary is not None:
+        figures.append(account_figure(t, account_summary))
+    if not time_data.empty:
+        figures.append(time_series_figure(t, time_data, max_points))
+    ads = top_ads(ad_summary, top_n, t["chart_labels"]["other"])
+    figures.append(performance_figure(t, ads))
+    if not ads.empty:
+        figures.append(cost_figure(t, ads))
+    if 'Video views' in ads.columns and '6-second video views' in ads.columns:
+        figures.append(video_figure(t, ads))
+    return figures
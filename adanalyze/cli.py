@@ -0,0 +1,111 @@
+"""Headless batch analysis of a directory of TikTok Ads exports.
+
+    python -m adanalyze exports/ -o results/ --workers 4
+
+Each export is analysed in its own worker process. Results for
+``exports/<name>.xlsx`` are written to ``results/<name>.xlsx/``: ``summary.json``
+(columns, summary metrics and suggestions) plus the ``ad_summary`` and
+``time_data`` tables as Parquet or JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from adanalyze.engine import SUGGESTION_RULES, run_pipeline, upload_format, with_thresholds
+from adanalyze.translations import translations
+
+EXPORT_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+
+def find_exports(input_dir):
+    return sorted(
+        os.path.join(input_dir, name) for name in os.listdir(input_dir)
+        if name.lower().endswith(EXPORT_EXTENSIONS) and not name.startswith('~$')
+    )
+
+
+def write_table(df, path_without_ext, table_format):
+    if table_format == 'parquet':
+        df.to_parquet(path_without_ext + '.parquet', index=False)
+    else:
+        df.to_json(path_without_ext + '.json', orient='records', date_format='iso', force_ascii=False)
+
+
+def process_file(path, output_dir, streaming=False, table_format='parquet', lang='en', thresholds=None, compact=False):
+    """Analyse one export and write its results; returns the elapsed seconds."""
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        data = f.read()
+    rules = with_thresholds(thresholds) if thresholds else None
+    result = run_pipeline(data, upload_format(path), streaming=streaming, t=translations[lang], rules=rules, compact=compact)
+
+    target = os.path.join(output_dir, os.path.basename(path))
+    os.makedirs(target, exist_ok=True)
+    write_table(result['ad_summary'], os.path.join(target, 'ad_summary'), table_format)
+    write_table(result['time_data'], os.path.join(target, 'time_data'), table_format)
+    elapsed = time.perf_counter() - started
+    with open(os.path.join(target, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'source': os.path.basename(path),
+            'columns': result['columns'],
+            'summary': result['summary'],
+            'suggestions': result['suggestions'].to_dict(orient='records'),
+            'elapsed_seconds': round(elapsed, 3),
+        }, f, ensure_ascii=False, indent=2, default=str)
+    return elapsed
+
+
+def parse_threshold(value):
+    key, sep, threshold = value.partition('=')
+    if not sep or key not in {rule['key'] for rule in SUGGESTION_RULES}:
+        raise argparse.ArgumentTypeError(f"expected RULE=VALUE with RULE one of: {', '.join(rule['key'] for rule in SUGGESTION_RULES)}")
+    try:
+        return key, float(threshold)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid threshold value: {threshold!r}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m adanalyze', description="Analyse a directory of TikTok Ads exports.")
+    parser.add_argument('input_dir', help="directory containing .xlsx, .xls or .csv exports")
+    parser.add_argument('-o', '--output-dir', default='adanalyze_results', help="where results are written (default: %(default)s)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help="worker processes (default: CPU count)")
+    parser.add_argument('--streaming', action='store_true', help="parse exports in chunks with bounded memory")
+    parser.add_argument('--compact', action='store_true', help="hold parsed rows in memory-optimized dtypes")
+    parser.add_argument('--format', dest='table_format', choices=('parquet', 'json'), default='parquet', help="table output format (default: %(default)s)")
+    parser.add_argument('--threshold', type=parse_threshold, action='append', default=[], metavar='RULE=VALUE', help="override a suggestion threshold, e.g. ad_low_ctr=0.8 (repeatable)")
+    parser.add_argument('--lang', choices=sorted(translations), default='en', help="language of the suggestions (default: %(default)s)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths = find_exports(args.input_dir)
+    if not paths:
+        print(f"No exports found in {args.input_dir}", file=sys.stderr)
+        return 1
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(paths)))) as pool:
+        futures = {
+            pool.submit(process_file, path, args.output_dir, args.streaming, args.table_format, args.lang, dict(args.threshold), args.compact): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                elapsed = future.result()
+            except Exception as e:
+                # Any error, e.g. from a corrupt workbook, fails only its own file
+                failures += 1
+                print(f"FAILED {path}: {type(e).__name__}: {e}", file=sys.stderr)
+            else:
+                print(f"ok     {path} ({elapsed:.2f}s)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Precomputed (date x ad) cube of additive measures for interactive filtering.
+
+The cube holds the measure_columns sums of every (date, ad) cell, sorted by
+date. A date range then needs two binary searches and an ad selection one
+boolean lookup per cell. Filtered totals, ad_summary and time_data are
+re-reduced from the selected cells with bincount instead of regrouping the
+raw rows, so a filter change costs in proportion to the number of cells.
+"""
+import numpy as np
+import pandas as pd
+
+from adanalyze.engine import (
+    ACCOUNT_COLUMN, ad_key_columns, ad_labels, measure_columns, metric_table, summarize_measures,
+)
+
+DATE_LEVEL = 'Date Created'
+
+
+class MeasureCube:
+    """Measure sums per (date, ad) cell with a sorted date index."""
+
+    def __init__(self, cells):
+        """``cells`` holds measure_columns sums indexed by 'Date Created' followed by the ad key levels."""
+        dates = cells.index.get_level_values(DATE_LEVEL)
+        order = np.argsort(dates.to_numpy(), kind='stable')
+        cells = cells.iloc[order]
+        self.columns = list(cells.columns)
+        self.dtypes = cells.dtypes
+        # One contiguous row per measure so each bincount reads sequential memory
+        self.values = np.ascontiguousarray(cells.to_numpy(dtype=np.float64).T)
+        self.dates = cells.index.get_level_values(DATE_LEVEL).to_numpy()
+        self.days, self.day_codes = np.unique(self.dates, return_inverse=True)
+
+        keys = cells.index.droplevel(DATE_LEVEL)
+        self.key_names = list(keys.names)
+        key_frame = keys.to_frame(index=False)
+        # Cells of rows without an ad count towards the totals but no ad
+        missing = key_frame.isna().any(axis=1).to_numpy()
+        codes, ads = keys.factorize(sort=True)
+        codes[missing] = -1
+        ads = ads.set_names(self.key_names).to_frame(index=False) if isinstance(ads, pd.MultiIndex) else pd.DataFrame({self.key_names[0]: ads})
+        used = np.unique(codes[codes >= 0])
+        remap = np.full(len(ads) + 1, -1)
+        remap[used] = np.arange(len(used))
+        self.ad_codes = remap[codes]
+        self.ads = ads.iloc[used].reset_index(drop=True)
+        for col in self.ads.columns:
+            # Plain values in the tables, like _grouped_sums
+            if isinstance(self.ads[col].dtype, pd.CategoricalDtype):
+                self.ads[col] = self.ads[col].astype(self.ads[col].cat.categories.dtype)
+        self.labels = ad_labels(self.ads).astype(str).to_numpy()
+
+    @property
+    def nbytes(self):
+        return int(self.values.nbytes + self.dates.nbytes + self.day_codes.nbytes + self.ad_codes.nbytes)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def date_range(self, start=None, end=None):
+        """Positions of the first and past the last cell between ``start`` and the whole ``end`` day."""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start)), 'left'))
+        if end is None:
+            return lo, len(self.dates)
+        # The end day is included up to its last timestamp
+        stop = np.datetime64(pd.Timestamp(end).normalize() + pd.Timedelta(days=1))
+        return lo, int(np.searchsorted(self.dates, stop, 'left'))
+
+    def _reduce(self, values, codes, size):
+        """Per-code sums of every measure row of ``values`` and the number of cells per code."""
+        counts = np.bincount(codes, minlength=size)
+        sums = np.empty((len(values), size))
+        for i, row in enumerate(values):
+            sums[i] = np.bincount(codes, weights=row, minlength=size)
+        return sums, counts
+
+    def _frame(self, sums, index):
+        """Measure sums back in their source dtypes, so the tables match summarize_frame."""
+        frame = pd.DataFrame(sums.T, index=index, columns=self.columns)
+        for col, dtype in self.dtypes.items():
+            if pd.api.types.is_integer_dtype(dtype):
+                frame[col] = np.rint(frame[col].to_numpy()).astype(np.int64)
+        return frame
+
+    def _ad_index(self, positions):
+        ads = self.ads.iloc[positions]
+        if len(self.key_names) > 1:
+            return pd.MultiIndex.from_frame(ads)
+        return pd.Index(ads[self.key_names[0]], name=self.key_names[0])
+
+    def summarize(self, start=None, end=None, ads=None, metric=None, low=None, high=None):
+        """Summary, ad_summary, time_data and account table of the filtered cells, or None if none match.
+
+        ``start`` and ``end`` bound the dates (both days included), ``ads``
+        lists the ad labels to keep and ``metric`` keeps the ads whose
+        AD_SUMMARY_COLUMNS value over the selected dates lies within
+        ``low`` and ``high``, either of which may be None.
+        """
+        lo, hi = self.date_range(start, end)
+        values = self.values[:, lo:hi]
+        day_codes = self.day_codes[lo:hi]
+        # Rows without an ad go to an extra code past the last ad
+        ad_codes = np.where(self.ad_codes[lo:hi] >= 0, self.ad_codes[lo:hi], len(self.ads))
+
+        sums, counts = self._reduce(values, ad_codes, len(self.ads) + 1)
+        keep = counts[:-1] > 0
+        narrowed = False
+        if ads is not None:
+            keep &= np.isin(self.labels, list(ads))
+            narrowed = True
+        if metric is not None and (low is not None or high is not None):
+            positions = np.flatnonzero(keep)
+            table = metric_table(self._frame(sums[:, positions], self._ad_index(positions)), self.key_names)
+            if metric in table.columns:
+                metric_values = table[metric].to_numpy(dtype=np.float64)
+                inside = np.ones(len(positions), dtype=bool)
+                if low is not None:
+                    inside &= metric_values >= low
+                if high is not None:
+                    inside &= metric_values <= high
+                keep[positions[~inside]] = False
+                narrowed = True
+        if narrowed:
+            # Unselected ads, and rows without an ad, leave the totals and the time series
+            cells = np.append(keep, False)[ad_codes]
+            values = values[:, cells]
+            day_codes = day_codes[cells]
+        if not values.shape[1]:
+            return None
+
+        positions = np.flatnonzero(keep)
+        per_ad = self._frame(sums[:, positions], self._ad_index(positions))
+        totals = self._frame(values.sum(axis=1, keepdims=True), [0])
+        day_sums, day_counts = self._reduce(values, day_codes, len(self.days))
+        present = np.flatnonzero(day_counts)
+        per_date = self._frame(day_sums[:, present], pd.DatetimeIndex(self.days[present], name=DATE_LEVEL))
+        per_date = per_date[['Impressions', 'Clicks (destination)']]
+        summary, ad_summary, time_data = summarize_measures(totals, per_ad, per_date)
+        account_summary = None
+        if ACCOUNT_COLUMN in self.key_names:
+            account_summary = metric_table(per_ad.groupby(level=ACCOUNT_COLUMN, sort=True).sum(), [ACCOUNT_COLUMN])
+        return summary, ad_summary, time_data, account_summary
+
+
+def cube_from_rows(df):
+    """MeasureCube of cleaned rows, one cell per date and ad."""
+    keys = [DATE_LEVEL] + ad_key_columns(df)
+    measures = measure_columns(df)
+    cells = measures.groupby([df[col] for col in keys], sort=False, dropna=False, observed=True).sum()
+    return MeasureCube(cells)
+
+
+def cube_from_aggregates(agg):
+    """MeasureCube of (ad, date) aggregates from stream_aggregates or an AggregateHistory."""
+    return MeasureCube(agg.reorder_levels([DATE_LEVEL] + [name for name in agg.index.names if name != DATE_LEVEL]))
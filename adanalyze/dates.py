@@ -0,0 +1,75 @@
+"""Vectorized parsing of the 'Date Created' column.
+
+``pd.to_datetime(format='mixed')`` hands every value to dateutil. Exports
+only use a handful of formats, and most rows repeat a date. So each distinct
+value is parsed once. Values are grouped by shape, e.g. ``N/N/N N:N``, and
+each group is parsed with the explicit formats of that shape, in the order
+dateutil would prefer. Only the values that no format matches go through
+``format='mixed'``, so the results equal the per-value parse. Values with a
+UTC offset are converted to UTC and stored without a timezone.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+_DIGITS = re.compile(r'\d+')
+# Date parts in order of preference when the day comes first or the month does
+_DAYFIRST_DATES = ['%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y-%m-%d', '%Y/%m/%d', '%m/%d/%Y', '%m-%d-%Y', '%m.%d.%Y', '%d/%m/%y', '%m/%d/%y']
+_MONTHFIRST_DATES = ['%m/%d/%Y', '%m-%d-%Y', '%m.%d.%Y', '%Y-%m-%d', '%Y/%m/%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%m/%d/%y', '%d/%m/%y']
+_TIMES = ['', ' %H:%M', ' %H:%M:%S', 'T%H:%M:%S', ' %H:%M:%S.%f', 'T%H:%M:%S.%f']
+
+
+def _shape(text):
+    return _DIGITS.sub('N', text)
+
+
+def candidate_formats(dayfirst=True):
+    """Explicit formats keyed by the shape of the strings they match."""
+    formats = {}
+    sample = pd.Timestamp(2024, 11, 25, 13, 45, 56, 123456)
+    for date in (_DAYFIRST_DATES if dayfirst else _MONTHFIRST_DATES):
+        for time in _TIMES:
+            fmt = date + time
+            formats.setdefault(_shape(sample.strftime(fmt)), []).append(fmt)
+    return formats
+
+
+_CANDIDATES = {True: candidate_formats(True), False: candidate_formats(False)}
+
+
+def _parse_unique(values, dayfirst):
+    """Parse distinct values; returns datetime64 values aligned with ``values``."""
+    parsed = pd.Series(pd.NaT, index=range(len(values)), dtype='datetime64[ns]')
+    values = pd.Series(values, dtype=object)
+    is_text = values.map(type).eq(str).to_numpy()
+    leftover = [np.flatnonzero(~is_text)]
+
+    text = values[is_text]
+    candidates = _CANDIDATES[bool(dayfirst)]
+    for shape, group in text.groupby(text.map(_shape), sort=False):
+        for fmt in candidates.get(shape, []):
+            result = pd.to_datetime(group, format=fmt, errors='coerce')
+            matched = result.notna()
+            parsed[result.index[matched]] = result[matched]
+            group = group[~matched]
+            if group.empty:
+                break
+        leftover.append(group.index.to_numpy())
+
+    rest = np.concatenate(leftover)
+    if len(rest):
+        # Values with differing UTC offsets would parse to objects; they are compared in UTC instead
+        result = pd.to_datetime(values[rest], format='mixed', errors='coerce', dayfirst=dayfirst, utc=True)
+        parsed[rest] = result.dt.tz_localize(None).to_numpy()
+    return parsed.to_numpy()
+
+
+def parse_date_column(column, dayfirst=True):
+    """Parse a column of export dates to datetime64; unparseable values become NaT."""
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column
+    codes, uniques = pd.factorize(column, use_na_sentinel=True)
+    parsed = _parse_unique(np.asarray(uniques, dtype=object), dayfirst)
+    # The sentinel -1 takes the NaT appended at the end
+    return pd.Series(np.append(parsed, np.datetime64('NaT', 'ns'))[codes], index=column.index, name=column.name)
@@ -0,0 +1,709 @@
+"""UI-free analysis pipeline for TikTok Ads exports.
+
+load -> clean -> KPIs -> summary / ad_summary / time series -> suggestions.
+Only pandas and numpy are imported at module level so batch jobs start fast;
+openpyxl is imported when a workbook is streamed.
+"""
+import io
+import itertools
+import operator
+import string
+
+import numpy as np
+import pandas as pd
+
+from adanalyze.dates import parse_date_column
+from adanalyze.instrumentation import stage
+from adanalyze.schema import detect_schema, missing_columns, read_options, total_row_mask
+
+# Rows parsed per chunk in streaming mode
+STREAM_CHUNK_ROWS = 50_000
+
+# Additive measures summed per ad and date
+SUM_COLUMNS = [
+    'Impressions', 'Clicks (destination)', 'Cost', 'Conversions',
+    'Video views', '6-second video views', 'Landing page views (website)'
+]
+# Row-level columns that are averaged in the summary and the ad table
+MEAN_COLUMNS = [
+    'CTR (destination)', 'CPM', 'Conversion rate (CVR)', 'Cost per conversion', '6-second view rate',
+    'Average play time per video view', 'Landing page view rate (website)', 'Cost per landing page view'
+]
+# Row-level KPI columns derived from the metrics, with the columns each one needs
+KPI_FORMULAS = {
+    'CTR (destination)': lambda df: df['Clicks (destination)'] / df['Impressions'] * 100,
+    'CPM': lambda df: df['Cost'] / (df['Impressions'] / 1000),
+    'Conversion rate (CVR)': lambda df: df['Conversions'] / df['Clicks (destination)'] * 100,
+    'Cost per conversion': lambda df: (df['Cost'] / df['Conversions']).where(df['Conversions'] > 0, np.inf),
+    '6-second view rate': lambda df: df['6-second video views'] / df['Video views'] * 100,
+    'Cost per landing page view': lambda df: (df['Cost'] / df['Landing page views (website)']).where(df['Landing page views (website)'] > 0, np.inf),
+}
+KPI_INPUTS = {
+    'CTR (destination)': ['Clicks (destination)', 'Impressions'],
+    'CPM': ['Cost', 'Impressions'],
+    'Conversion rate (CVR)': ['Conversions', 'Clicks (destination)'],
+    'Cost per conversion': ['Cost', 'Conversions'],
+    '6-second view rate': ['6-second video views', 'Video views'],
+    'Cost per landing page view': ['Cost', 'Landing page views (website)'],
+}
+# Count metrics that compact_frame stores in the narrowest exact dtype
+COUNT_COLUMNS = [
+    'Impressions', 'Clicks (destination)', 'Conversions', 'Video views', '2-second video views',
+    '6-second video views', 'Video views at 100%', 'Landing page views (website)'
+]
+# float32 represents every integer up to 2**24 exactly
+FLOAT32_EXACT_MAX = 2 ** 24
+# Averaged with inf (no conversions or landing page views) counted as zero
+INF_AS_ZERO_COLUMNS = ['Cost per conversion', 'Cost per landing page view']
+SUM_SUFFIX = ' (sum)'
+COUNT_SUFFIX = ' (count)'
+# Source label added to rows combined from several files or sheets
+ACCOUNT_COLUMN = 'Account'
+# Cleaned columns the analysis reads; only these are persisted and loaded
+ANALYSIS_COLUMNS = [
+    'Date Created', 'Ad name', 'Impressions', 'Clicks (destination)', 'Cost', 'Conversions',
+    'Video views', '6-second video views', 'Average play time per video view',
+    'Landing page views (website)', 'Landing page view rate (website)', ACCOUNT_COLUMN
+]
+# Column order of the ad performance table
+AD_SUMMARY_COLUMNS = [
+    'Impressions', 'Clicks (destination)', 'Cost', 'Conversions',
+    'CTR (destination)', 'CPM', 'Conversion rate (CVR)', 'Cost per conversion',
+    'Video views', '6-second video views', '6-second view rate',
+    'Average play time per video view',
+    'Landing page views (website)', 'Landing page view rate (website)', 'Cost per landing page view'
+]
+# Summary metrics shown to users in display order: (summary key, format, column)
+METRIC_FORMATS = [
+    ('total_impressions', '{:,}', 0), ('total_clicks', '{:,}', 0), ('total_cost', '${:,}', 0), ('total_conversions', '{:,}', 0),
+    ('total_video_views', '{:,}', 0), ('total_landing_page_views', '{:,}', 0),
+    ('avg_ctr', '{}%', 1), ('avg_cpm', '${}', 1), ('avg_conversion_rate', '{}%', 1), ('avg_cost_per_conversion', '${}', 1),
+    ('avg_6s_view_rate', '{}%', 1), ('avg_landing_page_view_rate', '{}%', 1),
+]
+
+# Optimization suggestion rules. 'general' rules test the campaign summary,
+# 'ad' rules every row of ad_summary and 'trend' rules the per-ad anomaly
+# z-scores and trend slopes (% per day) of adanalyze.trends. A rule fires when its metric is below or
+# above 'threshold'; its priority is either fixed or 'high' past the 'high'
+# band and 'medium' otherwise. 'requires' names a column that must be present.
+SUGGESTION_RULES = [
+    {'key': 'low_ctr', 'scope': 'general', 'metric': 'avg_ctr', 'direction': 'below', 'threshold': 1, 'high': 0.5},
+    {'key': 'high_cpm', 'scope': 'general', 'metric': 'avg_cpm', 'direction': 'above', 'threshold': 10, 'priority': 'medium'},
+    {'key': 'low_conversion_rate', 'scope': 'general', 'metric': 'avg_conversion_rate', 'direction': 'below', 'threshold': 2, 'high': 1},
+    {'key': 'high_cost_per_conversion', 'scope': 'general', 'metric': 'avg_cost_per_conversion', 'direction': 'above', 'threshold': 50, 'priority': 'high'},
+    {'key': 'low_6s_view_rate', 'scope': 'general', 'metric': 'avg_6s_view_rate', 'direction': 'below', 'threshold': 10, 'high': 5},
+    {'key': 'low_landing_page_view_rate', 'scope': 'general', 'metric': 'avg_landing_page_view_rate', 'direction': 'below', 'threshold': 20, 'priority': 'high'},
+    {'key': 'ad_low_ctr', 'scope': 'ad', 'metric': 'CTR (destination)', 'direction': 'below', 'threshold': 1, 'high': 0.5},
+    {'key': 'ad_low_6s_view_rate', 'scope': 'ad', 'metric': '6-second view rate', 'direction': 'below', 'threshold': 10, 'high': 5},
+    {'key': 'ad_low_landing_page_view_rate', 'scope': 'ad', 'metric': 'Landing page view rate (website)', 'direction': 'below', 'threshold': 20, 'priority': 'high', 'requires': 'Landing page views (website)'},
+    {'key': 'ad_ctr_drop', 'scope': 'trend', 'metric': 'CTR (destination) anomaly', 'direction': 'above', 'threshold': 3, 'high': 5},
+    {'key': 'ad_ctr_decline', 'scope': 'trend', 'metric': 'CTR (destination) trend', 'direction': 'above', 'threshold': 5, 'high': 10},
+    {'key': 'ad_cpm_spike', 'scope': 'trend', 'metric': 'CPM anomaly', 'direction': 'above', 'threshold': 3, 'high': 5},
+    {'key': 'ad_cpm_rise', 'scope': 'trend', 'metric': 'CPM trend', 'direction': 'above', 'threshold': 5, 'high': 10},
+    {'key': 'ad_cvr_drop', 'scope': 'trend', 'metric': 'Conversion rate (CVR) anomaly', 'direction': 'above', 'threshold': 3, 'high': 5},
+    {'key': 'ad_cvr_decline', 'scope': 'trend', 'metric': 'Conversion rate (CVR) trend', 'direction': 'above', 'threshold': 5, 'high': 10},
+    {'key': 'ad_cost_per_conversion_spike', 'scope': 'trend', 'metric': 'Cost per conversion anomaly', 'direction': 'above', 'threshold': 3, 'high': 5},
+    {'key': 'ad_cost_per_conversion_rise', 'scope': 'trend', 'metric': 'Cost per conversion trend', 'direction': 'above', 'threshold': 5, 'high': 10},
+]
+
+
+class DatasetError(Exception):
+    """Raised when an uploaded file cannot be turned into a usable dataset."""
+
+
+class MissingColumnsError(DatasetError):
+    def __init__(self, columns):
+        super().__init__(', '.join(columns))
+        self.columns = columns
+
+
+class InvalidDatesError(DatasetError):
+    def __init__(self, invalid_rows):
+        super().__init__("invalid dates in 'Date Created'")
+        self.invalid_rows = invalid_rows
+
+
+class EmptyDataError(DatasetError):
+    pass
+
+
+def upload_format(filename):
+    """Map an uploaded file name to the reader used for it."""
+    name = filename.lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith('.xlsx'):
+        return 'xlsx'
+    return 'xls'
+
+
+def export_schema(header):
+    """detect_schema of an export header, raising MissingColumnsError when a required column is not found."""
+    schema = detect_schema(header)
+    missing = missing_columns(schema)
+    if missing:
+        raise MissingColumnsError(missing)
+    return schema
+
+
+def read_header(data, file_format, sheet=None):
+    """Column names of an export, read from its header row only."""
+    if file_format == 'csv':
+        return pd.read_csv(io.BytesIO(data), nrows=0).columns.tolist()
+    return pd.read_excel(io.BytesIO(data), sheet_name=0 if sheet is None else sheet, nrows=0).columns.tolist()
+
+
+def read_export(data, file_format, sheet=None):
+    """Analysis columns of an export under their canonical names, and the full header.
+
+    The schema is detected from the header row alone; the rows are then read
+    with only the mapped columns and declared dtypes, so unused columns of
+    wide exports are never parsed into the frame.
+    """
+    with stage('read') as record:
+        if file_format == 'csv':
+            header = read_header(data, file_format)
+            schema = export_schema(header)
+            df = pd.read_csv(io.BytesIO(data), **read_options(schema))
+        else:
+            with pd.ExcelFile(io.BytesIO(data)) as workbook:
+                sheet = 0 if sheet is None else sheet
+                header = workbook.parse(sheet, nrows=0).columns.tolist()
+                schema = export_schema(header)
+                df = workbook.parse(sheet, **read_options(schema))
+        df.columns = [schema[col] for col in df.columns]
+        record.rows = len(df)
+    return df, header
+
+
+def read_upload(data, file_format, sheet=None):
+    """Raw rows of a CSV export or of one workbook sheet (the first by default)."""
+    with stage('read') as record:
+        if file_format == 'csv':
+            df = pd.read_csv(io.BytesIO(data))
+        else:
+            df = pd.read_excel(io.BytesIO(data), sheet_name=0 if sheet is None else sheet)
+        record.rows = len(df)
+    return df
+
+
+def sheet_names(data, file_format):
+    """Sheets of a workbook, or [None] for a CSV export."""
+    if file_format == 'csv':
+        return [None]
+    with pd.ExcelFile(io.BytesIO(data)) as workbook:
+        return workbook.sheet_names
+
+
+def normalize_columns(df):
+    """Keep the export columns the analysis reads, renamed to their canonical names.
+
+    Returns the rows, which share their data with ``df``, and the original
+    column names. Frames from read_export pass through unchanged.
+    """
+    original_columns = df.columns.tolist()
+    schema = export_schema(original_columns)
+    if len(schema) < len(original_columns):
+        df = df[list(schema)]
+    return df.set_axis([schema[col] for col in df.columns], axis=1, copy=False), original_columns
+
+
+def parse_dates(df, dayfirst=True):
+    """Drop total rows and rows without a date, then parse 'Date Created'.
+
+    The rows are filtered with a single take, and only shallow-copied when
+    every row is kept. Raises InvalidDatesError on values that do not parse.
+    """
+    dates = df['Date Created']
+    keep = dates.notna().to_numpy() & (dates != '-').to_numpy() & ~total_row_mask(df['Ad name'])
+    df = df.copy(deep=False) if keep.all() else df.take(np.flatnonzero(keep))
+    parsed = parse_date_column(df['Date Created'], dayfirst)
+    if parsed.isna().any():
+        # Report the values as they appear in the export
+        raise InvalidDatesError(df[parsed.isna()][['Ad name', 'Date Created']].head())
+    df['Date Created'] = parsed
+    return df
+
+
+def coerce_numeric(df):
+    """Convert the metric columns to numbers in place; placeholders such as '-' become NaN."""
+    numeric_cols = [
+        'Impressions', 'Clicks (destination)', 'Cost', 'Conversions',
+        'Video views', '2-second video views', '6-second video views', 'Video views at 100%',
+        'Average play time per video view', 'Landing page views (website)', 'Landing page view rate (website)'
+    ]
+    for col in numeric_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def clean_frame(df, dayfirst=True, allow_empty=False, compact=False):
+    """Validate columns, parse dates, coerce numbers and add KPI columns to raw export rows.
+
+    With ``compact`` the rows are shrunk with compact_frame instead and the
+    KPI columns are left to be computed when they are read.
+    """
+    with stage('columns') as record:
+        df, original_columns = normalize_columns(df)
+        record.rows = len(df)
+    with stage('dates') as record:
+        df = parse_dates(df, dayfirst)
+        record.rows = len(df)
+    if df.empty and not allow_empty:
+        raise EmptyDataError()
+    with stage('numeric') as record:
+        df = coerce_numeric(df)
+        record.rows = len(df)
+    if compact:
+        with stage('compact') as record:
+            df = compact_frame(df)
+            record.rows = len(df)
+        return df, original_columns
+    with stage('kpis') as record:
+        df = add_kpi_columns(df)
+        record.rows = len(df)
+    return df, original_columns
+
+
+def kpi_column(df, col):
+    """One KPI column computed from the metrics of ``df``, or None when an input is missing."""
+    if not all(name in df.columns for name in KPI_INPUTS[col]):
+        return None
+    return KPI_FORMULAS[col]({name: _widen(df[name]) for name in KPI_INPUTS[col]}).round(2)
+
+
+def row_column(df, col):
+    """A column of cleaned rows, computing KPI columns that compact frames leave out."""
+    if col in df.columns:
+        return df[col]
+    if col in KPI_FORMULAS:
+        return kpi_column(df, col)
+    return None
+
+
+def add_kpi_columns(df):
+    """Derive the row-level KPI columns from the cleaned metrics."""
+    for col in KPI_FORMULAS:
+        values = kpi_column(df, col)
+        if values is not None:
+            df[col] = values
+    return df
+
+
+def _downcast_count(values):
+    """Narrowest dtype of the same kind that holds the counts exactly."""
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return pd.to_numeric(values, downcast='integer')
+    finite = values.dropna()
+    if (finite % 1 == 0).all() and (finite.empty or finite.abs().max() <= FLOAT32_EXACT_MAX):
+        return values.astype(np.float32)
+    return values
+
+
+def compact_frame(df):
+    """Shrink cleaned rows for memory-optimized mode.
+
+    Only ANALYSIS_COLUMNS are kept. 'Ad name' and ACCOUNT_COLUMN become categorical, and count
+    columns take the narrowest integer dtype, or float32 for float columns
+    whose values it holds exactly. KPI columns are not stored;
+    measure_columns computes them through row_column when it aggregates.
+    Cost and rates keep float64, so the results equal the full frame's.
+    """
+    df = df[[col for col in ANALYSIS_COLUMNS if col in df.columns]].copy()
+    for col in ('Ad name', ACCOUNT_COLUMN):
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in COUNT_COLUMNS:
+        if col in df.columns:
+            df[col] = _downcast_count(df[col])
+    return df
+
+
+def memory_report(df):
+    """Per-column memory of ``df`` as a table of column, dtype and megabytes, largest first."""
+    usage = df.memory_usage(deep=True, index=False)
+    return pd.DataFrame({
+        'Column': usage.index,
+        'Dtype': [str(df[col].dtype) for col in usage.index],
+        'Memory (MB)': (usage.to_numpy() / 2 ** 20).round(3),
+    }).sort_values('Memory (MB)', ascending=False, kind='stable', ignore_index=True)
+
+
+def parse_upload(data, file_format='xlsx', dayfirst=True, compact=False, sheet=None):
+    """Read an export and return the cleaned, typed DataFrame with KPI columns, or compacted rows.
+
+    The original columns returned are the export's full header.
+    """
+    df, header = read_export(data, file_format, sheet)
+    df, _ = clean_frame(df, dayfirst=dayfirst, compact=compact)
+    return df, header
+
+
+def iter_upload_chunks(data, file_format, chunk_rows=STREAM_CHUNK_ROWS, schema=None):
+    """Yield the raw export rows as DataFrames of at most ``chunk_rows`` rows.
+
+    With a ``schema`` from detect_schema, only its columns are read.
+    """
+    options = read_options(schema) if schema else {}
+    if file_format == 'csv':
+        yield from pd.read_csv(io.BytesIO(data), chunksize=chunk_rows, **options)
+        return
+    if file_format != 'xlsx':
+        # Legacy .xls workbooks have no row-streaming reader
+        df = pd.read_excel(io.BytesIO(data), **options)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+        return
+
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        # The first sheet, like read_header, not the one saved as active
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(col) if col is not None else f'Unnamed: {i}' for i, col in enumerate(header)]
+        width = len(columns)
+        positions = [i for i, col in enumerate(columns) if schema is None or col in schema]
+        columns = [columns[i] for i in positions]
+        pick = operator.itemgetter(*positions)
+        while True:
+            # Rows can stop short of the header; their missing trailing cells are empty
+            batch = [pick(row if len(row) >= width else row + (None,) * (width - len(row))) for row in itertools.islice(rows, chunk_rows)]
+            if not batch:
+                break
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        workbook.close()
+
+
+def _widen(values):
+    """Downcast columns of compact frames back to 64 bits so sums cannot overflow or lose precision."""
+    if pd.api.types.is_integer_dtype(values.dtype) and values.dtype != np.int64:
+        return values.astype(np.int64)
+    if values.dtype == np.float32:
+        return values.astype(np.float64)
+    return values
+
+
+def measure_columns(df):
+    """Additive measures of cleaned rows.
+
+    SUM_COLUMNS are kept as-is and every MEAN_COLUMNS entry becomes a sum and
+    a count of non-null values, so any grouping of the rows can be reduced
+    with a plain native sum and the averages recovered exactly afterwards.
+    """
+    columns = {col: _widen(df[col]) for col in SUM_COLUMNS if col in df.columns}
+    for col in MEAN_COLUMNS:
+        values = row_column(df, col)
+        if values is not None:
+            values = _widen(values)
+            if col in INF_AS_ZERO_COLUMNS:
+                values = values.mask(np.isinf(values), 0)
+            columns[col + SUM_SUFFIX] = values
+            columns[col + COUNT_SUFFIX] = values.notna().astype('int64')
+    return pd.DataFrame(columns)
+
+
+def ad_key_columns(df):
+    """Columns identifying an ad: its name, prefixed by the account when rows are combined."""
+    return [ACCOUNT_COLUMN, 'Ad name'] if ACCOUNT_COLUMN in df.columns else ['Ad name']
+
+
+def ad_labels(ads):
+    """Ad names, suffixed with the account for combined datasets."""
+    if ACCOUNT_COLUMN not in ads.columns:
+        return ads['Ad name']
+    accounts = ads[ACCOUNT_COLUMN]
+    return ads['Ad name'].astype(str).where(accounts.isna(), ads['Ad name'].astype(str) + ' (' + accounts.astype(str) + ')')
+
+
+def _grouped_sums(measures, df, columns):
+    """Native groupby-sum of ``measures`` on categorical versions of ``columns``."""
+    keys = [df[col].astype('category') for col in columns]
+    sums = measures.groupby(keys, observed=True).sum()
+    # Back to the column dtypes so the tables hold plain values
+    levels = [sums.index.get_level_values(i).astype(key.cat.categories.dtype) for i, key in enumerate(keys)]
+    sums.index = pd.MultiIndex.from_arrays(levels) if len(levels) > 1 else levels[0]
+    return sums
+
+
+def summarize_frame(df):
+    """Compute the summary metrics, per-ad table and time series from cleaned rows.
+
+    Every per-ad aggregate comes from a single native groupby-sum on a
+    categorical ad key. Combined rows are grouped per account and ad.
+    """
+    with stage('aggregate') as record:
+        record.rows = len(df)
+        measures = measure_columns(df)
+        per_ad = _grouped_sums(measures, df, ad_key_columns(df))
+        per_date = measures[['Impressions', 'Clicks (destination)']].groupby(df['Date Created']).sum()
+        return summarize_measures(measures.sum().to_frame().T, per_ad, per_date)
+
+
+def summarize_accounts(df):
+    """Per-account table with the ad_summary metrics, or None for rows from a single source."""
+    if ACCOUNT_COLUMN not in df.columns:
+        return None
+    per_account = _grouped_sums(measure_columns(df), df, [ACCOUNT_COLUMN])
+    return metric_table(per_account, [ACCOUNT_COLUMN])
+
+
+def aggregate_chunk(df):
+    """Reduce cleaned rows to additive partial aggregates per (ad, date).
+
+    Partials from different chunks can be merged exactly with merge_aggregates.
+    """
+    keys = [df['Ad name'], df['Date Created']]
+    return measure_columns(df).groupby(keys, sort=False, dropna=False).sum()
+
+
+def merge_aggregates(partials):
+    if len(partials) == 1:
+        return partials[0]
+    return pd.concat(partials).groupby(level=['Ad name', 'Date Created'], sort=False, dropna=False).sum()
+
+
+def _mean_of(frame, col):
+    return frame[col + SUM_SUFFIX] / frame[col + COUNT_SUFFIX]
+
+
+def summarize_measures(totals, per_ad, per_date):
+    """Build summary, ad_summary and time_data from reduced measures.
+
+    ``totals`` is a one-row frame of measure_columns sums over all rows,
+    ``per_ad`` the sums indexed by ad name and ``per_date`` the impressions
+    and clicks indexed by date.
+    """
+    columns = totals.columns
+
+    def total(col):
+        return totals[col].iloc[0]
+
+    def mean(col):
+        return _mean_of(totals, col).iloc[0]
+
+    summary = {
+        'total_impressions': int(total('Impressions') or 0),
+        'total_clicks': int(total('Clicks (destination)') or 0),
+        'total_cost': round(float(total('Cost') or 0), 2),
+        'total_conversions': int(total('Conversions') or 0),
+        'avg_ctr': round(float(mean('CTR (destination)') or 0), 2),
+        'avg_cpm': round(float(mean('CPM') or 0), 2),
+        'avg_conversion_rate': round(float(mean('Conversion rate (CVR)') or 0), 2),
+        'avg_cost_per_conversion': round(float(mean('Cost per conversion')), 2),
+    }
+    if 'Video views' in columns:
+        summary['total_video_views'] = int(total('Video views') or 0)
+        summary['avg_6s_view_rate'] = round(float(mean('6-second view rate') or 0), 2) if '6-second view rate' + SUM_SUFFIX in columns else 0
+    if 'Average play time per video view' + SUM_SUFFIX in columns:
+        summary['avg_play_time'] = round(float(mean('Average play time per video view') or 0), 2)
+    if 'Landing page views (website)' in columns:
+        summary['total_landing_page_views'] = int(total('Landing page views (website)') or 0)
+        summary['avg_landing_page_view_rate'] = round(float(mean('Landing page view rate (website)') or 0), 2)
+        summary['avg_cost_per_landing_page_view'] = round(float(mean('Cost per landing page view')), 2)
+
+    ad_summary = metric_table(per_ad, per_ad.index.names if per_ad.index.nlevels > 1 else ['Ad name'])
+
+    time_data = per_date.rename_axis('Date Created').reset_index()
+
+    return summary, ad_summary, time_data
+
+
+def metric_table(sums, index_names):
+    """AD_SUMMARY_COLUMNS of grouped measure sums, with the group keys as leading columns."""
+    table = {}
+    for col in AD_SUMMARY_COLUMNS:
+        if col in sums.columns:
+            table[col] = sums[col]
+        elif col + SUM_SUFFIX in sums.columns:
+            table[col] = _mean_of(sums, col)
+    return pd.DataFrame(table).rename_axis(index_names).reset_index().round(2)
+
+
+def summarize_aggregates(agg):
+    """Build the same summary, per-ad table and time series as summarize_frame from partial aggregates."""
+    with stage('aggregate') as record:
+        record.rows = len(agg)
+        per_ad = agg.groupby(level='Ad name').sum()
+        per_date = agg.groupby(level='Date Created')[['Impressions', 'Clicks (destination)']].sum()
+        return summarize_measures(agg.sum().to_frame().T, per_ad, per_date)
+
+
+def stream_aggregates(data, file_format, dayfirst=True, chunk_rows=STREAM_CHUNK_ROWS):
+    """Parse an export chunk by chunk, folding rows into (ad, date) aggregates.
+
+    Peak memory is bounded by the chunk size plus the number of distinct
+    (ad, date) pairs rather than by the number of rows in the file.
+    """
+    with stage('stream') as record:
+        original_columns = read_header(data, file_format)
+        schema = export_schema(original_columns)
+        merged = None
+        pending = []
+        pending_rows = 0
+        for chunk in iter_upload_chunks(data, file_format, chunk_rows, schema):
+            cleaned, _ = clean_frame(chunk, dayfirst=dayfirst, allow_empty=True)
+            if cleaned.empty:
+                continue
+            partial = aggregate_chunk(cleaned)
+            del cleaned
+            pending.append(partial)
+            pending_rows += len(partial)
+            # Compact once the buffered partials are as large as a chunk
+            if pending_rows >= chunk_rows:
+                merged = merge_aggregates(([merged] if merged is not None else []) + pending)
+                pending = []
+                pending_rows = 0
+        if pending:
+            merged = merge_aggregates(([merged] if merged is not None else []) + pending)
+        if merged is None:
+            raise EmptyDataError()
+        record.rows = len(merged)
+        return merged, original_columns
+
+
+def _with_threshold(rule, threshold):
+    # The 'high' band keeps its ratio to the threshold, so it stays on the far side of it
+    if 'high' in rule and rule['threshold']:
+        return dict(rule, threshold=threshold, high=rule['high'] * threshold / rule['threshold'])
+    return dict(rule, threshold=threshold)
+
+
+def with_thresholds(overrides, rules=None):
+    """Copy of the suggestion rules with thresholds replaced by ``{rule key: value}`` and their 'high' bands scaled along."""
+    rules = SUGGESTION_RULES if rules is None else rules
+    return [_with_threshold(rule, overrides[rule['key']]) if rule['key'] in overrides else rule for rule in rules]
+
+
+def _crosses(values, direction, limit):
+    return values < limit if direction == 'below' else values > limit
+
+
+def evaluate_rules(summary, ad_summary, rules=None, ad_trends=None):
+    """Evaluate the suggestion rules as vectorized masks over the summary, ad_summary and ad_trends.
+
+    ``ad_trends`` shares the index of ad_summary (see trends.ad_trends);
+    without it the 'trend' rules are skipped.
+
+    Returns one row per triggered rule with language-independent columns:
+    ``rule`` (message key), ``ad_name`` (None for campaign-wide rules and
+    'Ad (Account)' for combined datasets), ``priority`` ('high' or 'medium'),
+    the metric ``value`` and the formatted ``threshold``. Rows are ordered
+    like the table shown to users: campaign rules first, then each ad's
+    rules in rule order.
+    """
+    rules = SUGGESTION_RULES if rules is None else rules
+    scopes = {'general': pd.DataFrame([summary]), 'ad': ad_summary, 'trend': ad_trends}
+    ad_names = ad_summary['Ad name']
+    if ACCOUNT_COLUMN in ad_summary.columns:
+        ad_names = ad_names.astype(str) + ' (' + ad_summary[ACCOUNT_COLUMN].astype(str) + ')'
+    matches = []
+    for order, rule in enumerate(rules):
+        scope = scopes[rule['scope']]
+        if scope is None or rule['metric'] not in scope.columns or rule.get('requires', rule['metric']) not in scope.columns:
+            continue
+        values = scope[rule['metric']]
+        mask = _crosses(values, rule['direction'], rule['threshold'])
+        if not mask.any():
+            continue
+        hits = values[mask]
+        if 'high' in rule:
+            priority = np.where(_crosses(hits, rule['direction'], rule['high']), 'high', 'medium')
+        else:
+            priority = rule['priority']
+        matches.append(pd.DataFrame({
+            'rule': rule['key'],
+            'ad_name': ad_names[mask] if rule['scope'] != 'general' else None,
+            'priority': priority,
+            'value': hits,
+            'threshold': f"{rule['threshold']:g}",
+            # Campaign rules sort before every ad
+            'position': hits.index if rule['scope'] != 'general' else -1,
+            'order': order,
+        }))
+    if not matches:
+        return pd.DataFrame(columns=['rule', 'ad_name', 'priority', 'value', 'threshold'])
+    matches = pd.concat(matches, ignore_index=True).sort_values(['position', 'order'], kind='stable')
+    return matches.drop(columns=['position', 'order']).reset_index(drop=True)
+
+
+def _fill_template(template, **columns):
+    """Vectorized str.format of ``template`` with one Series per placeholder."""
+    result = None
+    for literal, field, _, _ in string.Formatter().parse(template):
+        parts = [literal] if literal else []
+        if field is not None:
+            parts.append(columns[field].astype(str))
+        for part in parts:
+            result = part if result is None else result + part
+    return result
+
+
+def format_suggestions(matches, t):
+    """Turn evaluate_rules output into the suggestions table labelled with ``t``."""
+    labels = t["suggestions_table"]
+    columns = [labels["ad_name"], labels["issue"], labels["suggestion"], labels["priority"]]
+    if matches.empty:
+        return pd.DataFrame(columns=columns)
+    text = pd.Series('', index=matches.index, dtype=object)
+    for key, group in matches.groupby('rule', sort=False):
+        template = t["suggestions"][key]["text"]
+        # Ad rules name their value {ctr} or {rate}, trend rules {value}
+        params = {'ad_name': group['ad_name'], 'ctr': group['value'], 'rate': group['value'], 'value': group['value'], 'threshold': group['threshold']}
+        text[group.index] = _fill_template(template, **params)
+    return pd.DataFrame({
+        columns[0]: matches['ad_name'].where(matches['ad_name'].notna(), labels["general"]),
+        columns[1]: matches['rule'].map(lambda key: t["suggestions"][key]["issue"]),
+        columns[2]: text,
+        columns[3]: matches['priority'].map(labels),
+    })
+
+
+def format_metrics(summary, t):
+    """The METRIC_FORMATS metrics of ``summary`` as two columns (totals, averages) of (label, text) pairs labelled with ``t``."""
+    columns = [[], []]
+    for key, template, column in METRIC_FORMATS:
+        if key in summary:
+            columns[column].append((t["metrics"][key], template.format(summary[key])))
+    return columns
+
+
+def generate_suggestions(summary, ad_summary, t, rules=None, ad_trends=None):
+    """Build the optimization suggestions table, labelled with the strings in ``t``."""
+    with stage('suggestions') as record:
+        record.rows = len(ad_summary)
+        return format_suggestions(evaluate_rules(summary, ad_summary, rules, ad_trends), t)
+
+
+def run_pipeline(data, file_format='xlsx', dayfirst=True, streaming=False, chunk_rows=STREAM_CHUNK_ROWS, t=None, rules=None, compact=False):
+    """Run the full analysis on the bytes of an export.
+
+    Returns a dict with the original ``columns``, the ``summary`` metrics,
+    the ``ad_summary`` and ``time_data`` tables and, when a translation
+    table ``t`` is given, the ``suggestions`` table built with ``rules``,
+    including the anomaly and trend rules. ``compact`` parses the rows in memory-optimized mode (see compact_frame).
+    """
+    if streaming:
+        agg, original_columns = stream_aggregates(data, file_format, dayfirst=dayfirst, chunk_rows=chunk_rows)
+        summary, ad_summary, time_data = summarize_aggregates(agg)
+    else:
+        df, original_columns = parse_upload(data, file_format, dayfirst=dayfirst, compact=compact)
+        summary, ad_summary, time_data = summarize_frame(df)
+    result = {
+        'columns': original_columns,
+        'summary': summary,
+        'ad_summary': ad_summary,
+        'time_data': time_data,
+    }
+    if t is not None:
+        # Both build on this module
+        from adanalyze.cube import cube_from_aggregates, cube_from_rows
+        from adanalyze.trends import ad_trends
+        cube = cube_from_aggregates(agg) if streaming else cube_from_rows(df)
+        result['suggestions'] = generate_suggestions(summary, ad_summary, t, rules, ad_trends(cube, ad_summary))
+    return result
@@ -0,0 +1,142 @@
+"""Incrementally maintained (ad, date) aggregates across successive exports.
+
+A history directory holds:
+
+    cells/<YYYY-MM>.parquet   measure_columns sums per (ad, date) for one month
+    per_ad.parquet            the same measures rolled up per ad
+    per_date.parquet          the same measures rolled up per date
+    meta.json                 dataset keys already appended and export columns
+
+Appending an export rewrites only the months it touches and adjusts the two
+rollups by the difference between the new cells and the cells they replace,
+so a refresh costs in proportion to the new export rather than the history.
+"""
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from adanalyze.engine import EmptyDataError, summarize_measures
+from adanalyze.storage import DATASET_STORE_DIR, name_slug
+
+HISTORY_DIR = os.path.join(DATASET_STORE_DIR, 'history')
+# Number of appended dataset keys remembered to skip repeated uploads
+HISTORY_MAX_SOURCES = 1000
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def history_path(name, root=HISTORY_DIR):
+    return os.path.join(root, name_slug(name))
+
+
+class AggregateHistory:
+    """Additive (ad, date) aggregates of every export appended under one name."""
+
+    def __init__(self, path):
+        self.path = path
+        with _locks_guard:
+            self._lock = _locks.setdefault(os.path.abspath(path), threading.Lock())
+
+    def _file(self, *parts):
+        return os.path.join(self.path, *parts)
+
+    def _read(self, path):
+        return pd.read_parquet(path) if os.path.exists(path) else None
+
+    def _write(self, frame, path):
+        tmp = path + '.tmp'
+        frame.to_parquet(tmp)
+        os.replace(tmp, path)
+
+    def metadata(self):
+        try:
+            with open(self._file('meta.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'sources': [], 'columns': []}
+
+    def contains(self, source_key):
+        return source_key in self.metadata()['sources']
+
+    def append(self, agg, source_key=None, columns=()):
+        """Merge the (ad, date) aggregates of a new export into the history.
+
+        Cells already stored for the same (ad, date) are replaced rather than
+        added, so overlapping exports are not double counted. Returns the
+        number of new and of replaced cells.
+        """
+        with self._lock:
+            meta = self.metadata()
+            if source_key is not None and source_key in meta['sources']:
+                return 0, 0
+            os.makedirs(self._file('cells'), exist_ok=True)
+
+            added = []
+            removed = []
+            replaced = 0
+            months = agg.index.get_level_values('Date Created').strftime('%Y-%m')
+            for month, cells in agg.groupby(months):
+                path = self._file('cells', f'{month}.parquet')
+                stored = self._read(path)
+                merged = cells
+                if stored is not None:
+                    overlap = stored.index.isin(cells.index)
+                    if overlap.any():
+                        replaced += int(overlap.sum())
+                        removed.append(stored[overlap])
+                    merged = pd.concat([stored[~overlap], cells])
+                added.append(cells)
+                self._write(merged, path)
+
+            delta = pd.concat(added + [-frame for frame in removed])
+            self._rollup('per_ad.parquet', delta.groupby(level='Ad name', dropna=False).sum())
+            self._rollup('per_date.parquet', delta.groupby(level='Date Created').sum())
+
+            if source_key is not None:
+                meta['sources'] = (meta['sources'] + [source_key])[-HISTORY_MAX_SOURCES:]
+            meta['columns'] = meta['columns'] + [col for col in columns if col not in meta['columns']]
+            meta['updated_at'] = time.time()
+            tmp = self._file('meta.json.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(tmp, self._file('meta.json'))
+            return len(agg) - replaced, replaced
+
+    def _rollup(self, name, delta):
+        path = self._file(name)
+        stored = self._read(path)
+        if stored is None:
+            rolled = delta
+        else:
+            rolled = stored.add(delta, fill_value=0)
+            # Alignment upcasts to float; keep integer measures integral
+            for col in rolled.columns:
+                if pd.api.types.is_integer_dtype(delta.get(col)) and pd.api.types.is_integer_dtype(stored.get(col)):
+                    rolled[col] = rolled[col].astype('int64')
+        self._write(rolled, path)
+
+    def cells(self):
+        """Every stored (ad, date) cell, or None before the first append."""
+        directory = self._file('cells')
+        try:
+            names = sorted(name for name in os.listdir(directory) if name.endswith('.parquet'))
+        except OSError:
+            return None
+        if not names:
+            return None
+        return pd.concat([pd.read_parquet(os.path.join(directory, name)) for name in names])
+
+    def summarize(self):
+        """Summary, ad_summary and time_data over everything appended so far."""
+        per_ad = self._read(self._file('per_ad.parquet'))
+        per_date = self._read(self._file('per_date.parquet'))
+        if per_ad is None or per_date is None:
+            raise EmptyDataError()
+        totals = per_date.sum().to_frame().T
+        per_ad = per_ad[per_ad.index.notna()].sort_index()
+        per_date = per_date[['Impressions', 'Clicks (destination)']].sort_index()
+        return summarize_measures(totals, per_ad, per_date)
@@ -0,0 +1,273 @@
+"""Opt-in per-stage timing and memory instrumentation.
+
+Pipeline code marks its stages with ``with stage('read') as record:`` and may
+set ``record.rows``. Nothing is measured unless a Profiler is active in the
+current context. Without one, ``stage`` only reads two ContextVars (the
+second for jobs.checkpoint) and returns a shared no-op object.
+
+An active Profiler records wall time, row counts and, with tracemalloc, the
+peak memory allocated during each stage. Finished runs are logged as one
+JSON object per stage and folded into process-wide totals, which are
+written out in the Prometheus text format.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+
+from adanalyze.jobs import checkpoint
+from adanalyze.storage import DATASET_STORE_DIR
+
+# Text file with Prometheus metrics, e.g. for node_exporter's textfile collector
+METRICS_FILE = os.environ.get('ADANALYZE_METRICS_FILE', os.path.join(DATASET_STORE_DIR, 'metrics.prom'))
+# JSON lines log of every measured stage
+PERFORMANCE_LOG_FILE = os.environ.get('ADANALYZE_PERFORMANCE_LOG', os.path.join(DATASET_STORE_DIR, 'performance.jsonl'))
+# Instrument every run regardless of the sidebar toggle
+PROFILE_ALWAYS = os.environ.get('ADANALYZE_PROFILE', '') not in ('', '0')
+
+logger = logging.getLogger('adanalyze.performance')
+logger.setLevel(logging.INFO)
+_log_handler_lock = threading.Lock()
+
+
+def _ensure_log_handler(path=PERFORMANCE_LOG_FILE):
+    """Attach the JSON lines file handler on first use, so disabled runs never touch the disk."""
+    if not path or logger.handlers:
+        return
+    with _log_handler_lock:
+        if logger.handlers:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = logging.FileHandler(path, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+
+
+_active = contextvars.ContextVar('adanalyze_profiler', default=None)
+# tracemalloc is process-wide; it runs while any profiler that traces memory is active
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_started_tracing = False
+
+
+class _NullStage:
+    """Stand-in returned by stage() when no profiler is active."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.rows = None
+        self.peak = 0
+
+    def __enter__(self):
+        profiler = self.profiler
+        self.parent = profiler._stack[-1] if profiler._stack else None
+        if profiler.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # The peak is about to be reset, so hand what was seen so far to the parent
+            if self.parent is not None:
+                self.parent.peak = max(self.parent.peak, peak)
+            tracemalloc.reset_peak()
+            self.base = self.peak = current
+        profiler._stack.append(self)
+        self.order = profiler._started
+        profiler._started += 1
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        profiler = self.profiler
+        profiler._stack.pop()
+        peak_bytes = None
+        if profiler.trace_memory:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            peak_bytes = self.peak - self.base
+            if self.parent is not None:
+                self.parent.peak = max(self.parent.peak, self.peak)
+        profiler.records.append({
+            'stage': self.name,
+            'depth': len(profiler._stack),
+            'order': self.order,
+            'seconds': round(seconds, 4),
+            'rows': self.rows,
+            'peak_mb': None if peak_bytes is None else round(peak_bytes / 2**20, 2),
+            'failed': exc_type is not None,
+        })
+        return False
+
+
+def active_profiler():
+    """The Profiler active in the current context, or None."""
+    return _active.get()
+
+
+def attach_records(records):
+    """Show ``records`` of another profiler, e.g. a shared job's, under the current stage of the active one."""
+    profiler = _active.get()
+    if profiler is not None:
+        profiler.attach(records)
+
+
+def stage(name):
+    """Context manager measuring ``name`` when a profiler is active in this context.
+
+    Entering a stage inside a background job is also a cancellation checkpoint.
+    """
+    checkpoint(name)
+    profiler = _active.get()
+    if profiler is None:
+        return _NULL_STAGE
+    return _Stage(profiler, name)
+
+
+class Profiler:
+    """Collects stage records for one run; use as ``with Profiler() as profiler:``.
+
+    Records are kept in the order stages finish, so nested stages come
+    before the stage that contains them; ``order`` gives the start order. tracemalloc sees every thread, so
+    peak memory includes allocations of sessions running at the same time.
+    Records attached from other profilers are in ``attached``; they are
+    shown with the own records but emitted by their own profiler.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self.attached = []
+        self._stack = []
+        self._started = 0
+
+    def __enter__(self):
+        global _tracing_users, _started_tracing
+        if self.trace_memory:
+            with _tracing_lock:
+                if _tracing_users == 0:
+                    _started_tracing = not tracemalloc.is_tracing()
+                    if _started_tracing:
+                        tracemalloc.start()
+                _tracing_users += 1
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        global _tracing_users
+        _active.reset(self._token)
+        if self.trace_memory:
+            with _tracing_lock:
+                _tracing_users -= 1
+                if _tracing_users == 0 and _started_tracing:
+                    tracemalloc.stop()
+        return False
+
+    def attach(self, records):
+        """Nest ``records`` of another profiler under the current stage, as if they had started now."""
+        depth, first = len(self._stack), self._started
+        self.attached += [dict(record, depth=record['depth'] + depth, order=record['order'] + first) for record in records]
+        self._started += max((record['order'] + 1 for record in records), default=0)
+
+    def emit(self, metrics_file=METRICS_FILE):
+        """Log the records as JSON lines and add them to the Prometheus metrics file."""
+        try:
+            _ensure_log_handler()
+        except OSError as e:
+            logger.warning("Could not open the performance log: %s", e)
+        for record in self.records:
+            logger.info(json.dumps({'event': 'stage', 'run': self.run_id, 'time': time.time(), **record}))
+        METRICS.observe(self.records)
+        if metrics_file:
+            try:
+                METRICS.write(metrics_file)
+            except OSError as e:
+                logger.warning("Could not write metrics to %s: %s", metrics_file, e)
+
+
+def fold_records(records):
+    """Fold repeated stages (e.g. one per streamed chunk) into one row each, in start order.
+
+    Rows hold the stage, its nesting depth, the number of runs, total
+    seconds and rows, and the largest peak in MB.
+    """
+    folded = {}
+    for record in sorted(records, key=lambda record: record['order']):
+        row = folded.setdefault((record['stage'], record['depth']), {
+            'stage': record['stage'], 'depth': record['depth'], 'runs': 0, 'seconds': 0.0, 'rows': None, 'peak_mb': None})
+        row['runs'] += 1
+        row['seconds'] = round(row['seconds'] + record['seconds'], 4)
+        if record['rows'] is not None:
+            row['rows'] = (row['rows'] or 0) + record['rows']
+        if record['peak_mb'] is not None:
+            row['peak_mb'] = max(row['peak_mb'] or 0, record['peak_mb'])
+    return list(folded.values())
+
+
+class StageMetrics:
+    """Process-wide per-stage totals exposed in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def observe(self, records):
+        with self._lock:
+            for record in records:
+                totals = self._stages.setdefault(record['stage'], {'runs': 0, 'seconds': 0.0, 'rows': 0, 'last_seconds': 0.0, 'last_peak_bytes': None})
+                totals['runs'] += 1
+                totals['seconds'] += record['seconds']
+                totals['rows'] += record['rows'] or 0
+                totals['last_seconds'] = record['seconds']
+                if record['peak_mb'] is not None:
+                    totals['last_peak_bytes'] = int(record['peak_mb'] * 2**20)
+
+    def render(self):
+        with self._lock:
+            stages = {name: dict(totals) for name, totals in self._stages.items()}
+        metrics = [
+            ('adanalyze_stage_runs_total', 'counter', "Completed runs of each pipeline stage.", 'runs'),
+            ('adanalyze_stage_seconds_total', 'counter', "Wall time spent in each pipeline stage.", 'seconds'),
+            ('adanalyze_stage_rows_total', 'counter', "Rows processed by each pipeline stage.", 'rows'),
+            ('adanalyze_stage_last_seconds', 'gauge', "Wall time of the latest run of each stage.", 'last_seconds'),
+            ('adanalyze_stage_last_peak_bytes', 'gauge', "Peak memory allocated by the latest traced run of each stage.", 'last_peak_bytes'),
+        ]
+        lines = []
+        for metric, kind, help_text, field in metrics:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, totals in sorted(stages.items()):
+                if totals[field] is not None:
+                    lines.append(f'{metric}{{stage="{name}"}} {totals[field]:g}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Atomically replace ``path`` so scrapers never read a partial file."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+METRICS = StageMetrics()
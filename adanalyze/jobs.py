@@ -0,0 +1,222 @@
+"""Background jobs with stage-level progress and cooperative cancellation.
+
+A Job runs one function in a daemon thread. Every instrumentation stage()
+entered inside the job is a checkpoint: it records the stage for progress
+reporting and raises JobCancelled once the job has been cancelled, so a
+superseded job stops at its next stage boundary instead of running to the
+end. Outside a job, checkpoint() only reads a ContextVar. A job records
+its own stage timings in ``records``, so every session sharing it can show
+them.
+
+JobQueue bounds how many jobs run at once across all sessions, orders the
+waiting ones fairly between their owners and lets sessions asking for the
+same work share one job.
+"""
+import contextvars
+import itertools
+import os
+import threading
+import time
+
+# Jobs running at once across all sessions; at least two so a large job can run while one worker stays free
+JOB_WORKERS = max(2, int(os.environ.get('ADANALYZE_JOB_WORKERS', os.cpu_count() or 1)))
+# Jobs reading at least this many bytes may not take the last free worker
+LARGE_JOB_BYTES = int(os.environ.get('ADANALYZE_LARGE_JOB_BYTES', 50 * 1024 * 1024))
+
+_current = contextvars.ContextVar('adanalyze_job', default=None)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job at the first checkpoint after it was cancelled."""
+
+
+def checkpoint(stage=None):
+    """Mark the start of ``stage`` in the current job; raises JobCancelled if the job was cancelled."""
+    job = _current.get()
+    if job is None:
+        return
+    if job.cancelled:
+        raise JobCancelled()
+    if stage is not None:
+        job.stage = stage
+
+
+class Job:
+    """``func(*args, **kwargs)`` run in a background thread once start() is called.
+
+    ``key`` identifies the inputs, so callers can tell whether a running job
+    still matches what the user asked for. The thread runs in a copy of the
+    creating context under a Profiler of its own, whose records are kept in
+    ``records`` once the job finishes. Memory is traced and the records are
+    emitted when the creating context was profiling.
+    """
+
+    def __init__(self, key, func, /, *args, **kwargs):
+        self.key = key
+        self.stage = None
+        self.records = []
+        self.started_at = None
+        self.finished_at = None
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._result = None
+        self._error = None
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._callbacks = []
+        self.thread = threading.Thread(target=contextvars.copy_context().run, args=(self._run,), name='adanalyze-job', daemon=True)
+
+    def _run(self):
+        # instrumentation checks for cancellation through this module
+        from adanalyze.instrumentation import Profiler, active_profiler
+
+        _current.set(self)
+        creator = active_profiler()
+        profiler = Profiler(trace_memory=creator is not None and creator.trace_memory)
+        try:
+            with profiler:
+                # A job cancelled while it was queued ends here
+                checkpoint()
+                self._result = self._func(*self._args, **self._kwargs)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self.records = profiler.records
+            if creator is not None:
+                profiler.emit()
+            self.finished_at = time.monotonic()
+            self._done.set()
+            for callback in self._callbacks:
+                callback(self)
+
+    def add_done_callback(self, callback):
+        """Call ``callback(job)`` from the job's thread once it finishes; must be added before start()."""
+        self._callbacks.append(callback)
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        """Ask the job to stop at its next checkpoint; the result is then JobCancelled."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes or ``timeout`` seconds pass; returns whether it finished."""
+        return self._done.wait(timeout)
+
+    def result(self):
+        """Return value of the finished job, re-raising the exception it ended with."""
+        if not self.done:
+            raise RuntimeError('job is still running')
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class JobQueue:
+    """Process-wide pool running at most ``max_workers`` jobs at once.
+
+    Waiting jobs start in the order of a virtual start tag (start-time fair
+    queueing weighted by input bytes). A job's tag is the later of the
+    current virtual time and the end tag of its owner's previous job, so
+    an owner who just submitted a large upload yields to owners with small
+    ones. A job of at least ``large_bytes`` may not take the last free
+    worker: it only starts while another one stays free for smaller jobs.
+
+    Jobs are shared by key: acquiring a key whose job is still waiting or
+    running joins it instead of starting a duplicate. A job is cancelled
+    once every session that acquired it has released it unfinished.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, large_bytes=LARGE_JOB_BYTES):
+        self.max_workers = max_workers
+        self.large_bytes = large_bytes
+        self._lock = threading.Lock()
+        # (start tag, sequence, job) of jobs waiting for a worker
+        self._waiting = []
+        self._running = set()
+        self._shared = {}
+        self._end_tags = {}
+        self._virtual_time = 0
+        self._sequence = itertools.count()
+
+    def acquire(self, key, owner, cost, prepare, func, /, *args, **kwargs):
+        """The job computing ``func(*args, **kwargs)`` for ``key``, queued if no session started it yet.
+
+        ``cost`` is the number of input bytes and ``prepare(job)`` is called
+        on a new job before its thread can start.
+        """
+        with self._lock:
+            job = self._shared.get(key)
+            if job is None:
+                job = Job(key, func, *args, **kwargs)
+                job.cost = cost
+                job.users = 0
+                job.stage = 'queued'
+                if prepare is not None:
+                    prepare(job)
+                job.add_done_callback(self._finished)
+                start = max(self._virtual_time, self._end_tags.get(owner, 0))
+                self._end_tags[owner] = start + cost
+                self._waiting.append((start, next(self._sequence), job))
+                self._shared[key] = job
+            job.users += 1
+            self._dispatch()
+        return job
+
+    def release(self, job):
+        """Drop one session's interest in ``job``, cancelling it if nobody else waits for it."""
+        with self._lock:
+            job.users -= 1
+            if job.users > 0 or job.done:
+                return
+            job.cancel()
+            if self._shared.get(job.key) is job:
+                del self._shared[job.key]
+            waiting = [entry for entry in self._waiting if entry[2] is job]
+            if waiting:
+                # Its thread only records the cancellation, so it needs no worker
+                self._waiting.remove(waiting[0])
+                job.start()
+
+    def position(self, job):
+        """Number of jobs that start before ``job``, or 0 once it runs."""
+        with self._lock:
+            order = sorted(self._waiting, key=lambda entry: entry[:2])
+            return next((i for i, entry in enumerate(order) if entry[2] is job), 0)
+
+    def _finished(self, job):
+        with self._lock:
+            self._running.discard(job)
+            if self._shared.get(job.key) is job:
+                del self._shared[job.key]
+            self._dispatch()
+
+    def _dispatch(self):
+        """Start waiting jobs while workers are free; called with the lock held."""
+        while len(self._running) < self.max_workers and self._waiting:
+            last_free = len(self._running) == self.max_workers - 1
+            entry = next((
+                entry for entry in sorted(self._waiting, key=lambda entry: entry[:2])
+                if entry[2].cost < self.large_bytes or not last_free
+            ), None)
+            if entry is None:
+                break
+            self._waiting.remove(entry)
+            self._virtual_time = max(self._virtual_time, entry[0])
+            # Owners idle since before the current virtual time start afresh
+            self._end_tags = {owner: tag for owner, tag in self._end_tags.items() if tag > self._virtual_time}
+            job = entry[2]
+            self._running.add(job)
+            job.start()
@@ -0,0 +1,107 @@
+"""Header-only detection of the export columns the analysis reads.
+
+TikTok Ads Manager spells its columns differently across export versions and
+report types. detect_schema maps a header row onto the canonical column names,
+matching case- and whitespace-insensitively and through COLUMN_ALIASES, so an
+export can be read with just the columns it maps and with declared dtypes.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+REQUIRED_COLUMNS = ['Date Created', 'Ad name', 'Impressions', 'Clicks (destination)', 'Cost', 'Conversions']
+OPTIONAL_COLUMNS = [
+    'Video views', '2-second video views', '6-second video views', 'Video views at 100%',
+    'Average play time per video view', 'Landing page views (website)', 'Landing page view rate (website)'
+]
+# Header spellings seen in exports, preferred first when several are present
+COLUMN_ALIASES = {
+    'Date Created': ['date created', 'date', 'day', 'by day', 'stat time day'],
+    'Ad name': ['ad name', 'ad'],
+    'Impressions': ['impressions', 'impression'],
+    'Clicks (destination)': ['clicks (destination)', 'destination clicks', 'clicks'],
+    'Cost': ['cost', 'spend', 'total cost', 'amount spent'],
+    'Conversions': ['conversions', 'total conversions', 'conversion', 'results'],
+    'Video views': ['video views', 'video plays'],
+    '2-second video views': ['2-second video views', '2s video views', 'video views at 2s'],
+    '6-second video views': ['6-second video views', '6s video views', 'video views at 6s'],
+    'Video views at 100%': ['video views at 100%', '100% video views', 'video completions'],
+    'Average play time per video view': [
+        'average play time per video view', 'avg. play time per video view', 'average watch time per video view'
+    ],
+    'Landing page views (website)': ['landing page views (website)', 'landing page views', 'landing page view'],
+    'Landing page view rate (website)': ['landing page view rate (website)', 'landing page view rate'],
+}
+# Columns whose header may carry the account currency, e.g. 'Cost (USD)'
+CURRENCY_COLUMNS = ['Cost']
+TEXT_COLUMNS = ['Ad name']
+NUMERIC_COLUMNS = REQUIRED_COLUMNS[2:] + OPTIONAL_COLUMNS
+# Cell values exported for missing metrics
+PLACEHOLDERS = ['-']
+# 'Total of 51 results', 'Total of 1,234 results', 'Total'
+TOTAL_ROW_PATTERN = re.compile(r'^total(?: of [\d,.\s]+ results?)?$')
+
+_CURRENCY_SUFFIX = re.compile(r' \([a-z]{3}\)$')
+_ALIAS_RANKS = {alias: (column, rank) for column, aliases in COLUMN_ALIASES.items() for rank, alias in enumerate(aliases)}
+
+
+def normalize_header(name):
+    """Case-folded header with runs of whitespace and underscores collapsed to single spaces."""
+    return ' '.join(str(name).replace('_', ' ').split()).casefold()
+
+
+def _match(name):
+    """(canonical column, alias rank) of a header, or None."""
+    normalized = normalize_header(name)
+    match = _ALIAS_RANKS.get(normalized)
+    if match is None:
+        match = _ALIAS_RANKS.get(_CURRENCY_SUFFIX.sub('', normalized))
+        if match is not None and match[0] not in CURRENCY_COLUMNS:
+            match = None
+    return match
+
+
+def detect_schema(header):
+    """Map the headers of an export onto REQUIRED_COLUMNS and OPTIONAL_COLUMNS.
+
+    Returns ``{header: canonical name}`` in header order, with one header per
+    canonical column: the one spelled like the earliest alias, then the
+    first in the header. Unmatched headers are left out.
+    """
+    best = {}
+    for position, name in enumerate(header):
+        match = _match(name)
+        if match is None:
+            continue
+        column, rank = match
+        if column not in best or (rank, position) < best[column][0]:
+            best[column] = ((rank, position), name)
+    chosen = {name: column for column, (_, name) in best.items()}
+    return {name: chosen[name] for name in header if name in chosen}
+
+
+def missing_columns(schema):
+    """REQUIRED_COLUMNS that no header of ``schema`` maps to."""
+    found = set(schema.values())
+    return [column for column in REQUIRED_COLUMNS if column not in found]
+
+
+def read_options(schema):
+    """read_csv / read_excel keyword arguments that read only the ``schema`` columns with declared dtypes."""
+    return {
+        'usecols': list(schema),
+        'dtype': {name: str for name, column in schema.items() if column in TEXT_COLUMNS},
+        'na_values': {name: PLACEHOLDERS for name, column in schema.items() if column in NUMERIC_COLUMNS},
+    }
+
+
+def total_row_mask(names):
+    """Boolean mask of the total and summary rows among the 'Ad name' values.
+
+    The pattern is matched once per distinct name rather than once per row.
+    """
+    codes, uniques = pd.factorize(names)
+    is_total = np.fromiter((bool(TOTAL_ROW_PATTERN.match(normalize_header(name))) for name in uniques), dtype=bool, count=len(uniques))
+    # Missing names have code -1, which picks the trailing False
+    return np.append(is_total, False)[codes]
@@ -0,0 +1,219 @@
+"""Published report snapshots that open without the rows or the pipeline.
+
+A snapshot freezes one analysis: its summary, the ad, time and account
+tables and, for every language, the formatted summary metrics, the Plotly
+figures and the suggestions table. It is one zip file,
+
+    <SNAPSHOT_DIR>/<name>/v<version>.zip
+
+holding ``snapshot.json`` (metadata, summary, metrics and figure JSON) and
+one Parquet file per table, and publishing under the same name adds the next version next to the
+earlier ones. Opening a snapshot only parses that file, and snapshot_html
+turns one into a standalone page that any browser opens.
+"""
+import html
+import io
+import json
+import os
+import re
+import shutil
+import time
+import zipfile
+
+import pandas as pd
+import plotly.io as pio
+
+from adanalyze.storage import DATASET_STORE_DIR, name_slug
+
+SNAPSHOT_DIR = os.path.join(DATASET_STORE_DIR, 'snapshots')
+# Layout of the snapshot file; snapshots of another format are not opened
+SNAPSHOT_FORMAT = 1
+SNAPSHOTS_LIMIT = 20
+SNAPSHOT_TABLES = ['ad_summary', 'time_data', 'account_summary']
+
+_VERSION_FILE = re.compile(r'^v(\d+)\.zip$')
+
+
+def _write_table(archive, name, df):
+    # Parquet keeps the dtypes and the infinite rates that JSON cannot hold
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    archive.writestr(f"{name}.parquet", buffer.getvalue())
+
+
+def _read_table(archive, name):
+    return pd.read_parquet(io.BytesIO(archive.read(f"{name}.parquet")))
+
+
+def build_snapshot(name, summary, tables, original_columns, renders):
+    """Snapshot dict of one analysis, ready for SnapshotStore.publish.
+
+    ``tables`` maps SNAPSHOT_TABLES names to frames or None, and ``renders``
+    maps language codes to (metrics, figures, suggestions) with the metrics
+    as engine.format_metrics returns them.
+    """
+    return {
+        'format': SNAPSHOT_FORMAT,
+        'name': name,
+        'created_at': time.time(),
+        'columns': original_columns,
+        'summary': summary,
+        'tables': {table: tables[table] for table in SNAPSHOT_TABLES if tables.get(table) is not None},
+        'languages': {
+            lang_code: {'metrics': metrics, 'figures': [fig.to_json() for fig in figures], 'suggestions': suggestions}
+            for lang_code, (metrics, figures, suggestions) in renders.items()
+        },
+    }
+
+
+def write_snapshot(snapshot, path):
+    """Write a build_snapshot dict with its ``version`` to a zip file at ``path``."""
+    meta = dict(snapshot, tables=list(snapshot['tables']), languages={
+        lang_code: {'metrics': render['metrics'], 'figures': render['figures']}
+        for lang_code, render in snapshot['languages'].items()
+    })
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('snapshot.json', json.dumps(meta, ensure_ascii=False))
+        for table, df in snapshot['tables'].items():
+            _write_table(archive, f"tables/{table}", df)
+        for lang_code, render in snapshot['languages'].items():
+            _write_table(archive, f"suggestions/{lang_code}", render['suggestions'])
+
+
+class Snapshot:
+    """A published snapshot with its tables and figures parsed; treat it as read-only."""
+
+    def __init__(self, path):
+        self.path = path
+        with zipfile.ZipFile(path) as archive:
+            meta = json.loads(archive.read('snapshot.json'))
+            if meta.get('format') != SNAPSHOT_FORMAT:
+                raise ValueError(f"unsupported snapshot format {meta.get('format')!r}")
+            self.tables = {table: _read_table(archive, f"tables/{table}") for table in meta['tables']}
+            self.languages = {
+                lang_code: {
+                    'metrics': render['metrics'],
+                    'figures': [pio.from_json(fig) for fig in render['figures']],
+                    'suggestions': _read_table(archive, f"suggestions/{lang_code}"),
+                }
+                for lang_code, render in meta['languages'].items()
+            }
+        self.name = meta['name']
+        self.version = meta['version']
+        self.created_at = meta['created_at']
+        self.columns = meta['columns']
+        self.summary = meta['summary']
+
+    def read_bytes(self):
+        """The snapshot file, for downloading."""
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+class SnapshotStore:
+    """Versioned snapshots by name under ``root``."""
+
+    def __init__(self, root=SNAPSHOT_DIR):
+        self.root = root
+
+    def _path(self, slug, version):
+        return os.path.join(self.root, slug, f"v{version}.zip")
+
+    def versions(self, slug):
+        try:
+            names = os.listdir(os.path.join(self.root, slug))
+        except OSError:
+            return []
+        return sorted(int(match.group(1)) for match in map(_VERSION_FILE.match, names) if match)
+
+    def publish(self, snapshot):
+        """Write ``snapshot`` as the next version of its name and return that version."""
+        slug = name_slug(snapshot['name'])
+        os.makedirs(os.path.join(self.root, slug), exist_ok=True)
+        tmp = os.path.join(self.root, slug, f".{os.getpid()}.{time.monotonic_ns()}.tmp")
+        try:
+            while True:
+                version = (self.versions(slug) or [0])[-1] + 1
+                write_snapshot(dict(snapshot, version=version), tmp)
+                try:
+                    # Linking fails if another session published this version meanwhile
+                    os.link(tmp, self._path(slug, version))
+                    return version
+                except FileExistsError:
+                    continue
+                except OSError:
+                    pass
+                # Filesystems without hard links: claim the version by creating its file exclusively
+                try:
+                    with open(tmp, 'rb') as source, open(self._path(slug, version), 'xb') as target:
+                        shutil.copyfileobj(source, target)
+                    return version
+                except FileExistsError:
+                    continue
+        finally:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def recent(self, limit=SNAPSHOTS_LIMIT):
+        """(slug, version, published at) of the newest snapshots, newest first."""
+        try:
+            slugs = [slug for slug in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, slug))]
+        except OSError:
+            return []
+        entries = []
+        for slug in slugs:
+            for version in self.versions(slug):
+                try:
+                    entries.append((slug, version, os.path.getmtime(self._path(slug, version))))
+                except OSError:
+                    pass
+        entries.sort(key=lambda entry: entry[2], reverse=True)
+        return entries[:limit]
+
+    def load(self, slug, version):
+        """The Snapshot stored as ``version`` of ``slug``, or None if it is missing or of another format."""
+        try:
+            return Snapshot(self._path(slug, version))
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+
+
+def snapshot_html(snapshot, lang_code, t):
+    """Standalone HTML page of ``snapshot`` in one language, labelled with ``t``.
+
+    Plotly.js is loaded from its CDN, so the page stays small.
+    """
+    render = snapshot.languages[lang_code]
+    escape = html.escape
+    published = time.strftime('%Y-%m-%d %H:%M', time.localtime(snapshot.created_at))
+    parts = [
+        f"<h1>{escape(t['title'])}</h1>",
+        f"<p>{escape(t['snapshot_info'].format(name=snapshot.name, version=snapshot.version, published=published))}</p>",
+        f"<h2>{escape(t['summary_header'])}</h2>",
+        '<table class="metrics">',
+    ]
+    for column in render['metrics']:
+        parts += [f"<tr><th>{escape(label)}</th><td>{escape(text)}</td></tr>" for label, text in column]
+    parts.append('</table>')
+    parts += [f"<h2>{escape(t['ad_performance_header'])}</h2>", snapshot.tables['ad_summary'].to_html(index=False)]
+    if 'account_summary' in snapshot.tables:
+        parts += [f"<h2>{escape(t['account_performance_header'])}</h2>", snapshot.tables['account_summary'].to_html(index=False)]
+    parts.append(f"<h2>{escape(t['visual_insights_header'])}</h2>")
+    parts += [
+        pio.to_html(fig, full_html=False, include_plotlyjs='cdn' if i == 0 else False)
+        for i, fig in enumerate(render['figures'])
+    ]
+    parts.append(f"<h2>{escape(t['suggestions_header'])}</h2>")
+    suggestions = render['suggestions']
+    parts.append(suggestions.to_html(index=False) if not suggestions.empty else f"<p>{escape(t['no_suggestions'])}</p>")
+    direction = 'rtl' if lang_code == 'ar' else 'ltr'
+    return (
+        f'<!DOCTYPE html>\n<html lang="{lang_code}" dir="{direction}">\n<head>\n<meta charset="utf-8">\n'
+        f'<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+        f"<title>{escape(t['title'])} - {escape(snapshot.name)}</title>\n"
+        '<style>body{font-family:sans-serif;margin:1rem 2rem}table{border-collapse:collapse;margin-bottom:1rem}'
+        'th,td{border:1px solid #ddd;padding:4px 8px;text-align:start}</style>\n'
+        '</head>\n<body>\n' + '\n'.join(parts) + '\n</body>\n</html>\n'
+    )
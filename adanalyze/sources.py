@@ -0,0 +1,123 @@
+"""Combined analysis of several exports, e.g. one per ad account.
+
+Every sheet of every file is parsed in its own worker process. The cleaned
+rows are tagged with their source in ACCOUNT_COLUMN and concatenated, so
+the wall time follows the largest sheet rather than the total size.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from adanalyze.engine import ACCOUNT_COLUMN, MissingColumnsError, parse_upload, sheet_names, upload_format
+from adanalyze.jobs import checkpoint
+from adanalyze.schema import REQUIRED_COLUMNS
+
+# Worker processes parsing sources in the app
+SOURCE_WORKERS = int(os.environ.get('ADANALYZE_SOURCE_WORKERS', min(os.cpu_count() or 1, 8)))
+
+
+def _stem(name):
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def source_label(name, sheet=None, sheets=1, parent=False):
+    """Account label of a file, with the sheet name when the workbook has several.
+
+    ``parent`` prefixes the name of the file's directory, which tells apart
+    files of the same name from different folders.
+    """
+    stem = _stem(name)
+    folder = os.path.basename(os.path.dirname(name))
+    if parent and folder:
+        stem = f"{folder}/{stem}"
+    return f"{stem} / {sheet}" if sheets > 1 else stem
+
+
+def source_tasks(files):
+    """(label, data, file_format, sheet, several_sheets) for every sheet of ``files``, a list of (name, bytes).
+
+    Labels are unique: files sharing a name are labelled with their folder,
+    and labels repeated even so get a running number.
+    """
+    stems = [_stem(name) for name, _ in files]
+    tasks = []
+    seen = {}
+    for name, data in files:
+        file_format = upload_format(name)
+        sheets = sheet_names(data, file_format)
+        for sheet in sheets:
+            label = source_label(name, sheet, len(sheets), parent=stems.count(_stem(name)) > 1)
+            seen[label] = seen.get(label, 0) + 1
+            if seen[label] > 1:
+                label = f"{label} ({seen[label]})"
+            tasks.append((label, data, file_format, sheet, len(sheets) > 1))
+    return tasks
+
+
+def parse_source(data, file_format, sheet=None, dayfirst=True, compact=False, optional=False):
+    """Parse one sheet in a worker; ``optional`` sheets without the export columns give None."""
+    try:
+        return parse_upload(data, file_format, dayfirst=dayfirst, compact=compact, sheet=sheet)
+    except MissingColumnsError:
+        if optional:
+            return None
+        raise
+
+
+def combine_sources(parsed):
+    """Concatenate (label, (rows, columns)) pairs into one frame tagged with ACCOUNT_COLUMN.
+
+    Returns the rows and the union of the original columns in first-seen order.
+    """
+    frames = []
+    original_columns = []
+    for label, (df, columns) in parsed:
+        frames.append(df.assign(**{ACCOUNT_COLUMN: label}))
+        original_columns += [col for col in columns if col not in original_columns]
+    df = pd.concat(frames, ignore_index=True)
+    # Categories of compact frames differ per source, so concat falls back to object
+    if any(isinstance(frame['Ad name'].dtype, pd.CategoricalDtype) for frame in frames):
+        df['Ad name'] = df['Ad name'].astype('category')
+        df[ACCOUNT_COLUMN] = df[ACCOUNT_COLUMN].astype('category')
+    return df, original_columns
+
+
+def parse_sources(files, dayfirst=True, compact=False, executor=None, max_workers=None):
+    """Parse ``files`` (a list of (name, bytes)) concurrently and combine them.
+
+    Sheets of multi-sheet workbooks that lack the export columns are skipped.
+    Uses ``executor`` when given, otherwise a process pool of up to
+    ``max_workers`` that is shut down afterwards. A single sheet is parsed
+    in-process, and rows from a single sheet are not tagged with an account.
+    """
+    tasks = source_tasks(files)
+    if len(tasks) == 1:
+        _, data, file_format, sheet, _ = tasks[0]
+        return parse_upload(data, file_format, dayfirst=dayfirst, compact=compact, sheet=sheet)
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=min(len(tasks), max_workers or os.cpu_count() or 1))
+    futures = []
+    try:
+        futures = [
+            (label, executor.submit(parse_source, data, file_format, sheet, dayfirst, compact, optional))
+            for label, data, file_format, sheet, optional in tasks
+        ]
+        parsed = []
+        for label, future in futures:
+            # A cancelled job stops waiting between sources
+            checkpoint()
+            parsed.append((label, future.result()))
+    finally:
+        # Sources not started yet are dropped if a job is cancelled or a source fails
+        for _, future in futures:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+    parsed = [(label, result) for label, result in parsed if result is not None]
+    if not parsed:
+        raise MissingColumnsError(REQUIRED_COLUMNS)
+    if len(parsed) == 1:
+        return parsed[0][1]
+    return combine_sources(parsed)
@@ -0,0 +1,220 @@
+"""Caches that let repeated uploads skip parsing.
+
+IngestCache keeps recently used results in memory; DatasetStore persists
+ingested datasets as Parquet so they can be reopened without the original
+file, along with their summaries so any session or a restarted server can
+show them without summarizing again.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import partial
+
+import pandas as pd
+
+# Memory budget of the process-wide cache of parsed uploads and what is derived from them
+INGEST_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# On-disk Parquet store of ingested datasets, reopened without re-parsing the upload
+DATASET_STORE_DIR = os.environ.get('ADANALYZE_STORE_DIR', '.adanalyze_store')
+DATASET_STORE_MAX_DATASETS = 50
+RECENT_DATASETS_LIMIT = 10
+
+
+class IngestCache:
+    """Thread-safe LRU of cleaned DataFrames and their derived artifacts bounded by memory.
+
+    One dataset takes several entries (rows, memory report, summaries, cube,
+    trends), so the bound is in bytes only: a count would evict one dataset's
+    cube for another dataset's small summaries. Entries are shared between
+    reruns and sessions, so callers must treat the returned DataFrames as
+    read-only.
+    """
+
+    def __init__(self, max_bytes=INGEST_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            # A single entry larger than the budget is not worth keeping
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self.total_bytes += nbytes
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _write_atomically(path, write):
+    """Call ``write(tmp)`` on a temporary file next to ``path`` and move it into place.
+
+    Each call uses a file of its own, so concurrent writers of the same path
+    never publish each other's partial output; the last move wins.
+    """
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _write_json(data, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+class DatasetStore:
+    """Directory of Parquet files holding ingested datasets, keyed by dataset_key.
+
+    Each dataset is a ``<key>.parquet`` file next to a ``<key>.json`` metadata
+    file. Row datasets hold only ANALYSIS_COLUMNS and streaming datasets hold
+    their (ad, date) aggregates, so reopening reads just the columns in use.
+    Summaries of a dataset are kept in ``results/`` as ``<key>.json`` and one
+    ``<key>.<table>.parquet`` file per result table.
+    """
+
+    def __init__(self, root=DATASET_STORE_DIR, max_datasets=DATASET_STORE_MAX_DATASETS):
+        self.root = root
+        self.max_datasets = max_datasets
+
+    def _path(self, key, suffix):
+        return os.path.join(self.root, f"{key}.{suffix}")
+
+    def _results_path(self, key, suffix):
+        return os.path.join(self.root, 'results', f"{key}.{suffix}")
+
+    def metadata(self, key):
+        try:
+            with open(self._path(key, 'json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, key, frame, kind, name, original_columns):
+        os.makedirs(self.root, exist_ok=True)
+        # Write to temporary files first so readers never see a partial dataset
+        _write_atomically(self._path(key, 'parquet'), lambda tmp: frame.to_parquet(tmp, index=(kind == 'aggregates')))
+        meta = {
+            'key': key,
+            'kind': kind,
+            'name': name,
+            'rows': len(frame),
+            'columns': original_columns,
+            'stored_columns': [str(col) for col in frame.columns],
+            'saved_at': time.time(),
+        }
+        _write_atomically(self._path(key, 'json'), partial(_write_json, meta))
+        self._prune()
+
+    def load(self, key, columns=None):
+        """Return (frame, metadata) for a stored dataset, or None if it is missing."""
+        meta = self.metadata(key)
+        if meta is None:
+            return None
+        if columns is not None:
+            columns = [col for col in columns if col in meta['stored_columns']]
+        try:
+            frame = pd.read_parquet(self._path(key, 'parquet'), columns=columns, memory_map=True)
+        except OSError:
+            return None
+        # Mark as recently used
+        os.utime(self._path(key, 'json'))
+        return frame, meta
+
+    def save_results(self, key, summary, tables, original_columns):
+        """Persist the summary dict and the named result tables (None entries are skipped) of a stored dataset."""
+        os.makedirs(os.path.join(self.root, 'results'), exist_ok=True)
+        names = [name for name, table in tables.items() if table is not None]
+        for name in names:
+            _write_atomically(self._results_path(key, f'{name}.parquet'), partial(tables[name].to_parquet, index=False))
+        # The JSON file is written last, so it only exists once every table does
+        meta = {'summary': summary, 'tables': names, 'columns': original_columns}
+        _write_atomically(self._results_path(key, 'json'), partial(_write_json, meta))
+
+    def load_results(self, key):
+        """Return (summary, {table name: frame}, original columns) saved for ``key``, or None."""
+        try:
+            with open(self._results_path(key, 'json'), encoding='utf-8') as f:
+                meta = json.load(f)
+            tables = {name: pd.read_parquet(self._results_path(key, f'{name}.parquet')) for name in meta['tables']}
+        except (OSError, ValueError):
+            return None
+        return meta['summary'], tables, meta['columns']
+
+    def save_result_table(self, key, name, df):
+        """Persist one more result table next to the summaries saved for ``key``, e.g. one derived later."""
+        os.makedirs(os.path.join(self.root, 'results'), exist_ok=True)
+        _write_atomically(self._results_path(key, f'{name}.parquet'), partial(df.to_parquet, index=False))
+
+    def load_result_table(self, key, name):
+        """Result table ``name`` saved for ``key`` by save_result_table, or None."""
+        try:
+            return pd.read_parquet(self._results_path(key, f'{name}.parquet'))
+        except (OSError, ValueError):
+            return None
+
+    def recent(self, limit=RECENT_DATASETS_LIMIT):
+        """Metadata of the most recently saved or opened datasets, newest first."""
+        try:
+            names = [name for name in os.listdir(self.root) if name.endswith('.json')]
+        except OSError:
+            return []
+        paths = sorted((os.path.join(self.root, name) for name in names), key=os.path.getmtime, reverse=True)
+        entries = []
+        for path in paths[:limit]:
+            meta = self.metadata(os.path.basename(path)[:-len('.json')])
+            if meta is not None:
+                entries.append(meta)
+        return entries
+
+    def _prune(self):
+        stale = self.recent(limit=None)[self.max_datasets:]
+        for meta in stale:
+            paths = [self._path(meta['key'], suffix) for suffix in ('json', 'parquet')]
+            results = os.path.join(self.root, 'results')
+            if os.path.isdir(results):
+                paths += [os.path.join(results, name) for name in os.listdir(results) if name.startswith(meta['key'] + '.')]
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def dataset_key(data, *options):
+    """Content hash of the uploaded bytes combined with the parser options."""
+    digest = hashlib.sha256(data)
+    digest.update(repr(options).encode())
+    return digest.hexdigest()
+
+
+def name_slug(name):
+    """File-system safe directory name for a user-chosen name."""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('._') or 'default'
@@ -0,0 +1,86 @@
+"""Server-side paging, sorting and searching of result tables and their export.
+
+The app only hands the visible page of a table to Streamlit; the full table
+is written out in chunks when it is downloaded.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+TABLE_PAGE_SIZES = [25, 50, 100, 250]
+EXPORT_CHUNK_ROWS = 10_000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def text_columns(df):
+    """Columns searched by query_table: everything that is not numeric or a date."""
+    return [col for col in df.columns if not (pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_datetime64_any_dtype(df[col]))]
+
+
+def filter_table(df, search='', filters=None):
+    """Rows of ``df`` matching ``search`` and the ``filters`` bounds.
+
+    ``search`` is a case-insensitive substring looked up in every text
+    column. ``filters`` maps a numeric column to a ``(low, high)`` pair,
+    either of which may be None.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if search:
+        needle = search.casefold()
+        found = np.zeros(len(df), dtype=bool)
+        for col in text_columns(df):
+            values = df[col].astype(str).str.casefold()
+            found |= values.str.contains(needle, regex=False).to_numpy()
+        mask &= found
+    for col, (low, high) in (filters or {}).items():
+        values = df[col].to_numpy()
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+    return df[mask] if not mask.all() else df
+
+
+def query_table(df, search='', filters=None, sort_by=None, descending=False, page=1, page_size=TABLE_PAGE_SIZES[1]):
+    """One page of ``df`` after filtering and sorting.
+
+    Returns the page and the number of matching rows. ``page`` is 1-based
+    and clamped to the pages available.
+    """
+    matched = filter_table(df, search, filters)
+    total = len(matched)
+    pages = max(1, -(-total // page_size))
+    page = min(max(1, page), pages)
+    start = (page - 1) * page_size
+    if sort_by is not None:
+        matched = matched.sort_values(sort_by, ascending=not descending, kind='stable', na_position='last')
+    return matched.iloc[start:start + page_size], total
+
+
+def iter_csv(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield ``df`` as UTF-8 CSV, ``chunk_rows`` rows at a time."""
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0).encode('utf-8')
+
+
+def export_table(df, file_format='csv', chunk_rows=EXPORT_CHUNK_ROWS):
+    """The full table in ``file_format`` (a key of EXPORT_FORMATS), written chunk by chunk."""
+    buffer = io.BytesIO()
+    if file_format == 'csv':
+        for chunk in iter_csv(df, chunk_rows):
+            buffer.write(chunk)
+    elif file_format == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pq.ParquetWriter(buffer, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=chunk_rows):
+                writer.write_batch(batch)
+    else:
+        raise ValueError(f"Unsupported export format: {file_format}")
+    return buffer.getvalue()
@@ -0,0 +1,356 @@
+"""User-facing strings for the supported interface languages."""
+
+translations = {
+    "en": {
+        "title": "TikTok Ads Performance Analyzer",
+        "instructions": """
+        Upload one or more Excel or CSV files containing TikTok Ads data. Several files, or workbooks
+        with several sheets, are combined with one account per file and sheet. Required columns:
+        - Date Created
+        - Ad name
+        - Impressions
+        - Clicks (destination)
+        - Cost
+        - Conversions
+        Optional columns (for enhanced insights):
+        - Video views
+        - 2-second video views
+        - 6-second video views
+        - Video views at 100%
+        - Average play time per video view
+        - Landing page views (website)
+        - Landing page view rate (website)
+        """,
+        "upload_label": "Upload Excel or CSV files (one or more accounts)",
+        "streaming_mode": "Streaming mode (large files)",
+        "streaming_help": "Parse the file in chunks and keep only aggregates in memory. Use for very large exports.",
+        "compact_mode": "Memory-optimized mode",
+        "compact_help": "Keep ad names as categories and counts in narrow dtypes, and compute KPI columns only when they are aggregated. Results are unchanged.",
+        "memory_usage": "Memory usage by column",
+        "memory_total": "Total: {mb:.1f} MB",
+        "profiling_mode": "Performance instrumentation",
+        "profiling_help": "Measure wall time, rows and peak memory of each stage of the analysis. The results are shown in the Performance panel and written to the JSON logs and the Prometheus metrics file.",
+        "performance_header": "Performance",
+        "recent_datasets": "Recent datasets",
+        "recent_none": "None (upload a file)",
+        "recent_kinds": {"rows": "{rows:,} rows", "aggregates": "streamed, {rows:,} ad-days"},
+        "recent_missing": "The selected dataset is no longer available. Please upload the file again.",
+        "snapshots_label": "Published snapshots",
+        "snapshots_help": "Open a published report without the original file. Uploading a file shows its analysis instead.",
+        "snapshot_none": "None",
+        "snapshot_missing": "The selected snapshot could not be opened.",
+        "snapshot_info": "Snapshot '{name}' version {version}, published {published}.",
+        "snapshot_download_html": "Download HTML report",
+        "snapshot_download_bundle": "Download snapshot file",
+        "snapshot_publish_header": "Publish snapshot",
+        "snapshot_name": "Snapshot name",
+        "snapshot_publish": "Publish",
+        "snapshot_published": "Published snapshot '{name}' version {version}.",
+        "history_name": "Incremental history (account name)",
+        "history_help": "When set, each upload is merged into this account's stored history. Rows for an (ad, date) that is already stored are replaced, and the analysis covers the whole history.",
+        "history_updated": "History updated: {new} new and {replaced} replaced (ad, date) rows.",
+        "columns_found": "Columns found",
+        "missing_columns": "Missing required columns: {columns}",
+        "invalid_dates": "Some dates in 'Date Created' could not be parsed. Please ensure all dates are valid (e.g., YYYY-MM-DD).",
+        "invalid_rows": "Sample invalid rows:",
+        "empty_data": "No valid data remains after filtering invalid dates.",
+        "processing_error": "Error processing file: {error}",
+        "processing_check": "Please check the file format and data, then try again.",
+        "summary_header": "Performance Summary",
+        "ad_performance_header": "Ad Performance",
+        "account_performance_header": "Performance by Account",
+        "multi_file_combined": "Several files were uploaded: they are combined into one in-memory dataset with an account per file and sheet, without streaming or history.",
+        "visual_insights_header": "Visual Insights",
+        "suggestions_header": "Optimization Suggestions",
+        "no_suggestions": "No specific optimization suggestions at this time.",
+        "table": {
+            "search": "Search",
+            "sort_by": "Sort by",
+            "descending": "Descending",
+            "none": "(none)",
+            "filter_metric": "Filter by metric",
+            "min": "Minimum",
+            "max": "Maximum",
+            "page": "Page",
+            "page_size": "Rows per page",
+            "rows": "Rows {start}-{end} of {total} (page {page} of {pages})",
+            "download_csv": "Download CSV",
+            "download_parquet": "Download Parquet",
+            "prepare_downloads": "Prepare downloads"
+        },
+        "filters_header": "Filters",
+        "filter_dates": "Date range",
+        "filter_ads": "Ads",
+        "filter_ads_placeholder": "All ads",
+        "filter_metric": "Ad metric",
+        "filters_active": "Filtered view: {ads} ads from {start} to {end}.",
+        "filters_no_match": "No rows match the current filters; showing the full dataset.",
+        "filters_unavailable": "Filters are unavailable because this dataset is no longer cached or stored.",
+        "progress": {
+            "waiting": "Starting the analysis...",
+            "queued": "Waiting for a free worker ({ahead} jobs ahead)...",
+            "parse sources": "Parsing the uploaded files...",
+            "read": "Reading the export...",
+            "stream": "Streaming the export...",
+            "columns": "Detecting columns...",
+            "dates": "Parsing dates...",
+            "numeric": "Converting metrics...",
+            "compact": "Compacting rows...",
+            "kpis": "Computing KPIs...",
+            "aggregate": "Aggregating totals and ads...",
+            "trends": "Detecting anomalies and trends...",
+            "build figures": "Building charts...",
+            "suggestions": "Preparing suggestions..."
+        },
+        "thresholds_header": "Suggestion thresholds",
+        "metrics": {
+            "total_impressions": "Total Impressions",
+            "total_clicks": "Total Clicks",
+            "total_cost": "Total Cost",
+            "total_conversions": "Total Conversions",
+            "total_video_views": "Total Video Views",
+            "total_landing_page_views": "Total Landing Page Views",
+            "avg_ctr": "Average CTR",
+            "avg_cpm": "Average CPM",
+            "avg_conversion_rate": "Average Conversion Rate",
+            "avg_cost_per_conversion": "Average Cost per Conversion",
+            "avg_6s_view_rate": "Average 6s Video View Rate",
+            "avg_landing_page_view_rate": "Average Landing Page View Rate"
+        },
+        "chart_titles": {
+            "impressions_clicks": "Impressions and Clicks Over Time",
+            "performance_metrics": "Performance Metrics by Ad",
+            "cost_distribution": "Cost Distribution by Ad",
+            "video_engagement": "Video Engagement by Ad",
+            "account_performance": "Cost and CTR by Account"
+        },
+        "chart_labels": {
+            "date": "Date",
+            "account": "Account",
+            "impressions": "Impressions",
+            "clicks": "Clicks",
+            "ad_name": "Ad Name",
+            "percentage": "Percentage (%)",
+            "cost": "Cost",
+            "count": "Count",
+            "ctr": "CTR (%)",
+            "conversion_rate": "Conversion Rate (%)",
+            "6s_view_rate": "6s Video View Rate (%)",
+            "landing_page_view_rate": "Landing Page View Rate (%)",
+            "video_views": "Video Views",
+            "6s_video_views": "6s Video Views",
+            "other": "Other",
+            "daily": "daily",
+            "weekly": "weekly",
+            "monthly": "monthly"
+        },
+        "suggestions": {
+            "low_ctr": {"issue": "Low campaign CTR", "text": "Average CTR is below {threshold}%. Test TikTok-native formats like Spark Ads or refine audience targeting."},
+            "high_cpm": {"issue": "High CPM", "text": "Average CPM exceeds ${threshold}. Consider CPC or oCPM bidding strategies."},
+            "low_conversion_rate": {"issue": "Low conversion rate", "text": "Conversion rate is below {threshold}%. Optimize landing pages for mobile and ensure clear CTAs."},
+            "high_cost_per_conversion": {"issue": "High cost per conversion", "text": "Cost per conversion is high. Pause low-performing ads and reallocate budget."},
+            "low_6s_view_rate": {"issue": "Low 6-second video view rate", "text": "Average 6-second video view rate is below {threshold}%. Improve video hooks in the first 3 seconds."},
+            "low_landing_page_view_rate": {"issue": "Low landing page view rate", "text": "Average landing page view rate is below {threshold}%. Enhance ad creatives or landing page relevance."},
+            "ad_low_ctr": {"issue": "Low ad CTR", "text": "Ad '{ad_name}': Low CTR ({ctr}%). Test new visuals or ad copy."},
+            "ad_low_6s_view_rate": {"issue": "Low ad 6-second view rate", "text": "Ad '{ad_name}': Low 6-second view rate ({rate}%). Shorten intros or add engaging hooks."},
+            "ad_low_landing_page_view_rate": {"issue": "Low ad landing page view rate", "text": "Ad '{ad_name}': Low landing page view rate ({rate}%). Ensure ad and landing page alignment."},
+            "ad_ctr_drop": {"issue": "Ad CTR dropped", "text": "Ad '{ad_name}': CTR on the latest day is {value} standard deviations below its recent baseline. Check for creative fatigue or delivery changes."},
+            "ad_ctr_decline": {"issue": "Declining ad CTR", "text": "Ad '{ad_name}': CTR is falling by {value}% per day. Refresh the creative before it fatigues further."},
+            "ad_cpm_spike": {"issue": "Ad CPM spike", "text": "Ad '{ad_name}': CPM on the latest day is {value} standard deviations above its recent baseline. Review bids and audience overlap."},
+            "ad_cpm_rise": {"issue": "Rising ad CPM", "text": "Ad '{ad_name}': CPM is rising by {value}% per day. Broaden targeting or revisit the bidding strategy."},
+            "ad_cvr_drop": {"issue": "Ad conversion rate dropped", "text": "Ad '{ad_name}': Conversion rate on the latest day is {value} standard deviations below its recent baseline. Check the landing page and conversion tracking."},
+            "ad_cvr_decline": {"issue": "Declining ad conversion rate", "text": "Ad '{ad_name}': Conversion rate is falling by {value}% per day. Review the offer and landing page."},
+            "ad_cost_per_conversion_spike": {"issue": "Ad cost per conversion spike", "text": "Ad '{ad_name}': Cost per conversion on the latest day is {value} standard deviations above its recent baseline. Consider lowering its budget."},
+            "ad_cost_per_conversion_rise": {"issue": "Rising ad cost per conversion", "text": "Ad '{ad_name}': Cost per conversion is rising by {value}% per day. Reallocate budget to more efficient ads."}
+        },
+        "suggestions_table": {
+            "ad_name": "Ad Name",
+            "issue": "Issue",
+            "suggestion": "Suggestion",
+            "priority": "Priority",
+            "general": "General",
+            "high": "High",
+            "medium": "Medium",
+            "low": "Low"
+        },
+        "language_label": "Language",
+        "english": "English",
+        "arabic": "Arabic"
+    },
+    "ar": {
+        "title": "محلل أداء إعلانات تيك توك",
+        "instructions": """
+        قم برفع ملف أو أكثر من ملفات إكسل أو CSV تحتوي على بيانات إعلانات تيك توك. يتم دمج الملفات المتعددة
+        أو المصنفات ذات الأوراق المتعددة مع حساب لكل ملف وورقة. الأعمدة المطلوبة:
+        - تاريخ الإنشاء
+        - اسم الإعلان
+        - الانطباعات
+        - النقرات (الوجهة)
+        - التكلفة
+        - التحويلات
+        الأعمدة الاختيارية (لرؤى محسنة):
+        - مشاهدات الفيديو
+        - مشاهدات الفيديو لمدة ثانيتين
+        - مشاهدات الفيديو لمدة 6 ثوانٍ
+        - مشاهدات الفيديو بنسبة 100%
+        - متوسط وقت التشغيل لكل مشاهدة فيديو
+        - مشاهدات صفحة الهبوط (الموقع)
+        - معدل مشاهدة صفحة الهبوط (الموقع)
+        """,
+        "upload_label": "رفع ملفات إكسل أو CSV (حساب واحد أو أكثر)",
+        "streaming_mode": "وضع المعالجة المتدفقة (ملفات كبيرة)",
+        "streaming_help": "معالجة الملف على دفعات والاحتفاظ بالإجماليات فقط في الذاكرة. استخدمه لملفات التصدير الكبيرة جدًا.",
+        "compact_mode": "وضع توفير الذاكرة",
+        "compact_help": "الاحتفاظ بأسماء الإعلانات كفئات والأعداد بأنواع بيانات ضيقة، وحساب أعمدة مؤشرات الأداء عند التجميع فقط. النتائج لا تتغير.",
+        "memory_usage": "استخدام الذاكرة حسب العمود",
+        "memory_total": "الإجمالي: {mb:.1f} ميغابايت",
+        "profiling_mode": "قياس الأداء",
+        "profiling_help": "قياس الوقت وعدد الصفوف وذروة الذاكرة لكل مرحلة من مراحل التحليل. تظهر النتائج في لوحة الأداء وتُكتب في سجلات JSON وملف مقاييس Prometheus.",
+        "performance_header": "الأداء",
+        "recent_datasets": "مجموعات البيانات الأخيرة",
+        "recent_none": "لا شيء (رفع ملف)",
+        "recent_kinds": {"rows": "{rows:,} صف", "aggregates": "متدفق، {rows:,} يوم إعلاني"},
+        "recent_missing": "مجموعة البيانات المحددة لم تعد متاحة. يرجى رفع الملف مرة أخرى.",
+        "snapshots_label": "اللقطات المنشورة",
+        "snapshots_help": "افتح تقريرًا منشورًا دون الملف الأصلي. عند رفع ملف يُعرض تحليله بدلًا من ذلك.",
+        "snapshot_none": "لا شيء",
+        "snapshot_missing": "تعذر فتح اللقطة المحددة.",
+        "snapshot_info": "اللقطة '{name}' الإصدار {version}، نُشرت في {published}.",
+        "snapshot_download_html": "تنزيل تقرير HTML",
+        "snapshot_download_bundle": "تنزيل ملف اللقطة",
+        "snapshot_publish_header": "نشر لقطة",
+        "snapshot_name": "اسم اللقطة",
+        "snapshot_publish": "نشر",
+        "snapshot_published": "تم نشر اللقطة '{name}' الإصدار {version}.",
+        "history_name": "السجل التراكمي (اسم الحساب)",
+        "history_help": "عند التعيين، يتم دمج كل ملف مرفوع في السجل المخزن لهذا الحساب. تُستبدل الصفوف المخزنة مسبقًا لنفس (الإعلان، التاريخ)، ويغطي التحليل السجل بالكامل.",
+        "history_updated": "تم تحديث السجل: {new} صفوف جديدة و{replaced} صفوف مستبدلة (الإعلان، التاريخ).",
+        "columns_found": "الأعمدة الموجودة",
+        "missing_columns": "الأعمدة المطلوبة المفقودة: {columns}",
+        "invalid_dates": "تعذر تحليل بعض التواريخ في 'تاريخ الإنشاء'. يرجى التأكد من أن جميع التواريخ صالحة (مثل، YYYY-MM-DD).",
+        "invalid_rows": "عينة من الصفوف غير الصالحة:",
+        "empty_data": "لا توجد بيانات صالحة متبقية بعد تصفية التواريخ غير الصالحة.",
+        "processing_error": "خطأ في معالجة الملف: {error}",
+        "processing_check": "يرجى التحقق من تنسيق الملف والبيانات، ثم حاول مرة أخرى.",
+        "summary_header": "ملخص الأداء",
+        "ad_performance_header": "أداء الإعلان",
+        "account_performance_header": "الأداء حسب الحساب",
+        "multi_file_combined": "تم رفع عدة ملفات: يتم دمجها في مجموعة بيانات واحدة في الذاكرة مع حساب لكل ملف وورقة، بدون المعالجة على دفعات أو السجل.",
+        "visual_insights_header": "رؤى بصرية",
+        "suggestions_header": "اقتراحات التحسين",
+        "no_suggestions": "لا توجد اقتراحات تحسين محددة في الوقت الحالي.",
+        "table": {
+            "search": "بحث",
+            "sort_by": "ترتيب حسب",
+            "descending": "تنازلي",
+            "none": "(بدون)",
+            "filter_metric": "تصفية حسب المقياس",
+            "min": "الحد الأدنى",
+            "max": "الحد الأقصى",
+            "page": "الصفحة",
+            "page_size": "صفوف لكل صفحة",
+            "rows": "الصفوف {start}-{end} من {total} (الصفحة {page} من {pages})",
+            "download_csv": "تنزيل CSV",
+            "download_parquet": "تنزيل Parquet",
+            "prepare_downloads": "تجهيز التنزيلات"
+        },
+        "filters_header": "عوامل التصفية",
+        "filter_dates": "نطاق التاريخ",
+        "filter_ads": "الإعلانات",
+        "filter_ads_placeholder": "كل الإعلانات",
+        "filter_metric": "مقياس الإعلان",
+        "filters_active": "عرض مُصفّى: {ads} إعلان من {start} إلى {end}.",
+        "filters_no_match": "لا توجد صفوف تطابق عوامل التصفية الحالية؛ يتم عرض مجموعة البيانات كاملة.",
+        "filters_unavailable": "عوامل التصفية غير متاحة لأن مجموعة البيانات هذه لم تعد مخزنة مؤقتًا أو محفوظة.",
+        "progress": {
+            "waiting": "جارٍ بدء التحليل...",
+            "queued": "في انتظار عامل متاح ({ahead} مهام قبلها)...",
+            "parse sources": "جارٍ تحليل الملفات المرفوعة...",
+            "read": "جارٍ قراءة الملف...",
+            "stream": "جارٍ قراءة الملف على دفعات...",
+            "columns": "جارٍ التعرف على الأعمدة...",
+            "dates": "جارٍ تحليل التواريخ...",
+            "numeric": "جارٍ تحويل المقاييس...",
+            "compact": "جارٍ ضغط الصفوف...",
+            "kpis": "جارٍ حساب مؤشرات الأداء...",
+            "aggregate": "جارٍ تجميع الإجماليات والإعلانات...",
+            "trends": "جارٍ رصد الحالات الشاذة والاتجاهات...",
+            "build figures": "جارٍ إنشاء الرسوم البيانية...",
+            "suggestions": "جارٍ إعداد الاقتراحات..."
+        },
+        "thresholds_header": "حدود الاقتراحات",
+        "metrics": {
+            "total_impressions": "إجمالي الانطباعات",
+            "total_clicks": "إجمالي النقرات",
+            "total_cost": "إجمالي التكلفة",
+            "total_conversions": "إجمالي التحويلات",
+            "total_video_views": "إجمالي مشاهدات الفيديو",
+            "total_landing_page_views": "إجمالي مشاهدات صفحة الهبوط",
+            "avg_ctr": "متوسط نسبة النقر إلى الظهور",
+            "avg_cpm": "متوسط التكلفة لكل ألف ظهور",
+            "avg_conversion_rate": "متوسط معدل التحويل",
+            "avg_cost_per_conversion": "متوسط التكلفة لكل تحويل",
+            "avg_6s_view_rate": "متوسط معدل مشاهدة الفيديو لمدة 6 ثوانٍ",
+            "avg_landing_page_view_rate": "متوسط معدل مشاهدة صفحة الهبوط"
+        },
+        "chart_titles": {
+            "impressions_clicks": "الانطباعات والنقرات عبر الزمن",
+            "performance_metrics": "مقاييس الأداء حسب الإعلان",
+            "cost_distribution": "توزيع التكلفة حسب الإعلان",
+            "video_engagement": "تفاعل الفيديو حسب الإعلان",
+            "account_performance": "التكلفة ونسبة النقر حسب الحساب"
+        },
+        "chart_labels": {
+            "date": "التاريخ",
+            "account": "الحساب",
+            "impressions": "الانطباعات",
+            "clicks": "النقرات",
+            "ad_name": "اسم الإعلان",
+            "percentage": "النسبة المئوية (%)",
+            "cost": "التكلفة",
+            "count": "العدد",
+            "ctr": "نسبة النقر إلى الظهور (%)",
+            "conversion_rate": "معدل التحويل (%)",
+            "6s_view_rate": "معدل مشاهدة الفيديو لمدة 6 ثوانٍ (%)",
+            "landing_page_view_rate": "معدل مشاهدة صفحة الهبوط (%)",
+            "video_views": "مشاهدات الفيديو",
+            "6s_video_views": "مشاهدات الفيديو لمدة 6 ثوانٍ",
+            "other": "أخرى",
+            "daily": "يومي",
+            "weekly": "أسبوعي",
+            "monthly": "شهري"
+        },
+        "suggestions": {
+            "low_ctr": {"issue": "نسبة نقر إلى ظهور منخفضة للحملة", "text": "متوسط نسبة النقر إلى الظهور أقل من {threshold}%. جرب تنسيقات تيك توك الأصلية مثل Spark Ads أو قم بتحسين استهداف الجمهور."},
+            "high_cpm": {"issue": "تكلفة مرتفعة لكل ألف ظهور", "text": "متوسط التكلفة لكل ألف ظهور يتجاوز {threshold} دولارات. فكر في استراتيجيات العطاء بناءً على التكلفة لكل نقرة أو التكلفة المثلى لكل ألف ظهور."},
+            "low_conversion_rate": {"issue": "معدل تحويل منخفض", "text": "معدل التحويل أقل من {threshold}%. قم بتحسين صفحات الهبوط للأجهزة المحمولة وتأكد من وضوح دعوات الإجراء."},
+            "high_cost_per_conversion": {"issue": "تكلفة مرتفعة لكل تحويل", "text": "تكلفة التحويل مرتفعة. أوقف الإعلانات ذات الأداء المنخفض وأعد تخصيص الميزانية."},
+            "low_6s_view_rate": {"issue": "معدل مشاهدة فيديو منخفض لمدة 6 ثوانٍ", "text": "متوسط معدل مشاهدة الفيديو لمدة 6 ثوانٍ أقل من {threshold}%. حسّن خطافات الفيديو في أول 3 ثوانٍ."},
+            "low_landing_page_view_rate": {"issue": "معدل مشاهدة صفحة هبوط منخفض", "text": "متوسط معدل مشاهدة صفحة الهبوط أقل من {threshold}%. عزز الإبداعات الإعلانية أو صلة صفحة الهبوط."},
+            "ad_low_ctr": {"issue": "نسبة نقر إلى ظهور منخفضة للإعلان", "text": "الإعلان '{ad_name}': نسبة نقر إلى ظهور منخفضة ({ctr}%). جرب صورًا بصرية أو نصوص إعلانية جديدة."},
+            "ad_low_6s_view_rate": {"issue": "معدل مشاهدة فيديو منخفض للإعلان لمدة 6 ثوانٍ", "text": "الإعلان '{ad_name}': معدل مشاهدة الفيديو لمدة 6 ثوانٍ منخفض ({rate}%). قم بتقصير المقدمات أو أضف خطافات جذابة."},
+            "ad_low_landing_page_view_rate": {"issue": "معدل مشاهدة صفحة هبوط منخفض للإعلان", "text": "الإعلان '{ad_name}': معدل مشاهدة صفحة الهبوط منخفض ({rate}%). تأكد من توافق الإعلان وصفحة الهبوط."},
+            "ad_ctr_drop": {"issue": "انخفاض مفاجئ في نسبة النقر إلى الظهور للإعلان", "text": "الإعلان '{ad_name}': نسبة النقر إلى الظهور في آخر يوم أقل من خط الأساس الأخير بمقدار {value} انحراف معياري. تحقق من إرهاق الإبداع أو تغييرات العرض."},
+            "ad_ctr_decline": {"issue": "تراجع نسبة النقر إلى الظهور للإعلان", "text": "الإعلان '{ad_name}': نسبة النقر إلى الظهور تنخفض بنسبة {value}% يوميًا. جدد الإبداع قبل أن يزداد إرهاقه."},
+            "ad_cpm_spike": {"issue": "ارتفاع مفاجئ في التكلفة لكل ألف ظهور للإعلان", "text": "الإعلان '{ad_name}': التكلفة لكل ألف ظهور في آخر يوم أعلى من خط الأساس الأخير بمقدار {value} انحراف معياري. راجع العطاءات وتداخل الجماهير."},
+            "ad_cpm_rise": {"issue": "تزايد التكلفة لكل ألف ظهور للإعلان", "text": "الإعلان '{ad_name}': التكلفة لكل ألف ظهور ترتفع بنسبة {value}% يوميًا. وسّع الاستهداف أو أعد النظر في استراتيجية العطاء."},
+            "ad_cvr_drop": {"issue": "انخفاض مفاجئ في معدل التحويل للإعلان", "text": "الإعلان '{ad_name}': معدل التحويل في آخر يوم أقل من خط الأساس الأخير بمقدار {value} انحراف معياري. تحقق من صفحة الهبوط وتتبع التحويلات."},
+            "ad_cvr_decline": {"issue": "تراجع معدل التحويل للإعلان", "text": "الإعلان '{ad_name}': معدل التحويل ينخفض بنسبة {value}% يوميًا. راجع العرض وصفحة الهبوط."},
+            "ad_cost_per_conversion_spike": {"issue": "ارتفاع مفاجئ في تكلفة التحويل للإعلان", "text": "الإعلان '{ad_name}': تكلفة التحويل في آخر يوم أعلى من خط الأساس الأخير بمقدار {value} انحراف معياري. فكر في خفض ميزانيته."},
+            "ad_cost_per_conversion_rise": {"issue": "تزايد تكلفة التحويل للإعلان", "text": "الإعلان '{ad_name}': تكلفة التحويل ترتفع بنسبة {value}% يوميًا. أعد تخصيص الميزانية للإعلانات الأكثر كفاءة."}
+        },
+        "suggestions_table": {
+            "ad_name": "اسم الإعلان",
+            "issue": "المشكلة",
+            "suggestion": "الاقتراح",
+            "priority": "الأولوية",
+            "general": "عام",
+            "high": "عالية",
+            "medium": "متوسطة",
+            "low": "منخفضة"
+        },
+        "language_label": "اللغة",
+        "english": "الإنجليزية",
+        "arabic": "العربية"
+    }
+}
@@ -0,0 +1,175 @@
+"""Per-ad anomaly and trend scores of daily KPIs from a (date x ad) cube.
+
+The additive measures of the last BASELINE_DAYS + 1 calendar days are laid
+out as (day x ad) matrices with one bincount per measure, and every KPI is
+scored for all ads at once with column-wise reductions:
+
+- ``<KPI> anomaly``: z-score of the latest day against the mean and standard
+  deviation of the BASELINE_DAYS days before it.
+- ``<KPI> trend``: least-squares slope over the last TREND_DAYS days, in
+  percent of the KPI's mean per day.
+
+Every score comes with a Student t test. Thousands of ads are tested at
+once, so per KPI and score only the ads the Benjamini-Hochberg procedure
+accepts at FALSE_DISCOVERY_RATE keep their score; on pure noise almost
+none do.
+
+Both are signed so that positive values are the bad direction (a CTR drop,
+a CPM rise), which the 'trend' suggestion rules compare with thresholds.
+Days whose KPI denominator is below MIN_DAILY_VOLUME count as missing.
+"""
+import numpy as np
+import pandas as pd
+
+from adanalyze.engine import ad_labels
+from adanalyze.instrumentation import stage
+
+# KPI: (numerator, denominator, scale, direction that is bad)
+TREND_METRICS = {
+    'CTR (destination)': ('Clicks (destination)', 'Impressions', 100, 'below'),
+    'CPM': ('Cost', 'Impressions', 1000, 'above'),
+    'Conversion rate (CVR)': ('Conversions', 'Clicks (destination)', 100, 'below'),
+    'Cost per conversion': ('Cost', 'Conversions', 1, 'above'),
+}
+# Smallest daily denominator for a KPI to be meaningful on that day
+MIN_DAILY_VOLUME = {'Impressions': 100, 'Clicks (destination)': 20, 'Conversions': 5}
+BASELINE_DAYS = 14
+TREND_DAYS = 14
+# Days with a KPI a baseline or trend needs to be scored
+MIN_OBSERVED_DAYS = 7
+# Baseline deviations below this share of the baseline mean are treated as this share
+MIN_RELATIVE_STD = 0.05
+# Expected share of false alarms among the scores kept per KPI
+FALSE_DISCOVERY_RATE = 0.05
+ANOMALY_SUFFIX = ' anomaly'
+TREND_SUFFIX = ' trend'
+
+
+def daily_matrices(cube, columns, end=None, days=BASELINE_DAYS + 1):
+    """(day x ad) sums of ``columns`` over the last ``days`` calendar days up to ``end``.
+
+    Returns ``{column: matrix}``, or None when the cube has no cell up to ``end``.
+    Calendar days without a cell are rows of zeros.
+    """
+    lo, hi = cube.date_range(None, end)
+    if hi <= lo:
+        return None
+    day_numbers = cube.dates[lo:hi].astype('datetime64[D]')
+    offsets = (day_numbers - day_numbers.max()).astype(np.int64) + days - 1
+    ad_codes = cube.ad_codes[lo:hi]
+    # Cells before the window or without an ad
+    inside = (offsets >= 0) & (ad_codes >= 0)
+    cells = offsets[inside] * len(cube.ads) + ad_codes[inside]
+    size = days * len(cube.ads)
+    values = cube.values[:, lo:hi][:, inside]
+    return {
+        col: np.bincount(cells, weights=values[cube.columns.index(col)], minlength=size).reshape(days, len(cube.ads))
+        for col in columns
+    }
+
+
+def _observed_stats(values):
+    """Column-wise count, mean and sample standard deviation of the non-NaN ``values``."""
+    observed = ~np.isnan(values)
+    count = observed.sum(axis=0)
+    mean = np.where(observed, values, 0).sum(axis=0) / count
+    deviations = np.where(observed, values - mean, 0)
+    std = np.sqrt((deviations ** 2).sum(axis=0) / (count - 1))
+    return count, mean, std
+
+
+def _slopes(values):
+    """Column-wise least-squares slope of the non-NaN ``values`` per row, its t-statistic, and their count and mean."""
+    observed = ~np.isnan(values)
+    count = observed.sum(axis=0)
+    x = np.arange(len(values), dtype=np.float64)[:, None]
+    x_mean = np.where(observed, x, 0).sum(axis=0) / count
+    y_mean = np.where(observed, values, 0).sum(axis=0) / count
+    dx = np.where(observed, x - x_mean, 0)
+    dy = np.where(observed, values - y_mean, 0)
+    spread = (dx ** 2).sum(axis=0)
+    slope = (dx * dy).sum(axis=0) / spread
+    residuals = ((dy - slope * dx) ** 2).sum(axis=0) / (count - 2)
+    return slope, slope / np.sqrt(residuals / spread), count, y_mean
+
+
+def t_test_p(t, df):
+    """Two-sided p-values of Student t statistics ``t`` with integer ``df`` >= 1 degrees of freedom.
+
+    Uses the closed-form series of Abramowitz and Stegun 26.7.3 and 26.7.4,
+    one pass per distinct ``df``. NaN where ``t`` or ``df`` is missing.
+    """
+    t, df = np.broadcast_arrays(np.abs(np.asarray(t, dtype=np.float64)), np.asarray(df))
+    p = np.full(t.shape, np.nan)
+    valid = ~np.isnan(t) & (df >= 1)
+    for nu in np.unique(df[valid]).astype(int):
+        selected = valid & (df == nu)
+        theta = np.arctan(t[selected] / np.sqrt(nu))
+        cos2 = np.cos(theta) ** 2
+        term = np.ones_like(theta)
+        series = np.ones_like(theta)
+        if nu % 2:
+            for k in range(1, (nu - 1) // 2):
+                term = term * cos2 * (2 * k) / (2 * k + 1)
+                series += term
+            within = 2 / np.pi * (theta + (np.sin(theta) * np.cos(theta) * series if nu > 1 else 0))
+        else:
+            for k in range(1, nu // 2):
+                term = term * cos2 * (2 * k - 1) / (2 * k)
+                series += term
+            within = np.sin(theta) * series
+        p[selected] = 1 - within
+    return p
+
+
+def discoveries(p, rate=FALSE_DISCOVERY_RATE):
+    """Mask of the p-values the Benjamini-Hochberg procedure rejects at false discovery ``rate``; NaN is not tested."""
+    tested = ~np.isnan(p)
+    ranked = np.sort(p[tested])
+    passing = np.flatnonzero(ranked <= rate * np.arange(1, len(ranked) + 1) / max(len(ranked), 1))
+    if not len(passing):
+        return np.zeros(p.shape, dtype=bool)
+    return tested & (p <= ranked[passing[-1]])
+
+
+def score_matrices(matrices):
+    """Anomaly and trend score arrays per TREND_METRICS KPI of daily_matrices output, NaN where not scored or not significant."""
+    scores = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for kpi, (numerator, denominator, scale, bad) in TREND_METRICS.items():
+            if numerator not in matrices or denominator not in matrices:
+                continue
+            volume = matrices[denominator]
+            values = np.where(volume >= MIN_DAILY_VOLUME[denominator], matrices[numerator] / volume * scale, np.nan)
+            sign = -1 if bad == 'below' else 1
+
+            count, mean, std = _observed_stats(values[:-1])
+            std = np.maximum(std, MIN_RELATIVE_STD * np.abs(mean))
+            z = np.where((count >= MIN_OBSERVED_DAYS) & (std > 0), (values[-1] - mean) / std, np.nan)
+            # A new day against a mean and deviation estimated from ``count`` days
+            p = t_test_p(z / np.sqrt(1 + 1 / count), count - 1)
+            scores[kpi + ANOMALY_SUFFIX] = np.where(discoveries(p), sign * z, np.nan)
+
+            slope, t, count, trend_mean = _slopes(values[-TREND_DAYS:])
+            percent = slope / np.abs(trend_mean) * 100
+            t = np.where((count >= MIN_OBSERVED_DAYS) & (trend_mean != 0), t, np.nan)
+            scores[kpi + TREND_SUFFIX] = np.where(discoveries(t_test_p(t, count - 2)), sign * percent, np.nan)
+    return scores
+
+
+def ad_trends(cube, ad_summary, end=None):
+    """Anomaly and trend scores of the ads in ``ad_summary``, rounded like it and sharing its index.
+
+    ``end`` is the last day scored (the cube's last day by default). Ads
+    missing from the cube get NaN scores.
+    """
+    with stage('trends') as record:
+        record.rows = len(cube)
+        columns = {col for numerator, denominator, _, _ in TREND_METRICS.values() for col in (numerator, denominator)}
+        matrices = daily_matrices(cube, [col for col in cube.columns if col in columns], end)
+        scores = score_matrices(matrices) if matrices is not None else {}
+        # Rows of ad_summary in the cube's ad order
+        positions = pd.Index(cube.labels).get_indexer(ad_labels(ad_summary).astype(str))
+        found = positions >= 0
+        table = {name: np.where(found, values[positions], np.nan) for name, values in scores.items()}
+        return pd.DataFrame(table, index=ad_summary.index).round(2)
@@ -1,199 +1,753 @@
+import contextlib
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import numpy as np
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from adanalyze.charts import build_figures
+from adanalyze.cube import cube_from_aggregates, cube_from_rows
+from adanalyze.engine import (
+    AD_SUMMARY_COLUMNS, ANALYSIS_COLUMNS, STREAM_CHUNK_ROWS, SUGGESTION_RULES, EmptyDataError, InvalidDatesError,
+    MissingColumnsError, ad_labels, add_kpi_columns, compact_frame, evaluate_rules, format_metrics, format_suggestions, memory_report,
+    stream_aggregates, summarize_accounts, summarize_aggregates, summarize_frame, upload_format, with_thresholds,
+)
+from adanalyze.history import AggregateHistory, history_path
+from adanalyze.instrumentation import PROFILE_ALWAYS, Profiler, attach_records, fold_records, stage
+from adanalyze.jobs import JobQueue
+from adanalyze.snapshots import SnapshotStore, build_snapshot, snapshot_html
+from adanalyze.sources import SOURCE_WORKERS, parse_sources
+from adanalyze.storage import DatasetStore, IngestCache, dataset_key, name_slug
+from adanalyze.tables import EXPORT_FORMATS, TABLE_PAGE_SIZES, export_table, filter_table, query_table, text_columns
+from adanalyze.trends import ad_trends
+from adanalyze.translations import translations
+
+logger = logging.getLogger(__name__)
+
+# Per-language renders (figures, suggestion tables) kept across reruns and sessions
+RENDER_CACHE_ENTRIES = 32
+# Upload hashes remembered per session, so reruns do not rehash the bytes
+UPLOAD_KEYS_PER_SESSION = 8
+# Seconds between progress updates while the analysis runs in the background
+JOB_POLL_SECONDS = 0.1
+# Stages shown by the progress bar, in pipeline order; the last three are rendered by the script
+PROGRESS_STAGES = [
+    'parse sources', 'read', 'stream', 'columns', 'dates', 'numeric', 'compact', 'kpis', 'aggregate',
+    'build figures', 'trends', 'suggestions',
+]
 
 # Set page configuration
 st.set_page_config(page_title="TikTok Ads Performance Analyzer", layout="wide")
 
-# Translation dictionaries
-translations = {
-    "en": {
-        "title": "TikTok Ads Performance Analyzer",
-        "instructions": """
-        Upload an Excel file containing TikTok Ads data. Required columns:
-        - Date Created
-        - Ad name
-        - Impressions
-        - Clicks (destination)
-        - Cost
-        - Conversions
-        Optional columns (for enhanced insights):
-        - Video views
-        - 2-second video views
-        - 6-second video views
-        - Video views at 100%
-        - Average play time per video view
-        - Landing page views (website)
-        - Landing page view rate (website)
-        """,
-        "upload_label": "Upload Excel file",
-        "columns_found": "Columns found",
-        "missing_columns": "Missing required columns: {columns}",
-        "invalid_dates": "Some dates in 'Date Created' could not be parsed. Please ensure all dates are valid (e.g., YYYY-MM-DD).",
-        "invalid_rows": "Sample invalid rows:",
-        "empty_data": "No valid data remains after filtering invalid dates.",
-        "processing_error": "Error processing file: {error}",
-        "processing_check": "Please check the file format and data, then try again.",
-        "summary_header": "Performance Summary",
-        "ad_performance_header": "Ad Performance",
-        "visual_insights_header": "Visual Insights",
-        "suggestions_header": "Optimization Suggestions",
-        "no_suggestions": "No specific optimization suggestions at this time.",
-        "metrics": {
-            "total_impressions": "Total Impressions",
-            "total_clicks": "Total Clicks",
-            "total_cost": "Total Cost",
-            "total_conversions": "Total Conversions",
-            "total_video_views": "Total Video Views",
-            "total_landing_page_views": "Total Landing Page Views",
-            "avg_ctr": "Average CTR",
-            "avg_cpm": "Average CPM",
-            "avg_conversion_rate": "Average Conversion Rate",
-            "avg_cost_per_conversion": "Average Cost per Conversion",
-            "avg_6s_view_rate": "Average 6s Video View Rate",
-            "avg_landing_page_view_rate": "Average Landing Page View Rate"
-        },
-        "chart_titles": {
-            "impressions_clicks": "Impressions and Clicks Over Time",
-            "performance_metrics": "Performance Metrics by Ad",
-            "cost_distribution": "Cost Distribution by Ad",
-            "video_engagement": "Video Engagement by Ad"
-        },
-        "chart_labels": {
-            "date": "Date",
-            "impressions": "Impressions",
-            "clicks": "Clicks",
-            "ad_name": "Ad Name",
-            "percentage": "Percentage (%)",
-            "cost": "Cost",
-            "count": "Count",
-            "ctr": "CTR (%)",
-            "conversion_rate": "Conversion Rate (%)",
-            "6s_view_rate": "6s Video View Rate (%)",
-            "landing_page_view_rate": "Landing Page View Rate (%)",
-            "video_views": "Video Views",
-            "6s_video_views": "6s Video Views"
-        },
-        "suggestions": {
-            "low_ctr": {"issue": "Low campaign CTR", "text": "Average CTR is below 1%. Test TikTok-native formats like Spark Ads or refine audience targeting."},
-            "high_cpm": {"issue": "High CPM", "text": "Average CPM exceeds $10. Consider CPC or oCPM bidding strategies."},
-            "low_conversion_rate": {"issue": "Low conversion rate", "text": "Conversion rate is below 2%. Optimize landing pages for mobile and ensure clear CTAs."},
-            "high_cost_per_conversion": {"issue": "High cost per conversion", "text": "Cost per conversion is high. Pause low-performing ads and reallocate budget."},
-            "low_6s_view_rate": {"issue": "Low 6-second video view rate", "text": "Average 6-second video view rate is below 10%. Improve video hooks in the first 3 seconds."},
-            "low_landing_page_view_rate": {"issue": "Low landing page view rate", "text": "Average landing page view rate is below 20%. Enhance ad creatives or landing page relevance."},
-            "ad_low_ctr": {"issue": "Low ad CTR", "text": "Ad '{ad_name}': Low CTR ({ctr}%). Test new visuals or ad copy."},
-            "ad_low_6s_view_rate": {"issue": "Low ad 6-second view rate", "text": "Ad '{ad_name}': Low 6-second view rate ({rate}%). Shorten intros or add engaging hooks."},
-            "ad_low_landing_page_view_rate": {"issue": "Low ad landing page view rate", "text": "Ad '{ad_name}': Low landing page view rate ({rate}%). Ensure ad and landing page alignment."}
-        },
-        "suggestions_table": {
-            "ad_name": "Ad Name",
-            "issue": "Issue",
-            "suggestion": "Suggestion",
-            "priority": "Priority",
-            "general": "General",
-            "high": "High",
-            "medium": "Medium",
-            "low": "Low"
-        },
-        "language_label": "Language",
-        "english": "English",
-        "arabic": "Arabic"
-    },
-    "ar": {
-        "title": "محلل أداء إعلانات تيك توك",
-        "instructions": """
-        قم برفع ملف إكسل يحتوي على بيانات إعلانات تيك توك. الأعمدة المطلوبة:
-        - تاريخ الإنشاء
-        - اسم الإعلان
-        - الانطباعات
-        - النقرات (الوجهة)
-        - التكلفة
-        - التحويلات
-        الأعمدة الاختيارية (لرؤى محسنة):
-        - مشاهدات الفيديو
-        - مشاهدات الفيديو لمدة ثانيتين
-        - مشاهدات الفيديو لمدة 6 ثوانٍ
-        - مشاهدات الفيديو بنسبة 100%
-        - متوسط وقت التشغيل لكل مشاهدة فيديو
-        - مشاهدات صفحة الهبوط (الموقع)
-        - معدل مشاهدة صفحة الهبوط (الموقع)
-        """,
-        "upload_label": "رفع ملف إكسل",
-        "columns_found": "الأعمدة الموجودة",
-        "missing_columns": "الأعمدة المطلوبة المفقودة: {columns}",
-        "invalid_dates": "تعذر تحليل بعض التواريخ في 'تاريخ الإنشاء'. يرجى التأكد من أن جميع التواريخ صالحة (مثل، YYYY-MM-DD).",
-        "invalid_rows": "عينة من الصفوف غير الصالحة:",
-        "empty_data": "لا توجد بيانات صالحة متبقية بعد تصفية التواريخ غير الصالحة.",
-        "processing_error": "خطأ في معالجة الملف: {error}",
-        "processing_check": "يرجى التحقق من تنسيق الملف والبيانات، ثم حاول مرة أخرى.",
-        "summary_header": "ملخص الأداء",
-        "ad_performance_header": "أداء الإعلان",
-        "visual_insights_header": "رؤى بصرية",
-        "suggestions_header": "اقتراحات التحسين",
-        "no_suggestions": "لا توجد اقتراحات تحسين محددة في الوقت الحالي.",
-        "metrics": {
-            "total_impressions": "إجمالي الانطباعات",
-            "total_clicks": "إجمالي النقرات",
-            "total_cost": "إجمالي التكلفة",
-            "total_conversions": "إجمالي التحويلات",
-            "total_video_views": "إجمالي مشاهدات الفيديو",
-            "total_landing_page_views": "إجمالي مشاهدات صفحة الهبوط",
-            "avg_ctr": "متوسط نسبة النقر إلى الظهور",
-            "avg_cpm": "متوسط التكلفة لكل ألف ظهور",
-            "avg_conversion_rate": "متوسط معدل التحويل",
-            "avg_cost_per_conversion": "متوسط التكلفة لكل تحويل",
-            "avg_6s_view_rate": "متوسط معدل مشاهدة الفيديو لمدة 6 ثوانٍ",
-            "avg_landing_page_view_rate": "متوسط معدل مشاهدة صفحة الهبوط"
-        },
-        "chart_titles": {
-            "impressions_clicks": "الانطباعات والنقرات عبر الزمن",
-            "performance_metrics": "مقاييس الأداء حسب الإعلان",
-            "cost_distribution": "توزيع التكلفة حسب الإعلان",
-            "video_engagement": "تفاعل الفيديو حسب الإعلان"
-        },
-        "chart_labels": {
-            "date": "التاريخ",
-            "impressions": "الانطباعات",
-            "clicks": "النقرات",
-            "ad_name": "اسم الإعلان",
-            "percentage": "النسبة المئوية (%)",
-            "cost": "التكلفة",
-            "count": "العدد",
-            "ctr": "نسبة النقر إلى الظهور (%)",
-            "conversion_rate": "معدل التحويل (%)",
-            "6s_view_rate": "معدل مشاهدة الفيديو لمدة 6 ثوانٍ (%)",
-            "landing_page_view_rate": "معدل مشاهدة صفحة الهبوط (%)",
-            "video_views": "مشاهدات الفيديو",
-            "6s_video_views": "مشاهدات الفيديو لمدة 6 ثوانٍ"
-        },
-        "suggestions": {
-            "low_ctr": {"issue": "نسبة نقر إلى ظهور منخفضة للحملة", "text": "متوسط نسبة النقر إلى الظهور أقل من 1%. جرب تنسيقات تيك توك الأصلية مثل Spark Ads أو قم بتحسين استهداف الجمهور."},
-            "high_cpm": {"issue": "تكلفة مرتفعة لكل ألف ظهور", "text": "متوسط التكلفة لكل ألف ظهور يتجاوز 10 دولارات. فكر في استراتيجيات العطاء بناءً على التكلفة لكل نقرة أو التكلفة المثلى لكل ألف ظهور."},
-            "low_conversion_rate": {"issue": "معدل تحويل منخفض", "text": "معدل التحويل أقل من 2%. قم بتحسين صفحات الهبوط للأجهزة المحمولة وتأكد من وضوح دعوات الإجراء."},
-            "high_cost_per_conversion": {"issue": "تكلفة مرتفعة لكل تحويل", "text": "تكلفة التحويل مرتفعة. أوقف الإعلانات ذات الأداء المنخفض وأعد تخصيص الميزانية."},
-            "low_6s_view_rate": {"issue": "معدل مشاهدة فيديو منخفض لمدة 6 ثوانٍ", "text": "متوسط معدل مشاهدة الفيديو لمدة 6 ثوانٍ أقل من 10%. حسّن خطافات الفيديو في أول 3 ثوانٍ."},
-            "low_landing_page_view_rate": {"issue": "معدل مشاهدة صفحة هبوط منخفض", "text": "متوسط معدل مشاهدة صفحة الهبوط أقل من 20%. عزز الإبداعات الإعلانية أو صلة صفحة الهبوط."},
-            "ad_low_ctr": {"issue": "نسبة نقر إلى ظهور منخفضة للإعلان", "text": "الإعلان '{ad_name}': نسبة نقر إلى ظهور منخفضة ({ctr}%). جرب صورًا بصرية أو نصوص إعلانية جديدة."},
-            "ad_low_6s_view_rate": {"issue": "معدل مشاهدة فيديو منخفض للإعلان لمدة 6 ثوانٍ", "text": "الإعلان '{ad_name}': معدل مشاهدة الفيديو لمدة 6 ثوانٍ منخفض ({rate}%). قم بتقصير المقدمات أو أضف خطافات جذابة."},
-            "ad_low_landing_page_view_rate": {"issue": "معدل مشاهدة صفحة هبوط منخفض للإعلان", "text": "الإعلان '{ad_name}': معدل مشاهدة صفحة الهبوط منخفض ({rate}%). تأكد من توافق الإعلان وصفحة الهبوط."}
-        },
-        "suggestions_table": {
-            "ad_name": "اسم الإعلان",
-            "issue": "المشكلة",
-            "suggestion": "الاقتراح",
-            "priority": "الأولوية",
-            "general": "عام",
-            "high": "عالية",
-            "medium": "متوسطة",
-            "low": "منخفضة"
-        },
-        "language_label": "اللغة",
-        "english": "الإنجليزية",
-        "arabic": "العربية"
-    }
-}
+
+@st.cache_resource
+def get_ingest_cache():
+    return IngestCache()
+
+
+@st.cache_resource
+def get_dataset_store():
+    return DatasetStore()
+
+
+@st.cache_resource
+def get_snapshot_store():
+    return SnapshotStore()
+
+
+@st.cache_resource
+def get_job_queue():
+    return JobQueue()
+
+
+@st.cache_resource
+def get_source_executor():
+    # Forking the threaded server process is unsafe, so workers are spawned once and reused
+    return ProcessPoolExecutor(max_workers=SOURCE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+
+
+def persist_dataset(key, frame, kind, name, original_columns):
+    """Save to the dataset store; a failed write only costs the next reopen a re-parse."""
+    try:
+        get_dataset_store().save(key, frame, kind, name, original_columns)
+    except (OSError, ValueError, TypeError, ImportError) as e:
+        # Mixed-type object columns cannot be written to Parquet
+        logger.warning("Could not store dataset %s: %s", key, e)
+
+
+def _frame_key(key, compact):
+    return ('compact', key) if compact else key
+
+
+def _cache_results(cache_key, result):
+    _, ad_summary, time_data, _, _ = result
+    nbytes = int(ad_summary.memory_usage(deep=True).sum() + time_data.memory_usage(deep=True).sum())
+    get_ingest_cache().put(cache_key, result, nbytes)
+    return result
+
+
+def _results_name(key, compact=False):
+    """Name of the results of dataset ``key`` in the store."""
+    return f"{key}.compact" if compact else key
+
+
+def stored_results(cache_key, key, compact=False):
+    """Summaries of dataset ``key`` saved by any session before, cached under ``cache_key``; None if not saved."""
+    stored = get_dataset_store().load_results(_results_name(key, compact))
+    if stored is None:
+        return None
+    summary, tables, original_columns = stored
+    return _cache_results(cache_key, (summary, tables['ad_summary'], tables['time_data'], original_columns, tables.get('account_summary')))
+
+
+def persist_results(key, result, compact=False):
+    """Save the summaries of a stored dataset, so other sessions and restarts skip summarizing it."""
+    # Results are pruned with their dataset, so they are only kept next to one
+    if get_dataset_store().metadata(key) is None:
+        return
+    summary, ad_summary, time_data, original_columns, account_summary = result
+    tables = {'ad_summary': ad_summary, 'time_data': time_data, 'account_summary': account_summary}
+    try:
+        get_dataset_store().save_results(_results_name(key, compact), summary, tables, original_columns)
+    except (OSError, ValueError, TypeError, ImportError) as e:
+        logger.warning("Could not store results of %s: %s", key, e)
+
+
+def _cache_frame(key, compact, df, original_columns):
+    """Cache parsed rows and their per-column memory report."""
+    cache = get_ingest_cache()
+    report = memory_report(df)
+    cache.put(('memory', _frame_key(key, compact)), report, int(report.memory_usage(deep=True).sum()))
+    cache.put(_frame_key(key, compact), (df, original_columns), int(df.memory_usage(deep=True).sum()))
+
+
+def cached_memory_report(key, compact=False):
+    """Per-column memory of the rows parsed for ``key``, or None if they were not parsed recently."""
+    return get_ingest_cache().get(('memory', _frame_key(key, compact)))
+
+
+def load_stored_dataset(key, compact=False):
+    """Reopen a stored row dataset, reading only ANALYSIS_COLUMNS."""
+    cached = get_ingest_cache().get(_frame_key(key, compact))
+    if cached is not None:
+        return cached
+    stored = get_dataset_store().load(key, columns=ANALYSIS_COLUMNS)
+    if stored is None:
+        return None
+    df, meta = stored
+    df = compact_frame(df) if compact else add_kpi_columns(df)
+    _cache_frame(key, compact, df, meta['columns'])
+    return df, meta['columns']
+
+
+def upload_key(files, dayfirst=True):
+    """Dataset key of uploaded (name, bytes) files; a single file keeps its own dataset_key."""
+    keys = [dataset_key(data, upload_format(name), dayfirst) for name, data in files]
+    if len(keys) == 1:
+        return keys[0]
+    return dataset_key(''.join(keys).encode(), 'combined')
+
+
+def load_dataset(files, dayfirst=True, compact=False, key=None):
+    """Return the parsed uploads, reusing the cached or stored result for identical bytes and options.
+
+    Several files, or workbooks with several sheets, are parsed in parallel
+    and combined with an account per source.
+    """
+    key = key or upload_key(files, dayfirst)
+    stored = load_stored_dataset(key, compact)
+    if stored is not None:
+        return stored
+    try:
+        with stage('parse sources') as record:
+            df, original_columns = parse_sources(files, dayfirst=dayfirst, compact=compact, executor=get_source_executor())
+            record.rows = len(df)
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool on the next upload
+        get_source_executor.clear()
+        raise
+    name = ', '.join(name for name, _ in files)
+    persist_dataset(key, df[[col for col in ANALYSIS_COLUMNS if col in df.columns]], 'rows', name, original_columns)
+    _cache_frame(key, compact, df, original_columns)
+    return df, original_columns
+
+
+def summarize_dataset(key, compact, df, original_columns):
+    """Summary, ad_summary, time_data, columns and account table of a row dataset, cached and stored per dataset key."""
+    cache_key = ('summaries', _frame_key(key, compact))
+    cached = get_ingest_cache().get(cache_key)
+    if cached is not None:
+        return cached
+    summary, ad_summary, time_data = summarize_frame(df)
+    result = _cache_results(cache_key, (summary, ad_summary, time_data, original_columns, summarize_accounts(df)))
+    persist_results(key, result, compact)
+    return result
+
+
+def analyze_upload(files, dayfirst=True, compact=False, key=None):
+    """Summary, ad_summary, time_data, columns and account table of uploaded (name, bytes) files.
+
+    Reruns reuse the cached result, and uploads of the same bytes by any
+    session the stored one.
+    """
+    key = key or upload_key(files, dayfirst)
+    summarized = summarize_stored(key, compact)
+    if summarized is not None:
+        return summarized
+    df, original_columns = load_dataset(files, dayfirst, compact, key)
+    return summarize_dataset(key, compact, df, original_columns)
+
+
+def summarize_stored(key, compact=False):
+    """Cached or stored summaries of a row dataset, without reading its rows; None if there are none."""
+    cache_key = ('summaries', _frame_key(key, compact))
+    cached = get_ingest_cache().get(cache_key)
+    if cached is not None:
+        return cached
+    return stored_results(cache_key, key, compact)
+
+
+def _cache_summaries(key, agg, original_columns):
+    summary, ad_summary, time_data = summarize_aggregates(agg)
+    return _cache_results(key, (summary, ad_summary, time_data, original_columns, None))
+
+
+def summarize_stored_aggregates(key):
+    """Cached or stored summaries of a streaming dataset, without reading its aggregates; None if there are none."""
+    cached = get_ingest_cache().get(key)
+    if cached is not None:
+        return cached
+    return stored_results(key, key)
+
+
+def load_stored_aggregates(key):
+    """Reopen a stored streaming dataset and summarize its aggregates, or read the summaries saved with it."""
+    summarized = summarize_stored_aggregates(key)
+    if summarized is not None:
+        return summarized
+    stored = get_dataset_store().load(key)
+    if stored is None:
+        return None
+    agg, meta = stored
+    result = _cache_summaries(key, agg, meta['columns'])
+    persist_results(key, result)
+    return result
+
+
+def stream_key(data, file_format='xlsx', dayfirst=True):
+    return dataset_key(data, file_format, dayfirst, 'stream')
+
+
+def load_aggregates(data, file_format='xlsx', dayfirst=True, chunk_rows=STREAM_CHUNK_ROWS, name=None, key=None):
+    """Streaming counterpart of load_dataset returning summary, ad_summary, time_data and columns."""
+    key = key or stream_key(data, file_format, dayfirst)
+    stored = load_stored_aggregates(key)
+    if stored is not None:
+        return stored
+    agg, original_columns = stream_aggregates(data, file_format, dayfirst=dayfirst, chunk_rows=chunk_rows)
+    persist_dataset(key, agg, 'aggregates', name, original_columns)
+    result = _cache_summaries(key, agg, original_columns)
+    persist_results(key, result)
+    return result
+
+
+def history_results_key(name):
+    """Key of a history's current results; it changes with every append."""
+    history = AggregateHistory(history_path(name))
+    return ('history', history.path, history.metadata().get('updated_at'))
+
+
+def append_to_history(name, data, file_format, dayfirst=True, key=None):
+    """Merge an upload into the named history; returns its summaries and columns, and the (new, replaced) cell counts."""
+    history = AggregateHistory(history_path(name))
+    key = key or stream_key(data, file_format, dayfirst)
+    counts = (0, 0)
+    if not history.contains(key):
+        agg, original_columns = stream_aggregates(data, file_format, dayfirst=dayfirst)
+        counts = history.append(agg, key, original_columns)
+    cache = get_ingest_cache()
+    results_key = history_results_key(name)
+    cached = cache.get(results_key)
+    if cached is not None:
+        return cached, counts
+    summary, ad_summary, time_data = history.summarize()
+    result = (summary, ad_summary, time_data, history.metadata()['columns'], None)
+    cache.put(results_key, result, int(ad_summary.memory_usage(deep=True).sum() + time_data.memory_usage(deep=True).sum()))
+    return result, counts
+
+
+def history_summaries(name, key):
+    """append_to_history's result for an upload already merged into the history, if its summaries are cached; else None."""
+    if not AggregateHistory(history_path(name)).contains(key):
+        return None
+    cached = get_ingest_cache().get(history_results_key(name))
+    return None if cached is None else (cached, (0, 0))
+
+
+def open_stored_summaries(key, compact=False):
+    """Cached or stored summaries of a stored dataset of either kind, without reading it; None if there are none."""
+    meta = get_dataset_store().metadata(key)
+    if meta is None:
+        return None
+    if meta['kind'] == 'aggregates':
+        return summarize_stored_aggregates(key)
+    return summarize_stored(key, compact)
+
+
+def open_stored(key, compact=False):
+    """Summary, ad_summary, time_data, columns and account table of a dataset from the store, or None."""
+    meta = get_dataset_store().metadata(key)
+    if meta is None:
+        return None
+    if meta['kind'] == 'aggregates':
+        return load_stored_aggregates(key)
+    summarized = summarize_stored(key, compact)
+    if summarized is not None:
+        return summarized
+    stored = load_stored_dataset(key, compact)
+    if stored is None:
+        return None
+    df, original_columns = stored
+    return summarize_dataset(key, compact, df, original_columns)
+
+
+def load_cube(key, compact=False):
+    """MeasureCube of a stored row or aggregate dataset, built once and cached; None if the dataset is gone."""
+    cache = get_ingest_cache()
+    cube_key = ('cube', _frame_key(key, compact))
+    cube = cache.get(cube_key)
+    if cube is not None:
+        return cube
+    meta = get_dataset_store().metadata(key)
+    if meta is not None and meta['kind'] == 'aggregates':
+        stored = get_dataset_store().load(key)
+        if stored is None:
+            return None
+        cube = cube_from_aggregates(stored[0])
+    else:
+        stored = load_stored_dataset(key, compact)
+        if stored is None:
+            return None
+        cube = cube_from_rows(stored[0])
+    cache.put(cube_key, cube, cube.nbytes)
+    return cube
+
+
+def load_history_cube(name):
+    """MeasureCube of a named history, rebuilt after every append."""
+    cube_key = ('cube',) + history_results_key(name)
+    cube = get_ingest_cache().get(cube_key)
+    if cube is not None:
+        return cube
+    cells = AggregateHistory(history_path(name)).cells()
+    if cells is None:
+        return None
+    cube = cube_from_aggregates(cells)
+    get_ingest_cache().put(cube_key, cube, cube.nbytes)
+    return cube
+
+
+def stored_trends(key, compact, ad_summary):
+    """Trend scores saved with the results of dataset ``key``, indexed like ``ad_summary``; None if not saved."""
+    trends = get_dataset_store().load_result_table(_results_name(key, compact), 'ad_trends')
+    if trends is None or len(trends) != len(ad_summary):
+        return None
+    trends.index = ad_summary.index
+    return trends
+
+
+def persist_trends(key, compact, trends):
+    """Save trend scores next to the stored results of dataset ``key``, so other sessions need no cube for them."""
+    # Like the results, they are only kept next to a stored dataset; parquet cannot hold a frame without columns
+    if get_dataset_store().metadata(key) is None or trends.columns.empty:
+        return
+    try:
+        get_dataset_store().save_result_table(_results_name(key, compact), 'ad_trends', trends)
+    except (OSError, ValueError, TypeError, ImportError) as e:
+        logger.warning("Could not store trends of %s: %s", key, e)
+
+
+def load_trends(results_key, cube_source, ad_summary, end=None, stored=None):
+    """Per-ad anomaly and trend scores of the results, cached with them; None if there is no cube.
+
+    ``stored`` is the (dataset key, compact) pair of unfiltered results in
+    the dataset store, whose scores are read from and saved next to them.
+    """
+    cache = get_ingest_cache()
+    trends = cache.get(('trends', results_key))
+    if trends is not None:
+        return trends
+    if stored is not None:
+        trends = stored_trends(*stored, ad_summary)
+    if trends is None:
+        cube = cube_source()
+        if cube is None:
+            return None
+        trends = ad_trends(cube, ad_summary, end)
+        if stored is not None:
+            persist_trends(*stored, trends)
+    cache.put(('trends', results_key), trends, int(trends.memory_usage(deep=True).sum()))
+    return trends
+
+
+def filter_inputs(t, ad_summary, time_data):
+    """Sidebar date range, ad and ad metric filters.
+
+    Returns the MeasureCube.summarize arguments, or None when the filters
+    keep the whole dataset.
+    """
+    labels = t["table"]
+    state = st.session_state
+    if time_data.empty:
+        return None
+    first, last = time_data['Date Created'].min().date(), time_data['Date Created'].max().date()
+    ad_options = list(ad_labels(ad_summary).astype(str))
+    metrics = [col for col in AD_SUMMARY_COLUMNS if col in ad_summary.columns]
+    none = ''
+    with st.sidebar.expander(t["filters_header"]):
+        # Dates kept from another dataset are clamped to this one
+        start, end = state.get("filter_dates", (first, last))
+        start, end = min(max(start, first), last), max(min(end, last), first)
+        picked = st.date_input(t["filter_dates"], value=(start, end), min_value=first, max_value=last)
+        # The range is incomplete while its end is being picked
+        if len(picked) == 2:
+            start, end = picked
+        ads = st.multiselect(t["filter_ads"], ad_options, default=[ad for ad in state.get("filter_ads", []) if ad in ad_options],
+                             placeholder=t["filter_ads_placeholder"])
+        options = [none] + metrics
+        metric = st.selectbox(t["filter_metric"], options, index=option_index(options, state.get("filter_metric")),
+                              format_func=lambda col: labels["none"] if col == none else col)
+        col1, col2 = st.columns(2)
+        low = col1.number_input(labels["min"], value=state.get("filter_min"), disabled=metric == none, key="filter_min_input")
+        high = col2.number_input(labels["max"], value=state.get("filter_max"), disabled=metric == none, key="filter_max_input")
+    state["filter_dates"], state["filter_ads"] = (start, end), ads
+    state["filter_metric"], state["filter_min"], state["filter_max"] = metric, low, high
+
+    filters = {}
+    if (start, end) != (first, last):
+        filters.update(start=start, end=end)
+    if ads:
+        filters['ads'] = ads
+    if metric != none and (low is not None or high is not None):
+        filters.update(metric=metric, low=low, high=high)
+    return filters or None
+
+
+def recent_label(t, meta):
+    """Picker label of a stored dataset; the same file stored as rows and streamed is told apart by its kind and size."""
+    kind = t["recent_kinds"][meta['kind']].format(rows=meta['rows'])
+    saved = time.strftime('%Y-%m-%d %H:%M', time.localtime(meta['saved_at']))
+    return f"{meta['name'] or meta['key'][:12]}, {kind} ({saved})"
+
+
+def cancel_job():
+    """Give up this session's background analysis; it is cancelled unless another session waits for it too."""
+    job = st.session_state.pop("analysis_job", None)
+    if job is not None:
+        get_job_queue().release(job)
+
+
+def run_job(show_progress, key, cost, ready, func, /, *args, **kwargs):
+    """Run ``func`` as this session's background analysis on the shared job queue and return its result.
+
+    ``ready()`` looks up a result cached or stored before, without parsing
+    or aggregating; when it finds one, no job is queued, so reruns for
+    widgets, pages or the language only re-render. ``cost`` is the number
+    of bytes the job reads, by which the queue shares the workers fairly
+    between sessions. Sessions running the same ``key`` share one job.
+    ``show_progress`` is called with the job's stage and, while it waits
+    for a worker, the number of jobs ahead of it. A job with the same
+    ``key`` left by an interrupted rerun is awaited rather than restarted,
+    and one with another key has been superseded and is cancelled at its
+    next stage.
+    """
+    result = ready()
+    if result is not None:
+        cancel_job()
+        return result
+    queue = get_job_queue()
+    job = st.session_state.get("analysis_job")
+    if job is None or job.key != key:
+        cancel_job()
+        ctx = get_script_run_ctx()
+        # Cached functions called by the job look up the runtime of the session that started it
+        st.session_state["analysis_job"] = job = queue.acquire(
+            key, ctx.session_id if ctx else None, cost, lambda job: add_script_run_ctx(job.thread, ctx), func, *args, **kwargs)
+    while not job.wait(JOB_POLL_SECONDS):
+        show_progress(job.stage, queue.position(job))
+    cancel_job()
+    attach_records(job.records)
+    return job.result()
+
+
+def progress_bar(t, placeholder):
+    """Function showing a stage of PROGRESS_STAGES in ``placeholder`` as a labelled progress bar."""
+    labels = t["progress"]
+
+    def show(stage, ahead=0):
+        position = PROGRESS_STAGES.index(stage) + 1 if stage in PROGRESS_STAGES else 0
+        text = labels["queued"].format(ahead=ahead) if stage == 'queued' else labels.get(stage, labels["waiting"])
+        placeholder.progress(position / (len(PROGRESS_STAGES) + 1), text=text)
+    return show
+
+
+def threshold_inputs(t):
+    """Sidebar inputs for the suggestion thresholds; returns the rules to apply."""
+    overrides = {}
+    with st.sidebar.expander(t["thresholds_header"]):
+        for rule in SUGGESTION_RULES:
+            state_key = f"threshold_{rule['key']}"
+            overrides[rule['key']] = st.number_input(
+                t["suggestions"][rule['key']]["issue"],
+                min_value=0.0,
+                value=float(st.session_state.get(state_key, rule['threshold'])),
+            )
+            st.session_state[state_key] = overrides[rule['key']]
+    return with_thresholds(overrides)
+
+
+def session_upload_key(uploaded_files, kind, compute):
+    """Key of the uploader's current files, computed by ``compute`` once per upload rather than on every rerun."""
+    ids = (kind,) + tuple(sorted((f.name, f.file_id) for f in uploaded_files))
+    keys = st.session_state.setdefault("upload_keys", {})
+    if ids not in keys:
+        if len(keys) >= UPLOAD_KEYS_PER_SESSION:
+            keys.clear()
+        keys[ids] = compute()
+    return keys[ids]
+
+
+@st.cache_resource(max_entries=RENDER_CACHE_ENTRIES, show_spinner=False)
+def render_figures(results_key, lang_code, _ad_summary, _time_data, _account_summary):
+    """Figures of the results identified by ``results_key`` in one language.
+
+    The figures are shared between reruns and sessions and must not be modified.
+    """
+    return build_figures(translations[lang_code], _ad_summary, _time_data, _account_summary)
+
+
+@st.cache_data(max_entries=RENDER_CACHE_ENTRIES, show_spinner=False)
+def suggestion_matches(results_key, rules, _summary, _ad_summary, _ad_trends=None):
+    """Language-independent rule matches (message keys and parameters) of the results."""
+    return evaluate_rules(_summary, _ad_summary, rules, _ad_trends)
+
+
+@st.cache_data(max_entries=RENDER_CACHE_ENTRIES, show_spinner=False)
+def render_suggestions(results_key, rules, lang_code, _summary, _ad_summary, _ad_trends=None):
+    """Suggestions table of the results with its text in one language."""
+    with stage('suggestions') as record:
+        matches = suggestion_matches(results_key, rules, _summary, _ad_summary, _ad_trends)
+        record.rows = len(matches)
+        return format_suggestions(matches, translations[lang_code])
+
+
+def option_index(options, value):
+    return options.index(value) if value in options else 0
+
+
+def table_view(t, df, name, data_key):
+    """Show one page of ``df`` with search, metric filter, sort and download controls.
+
+    Widget values are kept in session_state under ``name`` so they survive
+    the label change when the language is switched. The downloads are only
+    built when asked for and kept until ``data_key``, which identifies the
+    contents of ``df``, changes.
+    """
+    labels = t["table"]
+    state = st.session_state
+    numeric = [col for col in df.columns if col not in text_columns(df)]
+    none = ''
+
+    def format_option(col):
+        return labels["none"] if col == none else col
+
+    col1, col2, col3 = st.columns([2, 2, 1])
+    search = col1.text_input(labels["search"], value=state.get(f"{name}_search", ''), key=f"{name}_search_input")
+    options = [none] + list(df.columns)
+    sort_by = col2.selectbox(labels["sort_by"], options, index=option_index(options, state.get(f"{name}_sort")),
+                             format_func=format_option, key=f"{name}_sort_input")
+    descending = col3.checkbox(labels["descending"], value=state.get(f"{name}_descending", False), key=f"{name}_descending_input")
+    state[f"{name}_search"], state[f"{name}_sort"], state[f"{name}_descending"] = search, sort_by, descending
+
+    filters = None
+    if numeric:
+        col1, col2, col3 = st.columns([2, 1, 1])
+        options = [none] + numeric
+        metric = col1.selectbox(labels["filter_metric"], options, index=option_index(options, state.get(f"{name}_metric")),
+                                format_func=format_option, key=f"{name}_metric_input")
+        low = col2.number_input(labels["min"], value=state.get(f"{name}_min"), disabled=metric == none, key=f"{name}_min_input")
+        high = col3.number_input(labels["max"], value=state.get(f"{name}_max"), disabled=metric == none, key=f"{name}_max_input")
+        state[f"{name}_metric"], state[f"{name}_min"], state[f"{name}_max"] = metric, low, high
+        if metric != none:
+            filters = {metric: (low, high)}
+
+    col1, col2 = st.columns([1, 1])
+    page_size = col2.selectbox(labels["page_size"], TABLE_PAGE_SIZES, index=TABLE_PAGE_SIZES.index(state.get(f"{name}_page_size", TABLE_PAGE_SIZES[1])), key=f"{name}_page_size_input")
+    with stage('filter table') as record:
+        matched = filter_table(df, search, filters)
+        total = record.rows = len(matched)
+    pages = max(1, -(-total // page_size))
+    # A filter or a larger page size may leave fewer pages than the one shown last; dropping the
+    # widget's state recreates it at the clamped value without writing its key before it exists
+    if state.get(f"{name}_page_input", 1) > pages:
+        del state[f"{name}_page_input"]
+    page = col1.number_input(labels["page"], min_value=1, max_value=pages, step=1,
+                             value=min(int(state.get(f"{name}_page", 1)), pages), key=f"{name}_page_input")
+    with stage('query table') as record:
+        page_df, _ = query_table(matched, sort_by=sort_by or None, descending=descending, page=page, page_size=page_size)
+        record.rows = len(page_df)
+    state[f"{name}_page"], state[f"{name}_page_size"] = page, page_size
+
+    with stage('render table') as record:
+        st.dataframe(page_df, use_container_width=True, hide_index=True)
+        record.rows = len(page_df)
+    start = (page - 1) * page_size
+    st.caption(labels["rows"].format(start=start + 1 if total else 0, end=start + len(page_df), total=total, page=page, pages=pages))
+
+    exports = state.get(f"{name}_exports")
+    if exports is None or exports[0] != data_key:
+        if not st.button(labels["prepare_downloads"], key=f"{name}_prepare_downloads"):
+            return
+        with stage('export table') as record:
+            record.rows = len(df)
+            exports = state[f"{name}_exports"] = (data_key, {file_format: export_table(df, file_format) for file_format in EXPORT_FORMATS})
+    columns = st.columns(len(EXPORT_FORMATS))
+    for column, (file_format, mime) in zip(columns, EXPORT_FORMATS.items()):
+        column.download_button(
+            labels[f"download_{file_format}"],
+            data=exports[1][file_format],
+            file_name=f"{name}.{file_format}",
+            mime=mime,
+        )
+
+
+def show_metrics(metrics):
+    """Show format_metrics output as two columns of st.metric."""
+    for column, items in zip(st.columns([1, 1]), metrics):
+        with column:
+            for label, text in items:
+                st.metric(label, text)
+
+
+def render_results(lang_code, results_key, summary, ad_summary, time_data, rules=None, account_summary=None, show_progress=None,
+                   trend_source=None):
+    """Show the results identified by ``results_key``; only the per-language renders are rebuilt on a language switch.
+
+    Sections appear as soon as they are ready: the summary and tables first,
+    then the charts, then the suggestions, with ``show_progress`` told the stage.
+    ``trend_source`` returns the per-ad anomaly and trend scores the
+    suggestions also draw on, or None.
+    """
+    t = translations[lang_code]
+    show_progress = show_progress or (lambda stage: None)
+    rules = SUGGESTION_RULES if rules is None else rules
+    # Display Summary
+    st.header(t["summary_header"])
+    with stage('render summary'):
+        show_metrics(format_metrics(summary, t))
+
+    # Display Ad Summary Table
+    st.header(t["ad_performance_header"])
+    table_view(t, ad_summary, 'ad_summary', results_key)
+
+    if account_summary is not None:
+        st.header(t["account_performance_header"])
+        table_view(t, account_summary, 'account_summary', results_key)
+
+    # Generate Charts
+    st.header(t["visual_insights_header"])
+    show_progress('build figures')
+    with stage('build figures') as record:
+        figures = render_figures(results_key, lang_code, ad_summary, time_data, account_summary)
+        record.rows = len(figures)
+    with stage('render charts'):
+        for fig in figures:
+            st.plotly_chart(fig, use_container_width=True)
+
+    # Optimization Suggestions Table
+    st.header(t["suggestions_header"])
+    show_progress('trends')
+    trends = trend_source() if trend_source is not None else None
+    show_progress('suggestions')
+    suggestions_df = render_suggestions(results_key, rules, lang_code, summary, ad_summary, trends)
+    if not suggestions_df.empty:
+        table_view(t, suggestions_df, 'suggestions', (results_key, rules, lang_code))
+    else:
+        st.markdown(t["no_suggestions"])
+
+
+def publish_panel(t, name, results_key, rules, results, trend_source=None):
+    """Form publishing the shown results, in every language, as the next version of a named snapshot."""
+    summary, ad_summary, time_data, original_columns, account_summary = results
+    with st.expander(t["snapshot_publish_header"]):
+        name = st.text_input(t["snapshot_name"], value=name).strip()
+        if not st.button(t["snapshot_publish"], disabled=not name):
+            return
+        with stage('publish snapshot'):
+            trends = trend_source() if trend_source is not None else None
+            # Renders are shared with render_results, so the shown language is already built
+            renders = {
+                code: (
+                    format_metrics(summary, translations[code]),
+                    render_figures(results_key, code, ad_summary, time_data, account_summary),
+                    render_suggestions(results_key, rules, code, summary, ad_summary, trends),
+                )
+                for code in translations
+            }
+            tables = {'ad_summary': ad_summary, 'time_data': time_data, 'account_summary': account_summary}
+            version = get_snapshot_store().publish(build_snapshot(name, summary, tables, original_columns, renders))
+        st.success(t["snapshot_published"].format(name=name, version=version))
+
+
+@st.cache_resource(max_entries=RENDER_CACHE_ENTRIES, show_spinner=False)
+def open_snapshot(slug, version):
+    """Parsed snapshot, shared between reruns and sessions; versions never change once published."""
+    return get_snapshot_store().load(slug, version)
+
+
+def render_snapshot(lang_code, snapshot):
+    """Show a published snapshot as render_results shows live results, with downloads of the snapshot."""
+    t = translations[lang_code]
+    render = snapshot.languages[lang_code]
+    published = time.strftime('%Y-%m-%d %H:%M', time.localtime(snapshot.created_at))
+    st.info(t["snapshot_info"].format(name=snapshot.name, version=snapshot.version, published=published))
+    col1, col2 = st.columns(2)
+    file_name = f"{name_slug(snapshot.name)}-v{snapshot.version}"
+    col1.download_button(t["snapshot_download_html"], data=snapshot_html(snapshot, lang_code, t),
+                         file_name=f"{file_name}.{lang_code}.html", mime="text/html")
+    col2.download_button(t["snapshot_download_bundle"], data=snapshot.read_bytes(),
+                         file_name=f"{file_name}.zip", mime="application/zip")
+
+    st.write(f"**{t['columns_found']}**: {', '.join(snapshot.columns)}")
+    st.header(t["summary_header"])
+    show_metrics(render['metrics'])
+    st.header(t["ad_performance_header"])
+    table_view(t, snapshot.tables['ad_summary'], 'ad_summary', snapshot.path)
+    if 'account_summary' in snapshot.tables:
+        st.header(t["account_performance_header"])
+        table_view(t, snapshot.tables['account_summary'], 'account_summary', snapshot.path)
+    st.header(t["visual_insights_header"])
+    for fig in render['figures']:
+        st.plotly_chart(fig, use_container_width=True)
+    st.header(t["suggestions_header"])
+    if not render['suggestions'].empty:
+        table_view(t, render['suggestions'], 'suggestions', (snapshot.path, lang_code))
+    else:
+        st.markdown(t["no_suggestions"])
+
+
+def performance_panel(t, records):
+    """Sidebar table of the stages measured in this run, nested stages indented."""
+    with st.sidebar.expander(t["performance_header"], expanded=True):
+        rows = fold_records(records)
+        for row in rows:
+            row['stage'] = '\u2003' * row.pop('depth') + row['stage']
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+
 
 def main():
     # Mobile-friendly CSS
@@ -258,291 +812,164 @@ def main():
     st.title(t["title"])
     st.markdown(t["instructions"])
 
-    uploaded_file = st.file_uploader(t["upload_label"], type=["xls", "xlsx"])
-
-    if uploaded_file:
+    # Widget labels change with the language, which resets the widgets, so their
+    # values are carried over in session state
+    streaming = st.sidebar.checkbox(t["streaming_mode"], value=st.session_state.get("streaming", False), help=t["streaming_help"])
+    st.session_state["streaming"] = streaming
+
+    compact = st.sidebar.checkbox(t["compact_mode"], value=st.session_state.get("compact", False), help=t["compact_help"])
+    st.session_state["compact"] = compact
+
+    recent = {meta['key']: meta for meta in get_dataset_store().recent()}
+    recent_options = [None] + list(recent)
+    previous_key = st.session_state.get("recent_key")
+    recent_key = st.sidebar.selectbox(
+        t["recent_datasets"],
+        recent_options,
+        index=recent_options.index(previous_key) if previous_key in recent_options else 0,
+        format_func=lambda key: t["recent_none"] if key is None else recent_label(t, recent[key])
+    )
+    st.session_state["recent_key"] = recent_key
+
+    snapshots = {(slug, version): published for slug, version, published in get_snapshot_store().recent()}
+    snapshot_options = [None] + list(snapshots)
+    previous_snapshot = st.session_state.get("snapshot_id")
+    snapshot_id = st.sidebar.selectbox(
+        t["snapshots_label"],
+        snapshot_options,
+        index=snapshot_options.index(previous_snapshot) if previous_snapshot in snapshot_options else 0,
+        format_func=lambda option: t["snapshot_none"] if option is None else
+            f"{option[0]} v{option[1]} ({time.strftime('%Y-%m-%d %H:%M', time.localtime(snapshots[option]))})",
+        help=t["snapshots_help"],
+    )
+    st.session_state["snapshot_id"] = snapshot_id
+
+    history_name = st.sidebar.text_input(t["history_name"], value=st.session_state.get("history_name", ""), help=t["history_help"]).strip()
+    st.session_state["history_name"] = history_name
+
+    rules = threshold_inputs(t)
+
+    profiling = PROFILE_ALWAYS or st.sidebar.checkbox(t["profiling_mode"], value=st.session_state.get("profiling", False), help=t["profiling_help"])
+    st.session_state["profiling"] = profiling
+    profiler = Profiler() if profiling else None
+
+    uploaded_files = st.file_uploader(t["upload_label"], type=["xls", "xlsx", "csv"], accept_multiple_files=True)
+    uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 else None
+
+    if snapshot_id and not uploaded_files:
+        # A snapshot needs neither the rows nor a job
+        cancel_job()
+        with profiler or contextlib.nullcontext(), stage('total'):
+            snapshot = open_snapshot(*snapshot_id)
+            if snapshot is None:
+                st.error(t["snapshot_missing"])
+            else:
+                render_snapshot(lang_code, snapshot)
+        if profiler is not None:
+            profiler.emit()
+            performance_panel(t, profiler.records + profiler.attached)
+    elif uploaded_files or recent_key:
+        rows_key = None
+        cube_source = None
+        # Dataset whose stored results the unfiltered trend scores are kept with
+        stored = None
+        snapshot_name = history_name or ', '.join(f.name for f in uploaded_files)
+        progress = st.empty()
+        show_progress = progress_bar(t, progress)
         try:
-            with st.spinner("Processing file..." if lang_code == "en" else "جارٍ معالجة الملف..."):
-                df = pd.read_excel(uploaded_file)
-
-                # Remove total row if present
-                df = df[df['Ad name'] != 'Total of 51 results'].copy()
+            with profiler or contextlib.nullcontext(), stage('total'):
+                if uploaded_file and (history_name or streaming):
+                    file_format = upload_format(uploaded_file.name)
+                    data = uploaded_file.getvalue()
+                    key = session_upload_key(uploaded_files, 'stream', partial(stream_key, data, file_format))
+                    if history_name:
+                        results, (new_cells, replaced_cells) = run_job(
+                            show_progress, ('history', history_name, key), len(data), partial(history_summaries, history_name, key),
+                            append_to_history, history_name, data, file_format, key=key)
+                        if new_cells or replaced_cells:
+                            st.info(t["history_updated"].format(new=new_cells, replaced=replaced_cells))
+                        results_key = history_results_key(history_name)
+                        cube_source = partial(load_history_cube, history_name)
+                    else:
+                        results = run_job(show_progress, ('stream', key), len(data), partial(summarize_stored_aggregates, key),
+                                          load_aggregates, data, file_format, name=uploaded_file.name, key=key)
+                        results_key = key
+                        cube_source = partial(load_cube, key)
+                        stored = (key, False)
+                elif uploaded_files:
+                    if len(uploaded_files) > 1 and (history_name or streaming):
+                        st.info(t["multi_file_combined"])
+                    files = sorted((f.name, f.getvalue()) for f in uploaded_files)
+                    rows_key = session_upload_key(uploaded_files, 'rows', partial(upload_key, files))
+                    results = run_job(show_progress, ('rows', rows_key, compact), sum(len(data) for _, data in files), partial(summarize_stored, rows_key, compact),
+                                      analyze_upload, files, compact=compact, key=rows_key)
+                    results_key = _frame_key(rows_key, compact)
+                    cube_source = partial(load_cube, rows_key, compact)
+                    stored = (rows_key, compact)
+                else:
+                    results = run_job(show_progress, ('recent', recent_key, compact), 0, partial(open_stored_summaries, recent_key, compact),
+                                      open_stored, recent_key, compact)
+                    rows_key = recent_key
+                    results_key = _frame_key(recent_key, compact)
+                    cube_source = partial(load_cube, recent_key, compact)
+                    stored = (recent_key, compact)
+                    if results is None:
+                        st.error(t["recent_missing"])
+                        return
+                    snapshot_name = (get_dataset_store().metadata(recent_key) or {}).get('name') or recent_key[:12]
+                summary, ad_summary, time_data, original_columns, account_summary = results
+
+                # Filters re-reduce the (date x ad) cube instead of regrouping the rows
+                trend_end = None
+                filters = filter_inputs(t, ad_summary, time_data)
+                if filters:
+                    with stage('filter') as record:
+                        cube = cube_source()
+                        filtered = cube.summarize(**filters) if cube is not None else None
+                        record.rows = len(cube) if cube is not None else 0
+                    if cube is None:
+                        st.warning(t["filters_unavailable"])
+                    elif filtered is None:
+                        st.warning(t["filters_no_match"])
+                    else:
+                        summary, ad_summary, time_data, account_summary = filtered
+                        results_key = (results_key, repr(sorted(filters.items())))
+                        trend_end = filters.get('end')
+                        stored = None
+                        dates = time_data['Date Created']
+                        st.caption(t["filters_active"].format(ads=len(ad_summary), start=dates.min().date(), end=dates.max().date()))
 
                 # Log columns for debugging
-                original_columns = df.columns.tolist()
                 st.write(f"**{t['columns_found']}**: {', '.join(original_columns)}")
-
-                # Normalize column names
-                df.columns = df.columns.str.strip().str.lower()
-                column_map = {col.lower(): col for col in original_columns}
-
-                # Check required columns
-                required_columns = ['date created', 'ad name', 'impressions', 'clicks (destination)', 'cost', 'conversions']
-                missing_columns = [column_map.get(col, col) for col in required_columns if col not in df.columns]
-                if missing_columns:
-                    st.error(t["missing_columns"].format(columns=', '.join(missing_columns)))
-                    return
-
-                # Check optional columns
-                optional_columns = [
-                    'video views', '2-second video views', '6-second video views', 'video views at 100%',
-                    'average play time per video view', 'landing page views (website)', 'landing page view rate (website)'
-                ]
-                available_optional = [col for col in optional_columns if col in df.columns]
-
-                # Restore original column names
-                df.columns = [column_map[col.lower()] for col in df.columns]
-
-                # Clean and parse dates
-                df = df[df['Date Created'].notna() & (df['Date Created'] != '-')].copy()
-                df['Date Created'] = pd.to_datetime(df['Date Created'], format='mixed', errors='coerce', dayfirst=True)
-                if df['Date Created'].isna().any():
-                    st.error(t["invalid_dates"])
-                    invalid_rows = df[df['Date Created'].isna()][['Ad name', 'Date Created']].head()
-                    st.write(t["invalid_rows"], invalid_rows)
-                    return
-
-                if df.empty:
-                    st.error(t["empty_data"])
-                    return
-
-                # Convert numeric columns
-                numeric_cols = [
-                    'Impressions', 'Clicks (destination)', 'Cost', 'Conversions',
-                    'Video views', '2-second video views', '6-second video views', 'Video views at 100%',
-                    'Average play time per video view', 'Landing page views (website)', 'Landing page view rate (website)'
-                ]
-                for col in numeric_cols:
-                    if col in df.columns:
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-
-                # Calculate KPIs
-                df['CTR (destination)'] = (df['Clicks (destination)'] / df['Impressions'] * 100).round(2)
-                df['CPM'] = (df['Cost'] / (df['Impressions'] / 1000)).round(2)
-                df['Conversion rate (CVR)'] = (df['Conversions'] / df['Clicks (destination)'] * 100).round(2)
-                df['Cost per conversion'] = (df['Cost'] / df['Conversions']).where(df['Conversions'] > 0, np.inf).round(2)
-                if 'Video views' in df.columns and '6-second video views' in df.columns:
-                    df['6-second view rate'] = (df['6-second video views'] / df['Video views'] * 100).round(2)
-                if 'Landing page views (website)' in df.columns:
-                    df['Cost per landing page view'] = (df['Cost'] / df['Landing page views (website)']).where(df['Landing page views (website)'] > 0, np.inf).round(2)
-
-                # Summary metrics
-                summary = {
-                    'total_impressions': int(df['Impressions'].sum() or 0),
-                    'total_clicks': int(df['Clicks (destination)'].sum() or 0),
-                    'total_cost': round(float(df['Cost'].sum() or 0), 2),
-                    'total_conversions': int(df['Conversions'].sum() or 0),
-                    'avg_ctr': round(float(df['CTR (destination)'].mean() or 0), 2),
-                    'avg_cpm': round(float(df['CPM'].mean() or 0), 2),
-                    'avg_conversion_rate': round(float(df['Conversion rate (CVR)'].mean() or 0), 2),
-                    'avg_cost_per_conversion': round(float(df['Cost per conversion'].replace(np.inf, 0).mean()), 2),
-                }
-                if 'Video views' in df.columns:
-                    summary['total_video_views'] = int(df['Video views'].sum() or 0)
-                    summary['avg_6s_view_rate'] = round(float(df['6-second view rate'].mean() or 0), 2) if '6-second view rate' in df.columns else 0
-                if 'Average play time per video view' in df.columns:
-                    summary['avg_play_time'] = round(float(df['Average play time per video view'].mean() or 0), 2)
-                if 'Landing page views (website)' in df.columns:
-                    summary['total_landing_page_views'] = int(df['Landing page views (website)'].sum() or 0)
-                    summary['avg_landing_page_view_rate'] = round(float(df['Landing page view rate (website)'].mean() or 0), 2)
-                    summary['avg_cost_per_landing_page_view'] = round(float(df['Cost per landing page view'].replace(np.inf, 0).mean()), 2)
-
-                # Ad summary table
-                agg_dict = {
-                    'Impressions': 'sum',
-                    'Clicks (destination)': 'sum',
-                    'Cost': 'sum',
-                    'Conversions': 'sum',
-                    'CTR (destination)': 'mean',
-                    'CPM': 'mean',
-                    'Conversion rate (CVR)': 'mean',
-                    'Cost per conversion': lambda x: round(float(x.replace(np.inf, 0).mean()), 2),
-                }
-                if 'Video views' in df.columns:
-                    agg_dict['Video views'] = 'sum'
-                    agg_dict['6-second video views'] = 'sum'
-                    agg_dict['6-second view rate'] = 'mean'
-                if 'Average play time per video view' in df.columns:
-                    agg_dict['Average play time per video view'] = 'mean'
-                if 'Landing page views (website)' in df.columns:
-                    agg_dict['Landing page views (website)'] = 'sum'
-                    agg_dict['Landing page view rate (website)'] = 'mean'
-                    agg_dict['Cost per landing page view'] = lambda x: round(float(x.replace(np.inf, 0).mean()), 2)
-
-                ad_summary = df.groupby('Ad name').agg(agg_dict).reset_index().round(2)
-
-                # Display Summary
-                st.header(t["summary_header"])
-                col1, col2 = st.columns([1, 1])
-                with col1:
-                    st.metric(t["metrics"]["total_impressions"], f"{summary['total_impressions']:,}")
-                    st.metric(t["metrics"]["total_clicks"], f"{summary['total_clicks']:,}")
-                    st.metric(t["metrics"]["total_cost"], f"${summary['total_cost']:,}")
-                    st.metric(t["metrics"]["total_conversions"], f"{summary['total_conversions']:,}")
-                    if 'total_video_views' in summary:
-                        st.metric(t["metrics"]["total_video_views"], f"{summary['total_video_views']:,}")
-                    if 'total_landing_page_views' in summary:
-                        st.metric(t["metrics"]["total_landing_page_views"], f"{summary['total_landing_page_views']:,}")
-                with col2:
-                    st.metric(t["metrics"]["avg_ctr"], f"{summary['avg_ctr']}%")
-                    st.metric(t["metrics"]["avg_cpm"], f"${summary['avg_cpm']}")
-                    st.metric(t["metrics"]["avg_conversion_rate"], f"{summary['avg_conversion_rate']}%")
-                    st.metric(t["metrics"]["avg_cost_per_conversion"], f"${summary['avg_cost_per_conversion']}")
-                    if 'avg_6s_view_rate' in summary:
-                        st.metric(t["metrics"]["avg_6s_view_rate"], f"{summary['avg_6s_view_rate']}%")
-                    if 'avg_landing_page_view_rate' in summary:
-                        st.metric(t["metrics"]["avg_landing_page_view_rate"], f"{summary['avg_landing_page_view_rate']}%")
-
-                # Display Ad Summary Table
-                st.header(t["ad_performance_header"])
-                st.dataframe(ad_summary, use_container_width=True)
-
-                # Generate Charts
-                st.header(t["visual_insights_header"])
-                # 1. Impressions and Clicks over Time
-                time_data = df.groupby('Date Created').agg({
-                    'Impressions': 'sum',
-                    'Clicks (destination)': 'sum'
-                }).reset_index()
-                if not time_data.empty:
-                    fig1 = go.Figure()
-                    fig1.add_trace(go.Scatter(x=time_data['Date Created'], y=time_data['Impressions'], name=t["chart_labels"]["impressions"], mode='lines+markers'))
-                    fig1.add_trace(go.Scatter(x=time_data['Date Created'], y=time_data['Clicks (destination)'], name=t["chart_labels"]["clicks"], mode='lines+markers', yaxis='y2'))
-                    fig1.update_layout(
-                        title=t["chart_titles"]["impressions_clicks"],
-                        xaxis_title=t["chart_labels"]["date"],
-                        yaxis_title=t["chart_labels"]["impressions"],
-                        yaxis2=dict(title=t["chart_labels"]["clicks"], overlaying='y', side='right'),
-                        height=400
-                    )
-                    st.plotly_chart(fig1, use_container_width=True)
-
-                # 2. Performance Metrics by Ad
-                ad_metrics = df.groupby('Ad name')[['CTR (destination)', 'Conversion rate (CVR)']].mean().reset_index()
-                if '6-second view rate' in df.columns:
-                    ad_metrics['6-second view rate'] = df.groupby('Ad name')['6-second view rate'].mean().values
-                if 'Landing page view rate (website)' in df.columns:
-                    ad_metrics['Landing page view rate (website)'] = df.groupby('Ad name')['Landing page view rate (website)'].mean().values
-                fig2 = go.Figure()
-                fig2.add_trace(go.Bar(x=ad_metrics['Ad name'], y=ad_metrics['CTR (destination)'], name=t["chart_labels"]["ctr"]))
-                fig2.add_trace(go.Bar(x=ad_metrics['Ad name'], y=ad_metrics['Conversion rate (CVR)'], name=t["chart_labels"]["conversion_rate"]))
-                if '6-second view rate' in ad_metrics.columns:
-                    fig2.add_trace(go.Bar(x=ad_metrics['Ad name'], y=ad_metrics['6-second view rate'], name=t["chart_labels"]["6s_view_rate"]))
-                if 'Landing page view rate (website)' in ad_metrics.columns:
-                    fig2.add_trace(go.Bar(x=ad_metrics['Ad name'], y=ad_metrics['Landing page view rate (website)'], name=t["chart_labels"]["landing_page_view_rate"]))
-                fig2.update_layout(
-                    title=t["chart_titles"]["performance_metrics"],
-                    xaxis_title=t["chart_labels"]["ad_name"],
-                    yaxis_title=t["chart_labels"]["percentage"],
-                    barmode='group',
-                    height=400
-                )
-                st.plotly_chart(fig2, use_container_width=True)
-
-                # 3. Cost Distribution by Ad
-                cost_data = df.groupby('Ad name')['Cost'].sum().reset_index()
-                if not cost_data.empty:
-                    fig3 = px.pie(cost_data, values='Cost', names='Ad name', title=t["chart_titles"]["cost_distribution"])
-                    fig3.update_layout(height=400)
-                    st.plotly_chart(fig3, use_container_width=True)
-
-                # 4. Video Engagement by Ad
-                if 'Video views' in df.columns and '6-second video views' in df.columns:
-                    video_data = df.groupby('Ad name')[['Video views', '6-second video views']].sum().reset_index()
-                    fig4 = go.Figure()
-                    fig4.add_trace(go.Bar(x=video_data['Ad name'], y=video_data['Video views'], name=t["chart_labels"]["video_views"]))
-                    fig4.add_trace(go.Bar(x=video_data['Ad name'], y=video_data['6-second video views'], name=t["chart_labels"]["6s_video_views"]))
-                    fig4.update_layout(
-                        title=t["chart_titles"]["video_engagement"],
-                        xaxis_title=t["chart_labels"]["ad_name"],
-                        yaxis_title=t["chart_labels"]["count"],
-                        barmode='group',
-                        height=400
-                    )
-                    st.plotly_chart(fig4, use_container_width=True)
-
-                # Optimization Suggestions Table
-                st.header(t["suggestions_header"])
-                suggestions = []
-                if summary['avg_ctr'] < 1:
-                    priority = t["suggestions_table"]["high"] if summary['avg_ctr'] < 0.5 else t["suggestions_table"]["medium"]
-                    suggestions.append({
-                        t["suggestions_table"]["ad_name"]: t["suggestions_table"]["general"],
-                        t["suggestions_table"]["issue"]: t["suggestions"]["low_ctr"]["issue"],
-                        t["suggestions_table"]["suggestion"]: t["suggestions"]["low_ctr"]["text"],
-                        t["suggestions_table"]["priority"]: priority
-                    })
-                if summary['avg_cpm'] > 10:
-                    suggestions.append({
-                        t["suggestions_table"]["ad_name"]: t["suggestions_table"]["general"],
-                        t["suggestions_table"]["issue"]: t["suggestions"]["high_cpm"]["issue"],
-                        t["suggestions_table"]["suggestion"]: t["suggestions"]["high_cpm"]["text"],
-                        t["suggestions_table"]["priority"]: t["suggestions_table"]["medium"]
-                    })
-                if summary['avg_conversion_rate'] < 2:
-                    priority = t["suggestions_table"]["high"] if summary['avg_conversion_rate'] < 1 else t["suggestions_table"]["medium"]
-                    suggestions.append({
-                        t["suggestions_table"]["ad_name"]: t["suggestions_table"]["general"],
-                        t["suggestions_table"]["issue"]: t["suggestions"]["low_conversion_rate"]["issue"],
-                        t["suggestions_table"]["suggestion"]: t["suggestions"]["low_conversion_rate"]["text"],
-                        t["suggestions_table"]["priority"]: priority
-                    })
-                if summary['avg_cost_per_conversion'] > 50:
-                    suggestions.append({
-                        t["suggestions_table"]["ad_name"]: t["suggestions_table"]["general"],
-                        t["suggestions_table"]["issue"]: t["suggestions"]["high_cost_per_conversion"]["issue"],
-                        t["suggestions_table"]["suggestion"]: t["suggestions"]["high_cost_per_conversion"]["text"],
-                        t["suggestions_table"]["priority"]: t["suggestions_table"]["high"]
-                    })
-                if 'avg_6s_view_rate' in summary and summary['avg_6s_view_rate'] < 10:
-                    priority = t["suggestions_table"]["high"] if summary['avg_6s_view_rate'] < 5 else t["suggestions_table"]["medium"]
-                    suggestions.append({
-                        t["suggestions_table"]["ad_name"]: t["suggestions_table"]["general"],
-                        t["suggestions_table"]["issue"]: t["suggestions"]["low_6s_view_rate"]["issue"],
-                        t["suggestions_table"]["suggestion"]: t["suggestions"]["low_6s_view_rate"]["text"],
-                        t["suggestions_table"]["priority"]: priority
-                    })
-                if 'avg_landing_page_view_rate' in summary and summary['avg_landing_page_view_rate'] < 20:
-                    suggestions.append({
-                        t["suggestions_table"]["ad_name"]: t["suggestions_table"]["general"],
-                        t["suggestions_table"]["issue"]: t["suggestions"]["low_landing_page_view_rate"]["issue"],
-                        t["suggestions_table"]["suggestion"]: t["suggestions"]["low_landing_page_view_rate"]["text"],
-                        t["suggestions_table"]["priority"]: t["suggestions_table"]["high"]
-                    })
-                for _, ad in ad_summary.iterrows():
-                    if ad['CTR (destination)'] < 1:
-                        priority = t["suggestions_table"]["high"] if ad['CTR (destination)'] < 0.5 else t["suggestions_table"]["medium"]
-                        suggestions.append({
-                            t["suggestions_table"]["ad_name"]: ad['Ad name'],
-                            t["suggestions_table"]["issue"]: t["suggestions"]["ad_low_ctr"]["issue"],
-                            t["suggestions_table"]["suggestion"]: t["suggestions"]["ad_low_ctr"]["text"].format(ad_name=ad['Ad name'], ctr=ad['CTR (destination)']),
-                            t["suggestions_table"]["priority"]: priority
-                        })
-                    if '6-second view rate' in ad and ad['6-second view rate'] < 10:
-                        priority = t["suggestions_table"]["high"] if ad['6-second view rate'] < 5 else t["suggestions_table"]["medium"]
-                        suggestions.append({
-                            t["suggestions_table"]["ad_name"]: ad['Ad name'],
-                            t["suggestions_table"]["issue"]: t["suggestions"]["ad_low_6s_view_rate"]["issue"],
-                            t["suggestions_table"]["suggestion"]: t["suggestions"]["ad_low_6s_view_rate"]["text"].format(ad_name=ad['Ad name'], rate=ad['6-second view rate']),
-                            t["suggestions_table"]["priority"]: priority
-                        })
-                    if 'Landing page views (website)' in ad and ad['Landing page view rate (website)'] < 20:
-                        suggestions.append({
-                            t["suggestions_table"]["ad_name"]: ad['Ad name'],
-                            t["suggestions_table"]["issue"]: t["suggestions"]["ad_low_landing_page_view_rate"]["issue"],
-                            t["suggestions_table"]["suggestion"]: t["suggestions"]["ad_low_landing_page_view_rate"]["text"].format(ad_name=ad['Ad name'], rate=ad['Landing page view rate (website)']),
-                            t["suggestions_table"]["priority"]: t["suggestions_table"]["high"]
-                        })
-
-                if suggestions:
-                    suggestions_df = pd.DataFrame(suggestions)
-                    st.dataframe(suggestions_df, use_container_width=True)
-                else:
-                    st.markdown(t["no_suggestions"])
-
+                report = cached_memory_report(rows_key, compact) if rows_key else None
+                if report is not None:
+                    with st.expander(t["memory_usage"]):
+                        st.dataframe(report, use_container_width=True, hide_index=True)
+                        st.caption(t["memory_total"].format(mb=report['Memory (MB)'].sum()))
+
+                trend_source = partial(load_trends, results_key, cube_source, ad_summary, trend_end, stored)
+                render_results(lang_code, results_key, summary, ad_summary, time_data, rules, account_summary, show_progress, trend_source)
+                results = (summary, ad_summary, time_data, original_columns, account_summary)
+                publish_panel(t, snapshot_name, results_key, rules, results, trend_source)
+
+        except MissingColumnsError as e:
+            st.error(t["missing_columns"].format(columns=', '.join(e.columns)))
+        except InvalidDatesError as e:
+            st.error(t["invalid_dates"])
+            st.write(t["invalid_rows"], e.invalid_rows)
+        except EmptyDataError:
+            st.error(t["empty_data"])
         except Exception as e:
             st.error(t["processing_error"].format(error=str(e)))
             st.markdown(t["processing_check"])
+        finally:
+            progress.empty()
+            if profiler is not None:
+                profiler.emit()
+                performance_panel(t, profiler.records + profiler.attached)
+    else:
+        # The uploads were removed; a job still parsing them is of no use
+        cancel_job()
 
     # Close RTL div for Arabic
     if lang_code == "ar":
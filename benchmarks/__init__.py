@@ -0,0 +1,9 @@
+"""Reproducible benchmarks of the analysis pipeline on synthetic TikTok Ads exports.
+
+    python -m benchmarks --sizes 1k,100k --formats xlsx,csv
+
+See benchmarks/run.py for the options and the baseline comparison, and
+benchmarks/load.py for the load test of the app with concurrent sessions:
+
+    python -m benchmarks.load --sessions 1,4,8 --sizes 1k,100k
+"""
@@ -0,0 +1,360 @@
+"""Load test of the Streamlit app with concurrent simulated sessions.
+
+    python -m benchmarks.load --sessions 1,4,8 --sizes 1k,100k --formats csv,xlsx
+
+Every session is an AppTest of app.py run in its own thread, so all of them
+share the server process, its caches and its job queue like real browser
+sessions do. AppTest cannot upload files, so a stand-in st.file_uploader
+returns the generated export of each session. A session uploads its export,
+switches the language and then reruns ``--reruns`` times.
+
+For each concurrency level and step the report gives the p50, p95 and p99 of
+the time to the first st.metric and of the time until the script run
+completes, and the peak RSS of the server process and of each of its
+child processes. Each session gets its own export unless ``--shared`` is
+given, which has every session of a level upload the same bytes. Levels
+never reuse the exports of earlier ones and the store directory is a fresh
+temporary one, so cached results do not hide the parsing. Results are
+written to ``--output`` as JSON and compared with ``--baseline`` like
+benchmarks.run does; the exit status is 1 when a p95 got slower by more than
+``--tolerance``.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.run import DEFAULT_DATA_DIR, MIN_REGRESSION_SECONDS, environment, write_json
+from benchmarks.synthetic import export_file, format_size, parse_size
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(os.path.dirname(BENCHMARK_DIR), 'app.py')
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, 'load_latest.json')
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'load_baseline.json')
+PERCENTILES = [50, 95, 99]
+# Seconds between RSS samples
+RSS_INTERVAL = 0.05
+# Session state keys of the stand-in widgets
+UPLOAD_KEY = 'load_test_upload'
+FIRST_METRIC_KEY = 'load_test_first_metric'
+
+
+class StandInUpload(io.BytesIO):
+    """What st.file_uploader returns for one file: its bytes with a name, size and file_id."""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+        self.file_id = uuid.uuid4().hex
+
+
+def install_stand_ins(st):
+    """Replace st.file_uploader with the session's UPLOAD_KEY file and time the first st.metric of each run."""
+    metric = st.metric
+
+    def file_uploader(label, *args, accept_multiple_files=False, **kwargs):
+        upload = st.session_state.get(UPLOAD_KEY)
+        files = [upload] if upload is not None else []
+        if accept_multiple_files:
+            return files
+        return files[0] if files else None
+
+    def timed_metric(*args, **kwargs):
+        if st.session_state.get(FIRST_METRIC_KEY) is None:
+            st.session_state[FIRST_METRIC_KEY] = time.perf_counter()
+        return metric(*args, **kwargs)
+
+    st.file_uploader = file_uploader
+    st.metric = timed_metric
+
+
+def share_test_runtime():
+    """Let concurrent AppTest runs share one runtime and one script cache, like the sessions of a server.
+
+    AppTest installs a stand-in Runtime singleton for each script run and
+    clears it when the run ends, which pulls it from under the runs of the
+    other sessions, so Runtime lookups fall back on the last one installed.
+    Each run also compiles app.py into a script cache of its own, and
+    concurrent compiles can fail on Python 3.11.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+
+    installed = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            installed[:] = [cls._instance]
+        if not installed:
+            raise RuntimeError("Runtime hasn't been created!")
+        return installed[0]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(installed))
+
+
+def _rss_mb(pid):
+    """Resident memory of ``pid`` in MB from /proc, or None where it is unavailable."""
+    try:
+        with open(f'/proc/{pid}/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _children(pid):
+    """(command name, pid) of the child processes of ``pid``."""
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return []
+    children = []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', encoding='ascii', errors='replace') as f:
+                # The parent pid follows the parenthesized command name
+                name, fields = f.read().split(' (', 1)[1].rsplit(')', 1)
+                if int(fields.split()[1]) == pid:
+                    children.append((name, int(entry)))
+        except (OSError, IndexError, ValueError):
+            pass
+    return children
+
+
+class RssSampler:
+    """Background thread recording the peak RSS of this process and of its child processes."""
+
+    def __init__(self, interval=RSS_INTERVAL):
+        self.interval = interval
+        self.peaks = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _sample(self):
+        pid = os.getpid()
+        for name, process in [('server', pid)] + [(f'{name} {child}', child) for name, child in _children(pid)]:
+            rss = _rss_mb(process)
+            if rss is not None:
+                self.peaks[name] = max(self.peaks.get(name, 0), rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def run_session(upload, barrier, reruns=1, streaming=False, timeout=600):
+    """Drive one AppTest session; returns (step, seconds to first metric or None, seconds to complete, error) tuples.
+
+    A session stops at its first step that fails, since the widgets the
+    next step uses may be missing.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    from adanalyze.translations import translations
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state['streaming'] = streaming
+    samples = []
+
+    def step(name, before=None):
+        at.session_state[FIRST_METRIC_KEY] = None
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        error = None
+        try:
+            at.run()
+            errors = [e.value for e in at.exception] + [e.value for e in at.error]
+            error = errors[0] if errors else None
+        except Exception as e:
+            error = repr(e)
+        finished = time.perf_counter()
+        first = at.session_state[FIRST_METRIC_KEY] if FIRST_METRIC_KEY in at.session_state else None
+        samples.append((name, None if first is None else first - started, finished - started, error))
+        return error is None
+
+    # Sessions connect first, then upload together
+    opened = step('open')
+    barrier.wait()
+    arabic = translations['en']['arabic']
+    steps = [
+        ('upload', lambda: at.session_state.__setitem__(UPLOAD_KEY, upload)),
+        ('language', lambda: at.sidebar.radio[0].set_value(arabic)),
+    ] + [('rerun', None)] * reruns
+    if opened:
+        for name, before in steps:
+            if not step(name, before):
+                break
+    return samples
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    return {f'p{p}': round(float(np.percentile(values, p)), 4) for p in PERCENTILES}
+
+
+def summarize_samples(samples):
+    """Percentiles of the time to first metric and to completion per step."""
+    steps = {}
+    for name, first, complete, error in samples:
+        steps.setdefault(name, []).append((first, complete, error))
+    return {
+        name: {
+            'runs': len(runs),
+            'errors': sum(error is not None for _, _, error in runs),
+            'first_metric_seconds': _percentiles([first for first, _, error in runs if first is not None and error is None]),
+            'complete_seconds': _percentiles([complete for _, complete, error in runs if error is None]),
+        }
+        for name, runs in steps.items()
+    }
+
+
+def run_level(uploads, reruns=1, streaming=False, timeout=600):
+    """Run one session per upload at once; returns the step summaries, wall seconds, peak RSS and errors."""
+    barrier = threading.Barrier(len(uploads))
+    started = time.perf_counter()
+    with RssSampler() as sampler, ThreadPoolExecutor(max_workers=len(uploads)) as executor:
+        futures = [executor.submit(run_session, upload, barrier, reruns, streaming, timeout) for upload in uploads]
+        samples = [sample for future in futures for sample in future.result()]
+    return {
+        'steps': summarize_samples(samples),
+        'wall_seconds': round(time.perf_counter() - started, 3),
+        'peak_rss_mb': {name: round(mb, 1) for name, mb in sampler.peaks.items()},
+        'errors': sorted({error for *_, error in samples if error is not None}),
+    }
+
+
+def session_uploads(sessions, sizes, formats, data_dir, seed=0, shared=False):
+    """One StandInUpload per session, cycling through the sizes and formats."""
+    cases = [(rows, file_format) for rows in sizes for file_format in formats]
+    uploads = []
+    for i in range(sessions):
+        rows, file_format = cases[i % len(cases)]
+        path = export_file(data_dir, rows, file_format, seed if shared else seed + i)
+        with open(path, 'rb') as f:
+            uploads.append(StandInUpload(os.path.basename(path), f.read()))
+    return uploads
+
+
+def compare(results, baseline, tolerance):
+    """Print the p95 completion times against the baseline and return the number of regressions."""
+    regressions = 0
+    print(f"{'case':<16}{'step':<10}{'baseline p95':>14}{'current p95':>13}{'ratio':>8}")
+    for case, result in results['cases'].items():
+        old = baseline.get('cases', {}).get(case)
+        if old is None:
+            print(f"{case:<16}(not in baseline)")
+            continue
+        for step, current in result['steps'].items():
+            previous = old['steps'].get(step)
+            if not previous or not previous['complete_seconds'] or not current['complete_seconds']:
+                continue
+            before, after = previous['complete_seconds']['p95'], current['complete_seconds']['p95']
+            ratio = after / before if before else float('inf')
+            slower = ratio > 1 + tolerance and after - before > MIN_REGRESSION_SECONDS
+            regressions += slower
+            flag = '  slower' if slower else ''
+            print(f"{case:<16}{step:<10}{before:>14.3f}{after:>13.3f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def print_level(case, result):
+    print(f"{case}: {result['wall_seconds']:.2f}s, peak RSS "
+          + ', '.join(f"{name} {mb:.0f} MB" for name, mb in result['peak_rss_mb'].items()), file=sys.stderr)
+    for step, summary in result['steps'].items():
+        first, complete = summary['first_metric_seconds'] or {}, summary['complete_seconds'] or {}
+        print(f"  {step:<9}" + ''.join(f" {key} {first.get(key, float('nan')):.3f}/{complete.get(key, float('nan')):.3f}s" for key in ('p50', 'p95', 'p99'))
+              + (f"  {summary['errors']} error(s)" if summary['errors'] else ''), file=sys.stderr)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load', description="Load test the Streamlit app with concurrent sessions.")
+    parser.add_argument('--sessions', default='1,4', help="comma-separated numbers of concurrent sessions, e.g. 1,4,8")
+    parser.add_argument('--sizes', default='1k,10k', help="comma-separated export row counts the sessions cycle through")
+    parser.add_argument('--formats', default='csv', help="comma-separated export formats: xlsx, csv")
+    parser.add_argument('--reruns', type=int, default=1, help="reruns per session after the language switch")
+    parser.add_argument('--streaming', action='store_true', help="analyse the uploads in streaming mode")
+    parser.add_argument('--shared', action='store_true', help="have every session upload the same export")
+    parser.add_argument('--seed', type=int, default=0, help="generator seed of the first session")
+    parser.add_argument('--timeout', type=float, default=600, help="seconds one script run may take")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="where generated exports are cached")
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT, help="results JSON")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument('--update-baseline', action='store_true', help="write the results to --baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed p95 slowdown ratio per step")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    # The store location is read when adanalyze is imported, which the first session does
+    os.environ['ADANALYZE_STORE_DIR'] = tempfile.mkdtemp(prefix='adanalyze-load-')
+    import streamlit as st
+    install_stand_ins(st)
+    share_test_runtime()
+
+    sizes = list(map(parse_size, args.sizes.split(',')))
+    formats = args.formats.split(',')
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'sizes': [format_size(rows) for rows in sizes],
+        'formats': formats,
+        'seed': args.seed,
+        'reruns': args.reruns,
+        'streaming': args.streaming,
+        'shared': args.shared,
+        'cases': {},
+    }
+    seed = args.seed
+    for sessions in map(int, args.sessions.split(',')):
+        case = f"sessions-{sessions}"
+        uploads = session_uploads(sessions, sizes, formats, args.data_dir, seed, args.shared)
+        seed += 1 if args.shared else sessions
+        result = run_level(uploads, args.reruns, args.streaming, args.timeout)
+        results['cases'][case] = {'sessions': sessions, **result}
+        print_level(case, result)
+    write_json(results, args.output)
+
+    regressions = 0
+    if args.update_baseline:
+        write_json(results, args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        print(f"{regressions} step(s) slower than the baseline by more than {args.tolerance:.0%}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Time each stage of the analysis pipeline on synthetic exports.
+
+    python -m benchmarks --sizes 1k,100k,1m --formats xlsx --repeat 3
+
+Every stage is timed on its own, with the output of the previous stage as
+input. Wall time is the best of ``--repeat`` runs. Peak memory comes from a
+separate run under tracemalloc, so tracing does not inflate the timings. The
+results are written to ``--output`` as JSON. They are compared stage by stage
+with ``--baseline`` when that file exists, and ``--update-baseline`` replaces
+it. The exit status is 1 when a stage got slower than the baseline by more
+than ``--tolerance``.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from adanalyze.engine import (
+    add_kpi_columns, coerce_numeric, generate_suggestions, normalize_columns, parse_dates, read_export,
+    summarize_frame,
+)
+from adanalyze.translations import translations
+from benchmarks.synthetic import export_file, format_size, parse_size
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA_DIR = os.path.join(BENCHMARK_DIR, 'data')
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, 'latest.json')
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+# Differences below this many seconds are noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def pipeline_stages(data, file_format, dayfirst=True, t=translations['en']):
+    """(name, function) pairs; each function takes the previous stage's result."""
+    return [
+        ('read', lambda _: read_export(data, file_format)[0]),
+        ('columns', lambda raw: normalize_columns(raw)[0]),
+        ('dates', lambda df: parse_dates(df, dayfirst)),
+        ('numeric', coerce_numeric),
+        ('kpis', add_kpi_columns),
+        ('aggregate', summarize_frame),
+        ('suggestions', lambda result: generate_suggestions(result[0], result[1], t)),
+    ]
+
+
+def time_stages(stages):
+    seconds = {}
+    value = None
+    for name, func in stages:
+        started = time.perf_counter()
+        value = func(value)
+        seconds[name] = time.perf_counter() - started
+    return seconds
+
+
+def trace_stages(stages):
+    """Peak bytes allocated by each stage on top of what was live before it."""
+    peaks = {}
+    value = None
+    tracemalloc.start()
+    try:
+        for name, func in stages:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            value = func(value)
+            peaks[name] = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def benchmark_file(path, file_format, repeat=3):
+    with open(path, 'rb') as f:
+        data = f.read()
+    runs = [time_stages(pipeline_stages(data, file_format)) for _ in range(repeat)]
+    peaks = trace_stages(pipeline_stages(data, file_format))
+    stages = {
+        name: {
+            'seconds': round(min(run[name] for run in runs), 4),
+            'peak_mb': round(peaks[name] / 2**20, 2),
+        }
+        for name in runs[0]
+    }
+    return {
+        'format': file_format,
+        'bytes': len(data),
+        'stages': stages,
+        'total_seconds': round(sum(stage['seconds'] for stage in stages.values()), 4),
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print a stage-by-stage comparison and return the number of regressions."""
+    regressions = 0
+    print(f"{'case':<14}{'stage':<13}{'baseline s':>12}{'current s':>12}{'ratio':>8}{'peak MB':>10}")
+    for case, result in results['cases'].items():
+        old = baseline.get('cases', {}).get(case)
+        if old is None:
+            print(f"{case:<14}(not in baseline)")
+            continue
+        for stage, current in result['stages'].items():
+            previous = old['stages'].get(stage)
+            if previous is None:
+                continue
+            ratio = current['seconds'] / previous['seconds'] if previous['seconds'] else float('inf')
+            slower = (ratio > 1 + tolerance
+                      and current['seconds'] - previous['seconds'] > MIN_REGRESSION_SECONDS)
+            regressions += slower
+            flag = '  slower' if slower else ''
+            print(f"{case:<14}{stage:<13}{previous['seconds']:>12.4f}{current['seconds']:>12.4f}"
+                  f"{ratio:>8.2f}{current['peak_mb']:>10.1f}{flag}")
+    return regressions
+
+
+def write_json(payload, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Benchmark the analysis pipeline stage by stage.")
+    parser.add_argument('--sizes', default='1k,100k,1m', help="comma-separated row counts, e.g. 1k,100k,1m")
+    parser.add_argument('--formats', default='xlsx', help="comma-separated export formats: xlsx, csv")
+    parser.add_argument('--seed', type=int, default=0, help="generator seed")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per case; the fastest is kept")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="where generated exports are cached")
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT, help="results JSON")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument('--update-baseline', action='store_true', help="write the results to --baseline")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="allowed slowdown ratio per stage")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'cases': {},
+    }
+    for file_format in args.formats.split(','):
+        for rows in map(parse_size, args.sizes.split(',')):
+            case = f"{file_format}-{format_size(rows)}"
+            path = export_file(args.data_dir, rows, file_format, args.seed)
+            result = benchmark_file(path, file_format, args.repeat)
+            results['cases'][case] = {'rows': rows, **result}
+            print(f"{case}: {result['total_seconds']:.3f}s", file=sys.stderr)
+    # ru_maxrss is in kilobytes on Linux
+    results['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    write_json(results, args.output)
+
+    regressions = 0
+    if args.update_baseline:
+        write_json(results, args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        print(f"{regressions} stage(s) slower than the baseline by more than {args.tolerance:.0%}", file=sys.stderr)
+    return 1 if regressions else 0
@@ -0,0 +1,130 @@
+"""Seeded generator of realistic TikTok Ads exports.
+
+The exports carry the required and optional metric columns, a few columns the
+analysis ignores, dates in several formats, '-' placeholders for missing
+values and a trailing total row, like the files users download from TikTok
+Ads Manager. The same ``rows`` and ``seed`` always give the same file.
+
+    python -m benchmarks.synthetic 100k exports/sample.xlsx
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Formats seen in exports from different account locales
+DATE_FORMATS = ['%d/%m/%Y', '%Y-%m-%d', '%d/%m/%Y %H:%M', '%Y-%m-%d %H:%M:%S']
+PLACEHOLDER = '-'
+# Share of optional metric cells exported as '-' and of rows without a date
+PLACEHOLDER_SHARE = 0.01
+MISSING_DATE_SHARE = 0.001
+START_DATE = '2024-01-01'
+DAYS = 180
+ROWS_PER_AD = 30
+
+
+def parse_size(text):
+    """'1k' -> 1000, '1m' -> 1000000, '250' -> 250."""
+    text = text.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def format_size(rows):
+    for suffix, unit in (('m', 1_000_000), ('k', 1_000)):
+        if rows >= unit and rows % unit == 0:
+            return f"{rows // unit}{suffix}"
+    return str(rows)
+
+
+def _with_placeholders(values, rng, share=PLACEHOLDER_SHARE):
+    column = pd.Series(values, dtype=object)
+    column[rng.random(len(column)) < share] = PLACEHOLDER
+    return column
+
+
+def generate_export(rows, seed=0, ads=None, days=DAYS):
+    """A DataFrame shaped like a TikTok Ads export with ``rows`` ad/day rows plus a total row."""
+    rng = np.random.default_rng(seed)
+    ads = ads or max(10, rows // ROWS_PER_AD)
+    dates = pd.date_range(START_DATE, periods=days)
+    day = rng.integers(0, days, rows)
+    style = rng.integers(0, len(DATE_FORMATS), rows)
+    formatted = np.stack([dates.strftime(fmt).to_numpy(dtype=object) for fmt in DATE_FORMATS])
+    date_created = formatted[style, day]
+    date_created[rng.random(rows) < MISSING_DATE_SHARE] = PLACEHOLDER
+
+    ad = rng.integers(0, ads, rows)
+    impressions = rng.lognormal(7, 1.5, rows).astype(np.int64)
+    clicks = rng.binomial(impressions, rng.uniform(0.002, 0.03, rows))
+    conversions = rng.binomial(clicks, rng.uniform(0, 0.1, rows))
+    cost = (impressions / 1000 * rng.lognormal(2, 0.5, rows)).round(2)
+    video_views = rng.binomial(impressions, 0.6)
+    views_2s = rng.binomial(video_views, 0.5)
+    views_6s = rng.binomial(views_2s, 0.4)
+    views_100 = rng.binomial(views_6s, 0.3)
+    play_time = rng.uniform(1, 15, rows).round(2)
+    landing_page_views = rng.binomial(clicks, 0.8)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        landing_page_rate = _with_placeholders((landing_page_views / clicks * 100).round(2), rng)
+    # TikTok leaves the rate empty when there were no clicks
+    landing_page_rate[clicks == 0] = PLACEHOLDER
+    groups = min(ads, 200)
+
+    df = pd.DataFrame({
+        'Campaign name': pd.Categorical.from_codes(ad % 20, [f'Campaign {i}' for i in range(20)]).astype(object),
+        'Ad group name': pd.Categorical.from_codes(ad % groups, [f'Ad group {i}' for i in range(groups)]).astype(object),
+        'Ad name': pd.Categorical.from_codes(ad, [f'Ad {i:06d}' for i in range(ads)]).astype(object),
+        'Date Created': date_created,
+        'Currency': 'USD',
+        'Impressions': impressions,
+        'Clicks (destination)': clicks,
+        'Cost': cost,
+        'Conversions': conversions,
+        'Video views': _with_placeholders(video_views, rng),
+        '2-second video views': _with_placeholders(views_2s, rng),
+        '6-second video views': _with_placeholders(views_6s, rng),
+        'Video views at 100%': _with_placeholders(views_100, rng),
+        'Average play time per video view': _with_placeholders(play_time, rng),
+        'Landing page views (website)': _with_placeholders(landing_page_views, rng),
+        'Landing page view rate (website)': landing_page_rate,
+    })
+    total = {col: PLACEHOLDER for col in df.columns}
+    total['Ad name'] = f'Total of {rows} results'
+    for col in ['Impressions', 'Clicks (destination)', 'Cost', 'Conversions']:
+        total[col] = df[col].sum()
+    return pd.concat([df, pd.DataFrame([total])], ignore_index=True)
+
+
+def write_export(df, path):
+    """Write ``df`` as .csv or .xlsx depending on the extension of ``path``."""
+    if path.lower().endswith('.csv'):
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+
+
+def export_file(data_dir, rows, file_format='xlsx', seed=0):
+    """Path of the generated export for ``rows`` and ``seed``, writing it on first use."""
+    path = os.path.join(data_dir, f"tiktok_{format_size(rows)}_seed{seed}.{file_format}")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp.{file_format}"
+        write_export(generate_export(rows, seed), tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) not in (2, 3):
+        print("usage: python -m benchmarks.synthetic ROWS OUTPUT.{xlsx,csv} [SEED]", file=sys.stderr)
+        return 2
+    seed = int(argv[2]) if len(argv) == 3 else 0
+    write_export(generate_export(parse_size(argv[0]), seed), argv[1])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The dataset store directory is read when adanalyze.storage is imported
+os.environ.setdefault('ADANALYZE_STORE_DIR', tempfile.mkdtemp(prefix='adanalyze-tests-'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_export  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def export_frame():
+    return generate_export(3000, seed=1)
+
+
+@pytest.fixture(scope='session')
+def export_bytes(export_frame):
+    return export_frame.to_csv(index=False).encode()
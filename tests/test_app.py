@@ -0,0 +1,101 @@
+import pytest
+import streamlit as st
+from streamlit.elements.lib import policies
+from streamlit.testing.v1 import AppTest
+
+from adanalyze.jobs import JobQueue
+from adanalyze.translations import translations
+from benchmarks.load import APP_PATH, UPLOAD_KEY, StandInUpload, install_stand_ins
+
+TIMEOUT = 120
+
+
+@pytest.fixture(scope='module', autouse=True)
+def stand_ins():
+    file_uploader, metric = st.file_uploader, st.metric
+    install_stand_ins(st)
+    yield
+    st.file_uploader, st.metric = file_uploader, metric
+
+
+def test_first_load():
+    at = AppTest.from_file(APP_PATH, default_timeout=TIMEOUT).run()
+    assert not at.exception
+    assert at.title[0].value == translations['en']['title']
+
+
+def test_upload_is_analyzed(export_bytes):
+    at = AppTest.from_file(APP_PATH, default_timeout=TIMEOUT)
+    at.session_state[UPLOAD_KEY] = StandInUpload('export.csv', export_bytes)
+    at.run()
+    assert not at.exception
+    assert at.metric
+    assert not at.get('download_button')
+
+    at.button(key='ad_summary_prepare_downloads').click().run()
+    assert not at.exception
+    assert at.get('download_button')
+
+    at.sidebar.radio[0].set_value(at.sidebar.radio[0].options[1]).run()
+    assert not at.exception
+    assert at.title[0].value == translations['ar']['title']
+
+
+def test_recent_datasets_tell_stored_kinds_apart(export_frame):
+    # Bytes no other test uploads, so both entries carry this name
+    data = export_frame.head(500).to_csv(index=False).encode()
+    for streaming in (False, True):
+        at = AppTest.from_file(APP_PATH, default_timeout=TIMEOUT)
+        at.session_state['streaming'] = streaming
+        at.session_state[UPLOAD_KEY] = StandInUpload('kinds.csv', data)
+        at.run()
+        assert not at.exception
+    at = AppTest.from_file(APP_PATH, default_timeout=TIMEOUT).run()
+    (picker,) = [box for box in at.sidebar.selectbox if box.label == translations['en']['recent_datasets']]
+    labels = [option for option in picker.options if option.startswith('kinds.csv')]
+    assert len(labels) == 2 and len(set(labels)) == 2
+
+
+def test_page_is_clamped_when_a_filter_leaves_fewer_pages(export_bytes, monkeypatch):
+    # Streamlit shows the widget state warning once per process
+    monkeypatch.setattr(policies, '_shown_default_value_warning', False)
+    at = AppTest.from_file(APP_PATH, default_timeout=TIMEOUT)
+    at.session_state[UPLOAD_KEY] = StandInUpload('export.csv', export_bytes)
+    at.run()
+    at.number_input(key='ad_summary_page_input').set_value(2).run()
+    assert at.number_input(key='ad_summary_page_input').value == 2
+
+    at.text_input(key='ad_summary_search_input').set_value('no such ad').run()
+    assert not at.exception
+    assert not at.warning
+    page = at.number_input(key='ad_summary_page_input')
+    assert page.value == 1 and page.proto.max == 1
+
+
+def test_reruns_with_cached_results_queue_no_job(export_frame, monkeypatch):
+    acquired = []
+    acquire = JobQueue.acquire
+
+    def counting_acquire(self, key, /, *args, **kwargs):
+        acquired.append(key)
+        return acquire(self, key, *args, **kwargs)
+
+    monkeypatch.setattr(JobQueue, 'acquire', counting_acquire)
+    data = export_frame.head(1000).to_csv(index=False).encode()
+    at = AppTest.from_file(APP_PATH, default_timeout=TIMEOUT)
+    at.session_state[UPLOAD_KEY] = StandInUpload('reruns.csv', data)
+    at.run()
+    assert not at.error
+    assert len(acquired) == 1
+
+    at.sidebar.radio[0].set_value(at.sidebar.radio[0].options[1]).run()
+    at.text_input(key='ad_summary_search_input').set_value('Ad 00000').run()
+    assert not at.exception
+    assert len(acquired) == 1
+
+    # Another session uploading the same bytes reads the stored results
+    other = AppTest.from_file(APP_PATH, default_timeout=TIMEOUT)
+    other.session_state[UPLOAD_KEY] = StandInUpload('reruns.csv', data)
+    other.run()
+    assert not other.exception
+    assert len(acquired) == 1
@@ -0,0 +1,19 @@
+import json
+import os
+
+from adanalyze.cli import main
+
+
+def test_corrupt_export_fails_only_itself(export_bytes, tmp_path, capsys):
+    exports = tmp_path / 'exports'
+    exports.mkdir()
+    (exports / 'good.csv').write_bytes(export_bytes)
+    # A truncated zip, which openpyxl rejects with zipfile.BadZipFile
+    (exports / 'corrupt.xlsx').write_bytes(b'PK\x03\x04' + bytes(100))
+    output = tmp_path / 'results'
+
+    assert main([str(exports), '-o', str(output), '--workers', '1', '--format', 'json']) == 1
+    assert 'corrupt.xlsx' in capsys.readouterr().err
+    with open(output / 'good.csv' / 'summary.json', encoding='utf-8') as f:
+        assert json.load(f)['summary']['total_impressions'] > 0
+    assert not os.path.exists(output / 'corrupt.xlsx')
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from adanalyze.engine import SUGGESTION_RULES, evaluate_rules, parse_upload, run_pipeline, summarize_frame, with_thresholds
+
+
+def assert_results_equal(left, right):
+    assert left['columns'] == right['columns']
+    assert left['summary'] == right['summary']
+    pd.testing.assert_frame_equal(left['ad_summary'], right['ad_summary'], check_dtype=False)
+    pd.testing.assert_frame_equal(left['time_data'], right['time_data'], check_dtype=False)
+
+
+def test_streaming_matches_rows(export_bytes):
+    rows = run_pipeline(export_bytes, 'csv')
+    streamed = run_pipeline(export_bytes, 'csv', streaming=True, chunk_rows=500)
+    assert_results_equal(rows, streamed)
+
+
+def test_evaluate_rules_orders_campaign_rules_first():
+    rules = [rule for rule in SUGGESTION_RULES if rule['key'] in ('low_ctr', 'ad_low_ctr')]
+    ad_summary = pd.DataFrame({'Ad name': ['a', 'b', 'c'], 'CTR (destination)': [0.3, 0.8, 2.0]})
+    matches = evaluate_rules({'avg_ctr': 0.4}, ad_summary, rules)
+    assert matches[['rule', 'ad_name', 'priority']].values.tolist() == [
+        ['low_ctr', None, 'high'], ['ad_low_ctr', 'a', 'high'], ['ad_low_ctr', 'b', 'medium']]
+
+
+def test_with_thresholds_scales_high_band():
+    rule = next(rule for rule in SUGGESTION_RULES if 'high' in rule)
+    (changed,) = [r for r in with_thresholds({rule['key']: rule['threshold'] * 2}) if r['key'] == rule['key']]
+    assert changed['threshold'] == rule['threshold'] * 2
+    assert changed['high'] == rule['high'] * 2
+    assert with_thresholds({}) == SUGGESTION_RULES
+
+
+def test_ad_summary_matches_plain_groupby(export_bytes):
+    rows, _ = parse_upload(export_bytes, 'csv')
+    _, ad_summary, _ = summarize_frame(rows)
+    rows = rows.replace({'Cost per conversion': {np.inf: 0}})
+    expected = rows.groupby('Ad name').agg({
+        'Impressions': 'sum', 'Cost': 'sum', 'CTR (destination)': 'mean', 'Cost per conversion': 'mean',
+    }).round(2).reset_index()
+    pd.testing.assert_frame_equal(ad_summary[expected.columns], expected, check_dtype=False, atol=0.0101)
+
+
+def test_compact_matches_rows(export_bytes):
+    assert_results_equal(run_pipeline(export_bytes, 'csv'), run_pipeline(export_bytes, 'csv', compact=True))
+
+
+def test_compact_rows_take_less_memory(export_bytes):
+    rows, _ = parse_upload(export_bytes, 'csv')
+    compact, _ = parse_upload(export_bytes, 'csv', compact=True)
+    assert compact.memory_usage(deep=True).sum() < rows.memory_usage(deep=True).sum() / 2
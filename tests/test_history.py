@@ -0,0 +1,36 @@
+import pandas as pd
+
+from adanalyze.engine import aggregate_chunk, parse_upload, summarize_frame
+from adanalyze.history import AggregateHistory
+
+
+def test_overlapping_exports_are_not_double_counted(export_bytes, tmp_path):
+    rows, columns = parse_upload(export_bytes, 'csv')
+    middle = rows['Date Created'].min() + pd.Timedelta(days=15)
+    earlier = rows[rows['Date Created'] <= middle + pd.Timedelta(days=3)]
+    later = rows[rows['Date Created'] >= middle]
+    history = AggregateHistory(str(tmp_path))
+
+    first = aggregate_chunk(earlier)
+    assert history.append(first, 'earlier', columns) == (len(first), 0)
+    second = aggregate_chunk(later)
+    overlap = int(second.index.isin(first.index).sum())
+    assert overlap > 0
+    assert history.append(second, 'later', columns) == (len(second) - overlap, overlap)
+    assert len(history.cells()) == len(aggregate_chunk(rows))
+
+    summary, ad_summary, time_data = history.summarize()
+    expected = summarize_frame(rows)
+    assert summary == expected[0]
+    pd.testing.assert_frame_equal(ad_summary, expected[1], check_dtype=False, atol=0.0101)
+    pd.testing.assert_frame_equal(time_data, expected[2], check_dtype=False)
+
+
+def test_source_is_appended_once(export_bytes, tmp_path):
+    rows, columns = parse_upload(export_bytes, 'csv')
+    history = AggregateHistory(str(tmp_path))
+    agg = aggregate_chunk(rows)
+    history.append(agg, 'export', columns)
+    assert history.contains('export')
+    assert history.append(agg, 'export', columns) == (0, 0)
+    assert history.metadata()['sources'] == ['export']
@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+
+from adanalyze.instrumentation import Profiler, attach_records, stage
+from adanalyze.jobs import Job, JobCancelled, JobQueue
+
+
+def work(release):
+    with stage('work'):
+        while not release.wait(0.01):
+            with stage('step'):
+                pass
+    return 'done'
+
+
+def test_job_returns_its_result():
+    release = threading.Event()
+    release.set()
+    job = Job('key', work, release).start()
+    assert job.wait(10)
+    assert job.result() == 'done'
+
+
+def test_cancelled_job_stops_at_the_next_stage():
+    release = threading.Event()
+    job = Job('key', work, release).start()
+    with pytest.raises(RuntimeError):
+        job.result()
+    job.cancel()
+    assert job.wait(10)
+    with pytest.raises(JobCancelled):
+        job.result()
+    assert not release.is_set()
+
+
+def test_stage_records_are_kept_on_the_job():
+    release = threading.Event()
+    release.set()
+    job = Job('key', work, release).start()
+    assert job.wait(10)
+    assert [record['stage'] for record in job.records] == ['work']
+    # Every session sharing the job shows its records under its own stages
+    for _ in range(2):
+        with Profiler(trace_memory=False) as profiler:
+            with stage('run'):
+                attach_records(job.records)
+        assert [(record['stage'], record['depth']) for record in profiler.attached] == [('work', 1)]
+
+
+def test_sessions_share_a_job_by_key():
+    queue = JobQueue(max_workers=2)
+    release = threading.Event()
+    first = queue.acquire('key', 'a', 1, None, work, release)
+    second = queue.acquire('key', 'b', 1, None, work, release)
+    assert first is second
+    assert first.users == 2
+    release.set()
+    assert first.wait(10)
+    assert first.result() == 'done'
+    assert queue.acquire('key', 'a', 1, None, work, release) is not first
+
+
+def test_job_is_cancelled_once_every_session_released_it():
+    queue = JobQueue(max_workers=2)
+    release = threading.Event()
+    job = queue.acquire('key', 'a', 1, None, work, release)
+    queue.acquire('key', 'b', 1, None, work, release)
+    queue.release(job)
+    assert not job.cancelled
+    queue.release(job)
+    assert job.cancelled
+    assert job.wait(10)
+    with pytest.raises(JobCancelled):
+        job.result()
+
+
+def test_waiting_jobs_start_in_fair_order():
+    queue = JobQueue(max_workers=2)
+    release = threading.Event()
+    running = [queue.acquire(key, 'a', 1, None, work, release) for key in ('one', 'two')]
+    # Owner a already used two units, so b's later job goes first
+    later = queue.acquire('three', 'a', 1, None, work, release)
+    first = queue.acquire('four', 'b', 1, None, work, release)
+    assert later.started_at is None and first.started_at is None
+    assert (queue.position(first), queue.position(later)) == (0, 1)
+    release.set()
+    for job in running + [first, later]:
+        assert job.wait(10)
+        assert job.result() == 'done'
+
+
+def test_large_job_does_not_take_the_last_free_worker():
+    queue = JobQueue(max_workers=3, large_bytes=100)
+    release = threading.Event()
+    large = queue.acquire('large', 'a', 100, None, work, release)
+    small = queue.acquire('small', 'b', 1, None, work, release)
+    waiting = queue.acquire('second large', 'c', 100, None, work, release)
+    assert large.started_at is not None and small.started_at is not None
+    assert waiting.started_at is None
+    # The last worker still takes a small job
+    last = queue.acquire('second small', 'd', 1, None, work, release)
+    assert last.started_at is not None
+    release.set()
+    for job in (large, small, waiting, last):
+        assert job.wait(10)
+        assert job.result() == 'done'
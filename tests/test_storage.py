@@ -0,0 +1,25 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from adanalyze.storage import DatasetStore
+
+
+def test_concurrent_saves_of_one_key_publish_whole_files(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    frames = [pd.DataFrame({'Impressions': range(n * 1000)}) for n in range(1, 9)]
+
+    def save(frame):
+        store.save('key', frame, 'rows', 'export.csv', ['Impressions'])
+        store.save_results('key', {'total_impressions': len(frame)}, {'ad_summary': frame}, ['Impressions'])
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(save, frames))
+
+    frame, meta = store.load('key')
+    assert len(frame) in {len(f) for f in frames}
+    summary, tables, _ = store.load_results('key')
+    assert len(tables['ad_summary']) in {len(f) for f in frames}
+    leftovers = [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith('.tmp')]
+    assert not leftovers
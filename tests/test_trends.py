@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from adanalyze.trends import ANOMALY_SUFFIX, BASELINE_DAYS, discoveries, score_matrices, t_test_p
+
+ADS = 2000
+
+
+@pytest.mark.parametrize('t, df, expected', [(2.228, 10, 0.05), (3.0, 13, 0.0102), (2.0, 2, 0.1835), (-2.0, 2, 0.1835)])
+def test_t_test_p(t, df, expected):
+    assert t_test_p(np.array([t]), np.array([df]))[0] == pytest.approx(expected, abs=5e-4)
+
+
+def test_discoveries_skips_nan():
+    p = np.array([0.001, 0.002, 0.9, np.nan])
+    assert discoveries(p).tolist() == [True, True, False, False]
+    assert not discoveries(np.array([0.2, 0.5, np.nan])).any()
+
+
+def daily_clicks(rng, ctr):
+    impressions = np.full((BASELINE_DAYS + 1, ADS), 5000)
+    return {'Impressions': impressions, 'Clicks (destination)': rng.binomial(impressions, ctr)}
+
+
+def test_noise_is_not_scored():
+    scores = score_matrices(daily_clicks(np.random.default_rng(0), 0.02))
+    for name, values in scores.items():
+        assert np.count_nonzero(~np.isnan(values)) <= ADS * 0.002, name
+
+
+def test_planted_drop_is_scored():
+    rng = np.random.default_rng(0)
+    matrices = daily_clicks(rng, 0.02)
+    dropped = np.arange(10)
+    matrices['Clicks (destination)'][-1, dropped] = rng.binomial(5000, 0.004, len(dropped))
+    anomaly = score_matrices(matrices)['CTR (destination)' + ANOMALY_SUFFIX]
+    assert (anomaly[dropped] > 0).all()
+    assert np.count_nonzero(~np.isnan(np.delete(anomaly, dropped))) <= 2